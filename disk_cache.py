@@ -0,0 +1,127 @@
+"""
+On-Disk JSON Record Store
+Shared storage of the LLM response cache and the plan cache: one JSON file per key,
+written atomically, with size- and age-based eviction. A record's creation time is
+part of its file name (<key>.<created>.json), so eviction needs only directory
+listings and stat calls, never the record contents.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+EVICT_EVERY = 100  # writes between evictions
+
+
+def _created(filename: str) -> Optional[int]:
+    """Creation time encoded in a record file name, or None for a record without one"""
+    parts = filename[:-len(".json")].split(".")
+    return int(parts[1]) if len(parts) == 2 and parts[1].isdigit() else None
+
+
+class DiskCache:
+    """Directory of JSON records sharded by key prefix"""
+
+    name = "cache"
+
+    def __init__(self, directory: str, max_bytes: int, max_age_days: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 3600
+        self._writes_since_evict = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.evict()
+
+    def _path(self, key: str) -> Optional[str]:
+        """File of the newest record of a key, or None"""
+        paths = glob.glob(os.path.join(self.directory, key[:2], f"{key}.*.json"))
+        if paths:
+            return max(paths, key=lambda path: _created(os.path.basename(path)) or 0)
+        legacy_path = os.path.join(self.directory, key[:2], f"{key}.json")  # not yet renamed by evict()
+        return legacy_path if os.path.exists(legacy_path) else None
+
+    def _write(self, key: str, record: Dict[str, Any]):
+        """Store a record atomically, replacing older records of the key"""
+        created = time.time()
+        record = dict(record, created=created)
+        old_paths = glob.glob(os.path.join(self.directory, key[:2], f"{key}.*.json"))
+        path = os.path.join(self.directory, key[:2], f"{key}.{int(created)}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        for old_path in old_paths:
+            if old_path != path:
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+
+        with self._lock:
+            self._writes_since_evict += 1
+            run_evict = self._writes_since_evict >= EVICT_EVERY
+            if run_evict:
+                self._writes_since_evict = 0
+        if run_evict:
+            self.evict()
+
+    def _migrate(self, path: str) -> Optional[str]:
+        """Rename a record written without a creation time in its name (<key>.json)"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                created = int(json.load(f).get("created", 0))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError):
+            created = 0
+        new_path = f"{path[:-len('.json')]}.{created}.json"
+        try:
+            os.replace(path, new_path)
+        except FileNotFoundError:
+            return None
+        return new_path
+
+    def evict(self):
+        """Drop records created more than max_age ago, then least recently used ones until under max_bytes"""
+        entries = []
+        now = time.time()
+        for root, _, files in os.walk(self.directory):
+            for fn in files:
+                if not fn.endswith(".json"):
+                    continue  # a record being written
+                path = os.path.join(root, fn)
+                created = _created(fn)
+                if created is None:
+                    path = self._migrate(path)
+                    if path is None:
+                        continue
+                    created = _created(os.path.basename(path))
+                try:
+                    if now - created > self.max_age:
+                        os.remove(path)
+                        continue
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} {self.name} entries from {self.directory}")
@@ -0,0 +1,309 @@
+"""
+Fast Downward Execution Pool
+Runs fast-downward.py jobs concurrently without a shell, each under its own
+address-space and CPU-time limits, and reports wall time, CPU time and peak RSS.
+In translate-once mode the translated SAS+ task is stored and reused, and only
+the search component runs for inputs that were translated before.
+"""
+import contextvars
+import hashlib
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, NamedTuple
+
+from fd_stats import LAUNCH_ERROR_EXIT_CODE, TIMEOUT_EXIT_CODE, PlannerStats, parse_planner_output
+from tracing import add_span, span
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+FAST_DOWNWARD_SCRIPT = os.getenv(
+    "FAST_DOWNWARD_SCRIPT", "./downward-release-24.06.1/downward-release-24.06.1/fast-downward.py")
+DEFAULT_MEMORY_LIMIT_MB = int(os.getenv("FD_MEMORY_LIMIT_MB", "4096"))
+
+
+class FDJob(NamedTuple):
+    domain_file: str
+    problem_file: str
+    plan_file: str = None
+    sas_file: str = None
+    alias: str = "seq-opt-lmcut"
+    time_limit: int = 200
+    memory_limit_mb: int = DEFAULT_MEMORY_LIMIT_MB
+
+
+class FDResult(NamedTuple):
+    exit_code: int
+    stdout: str
+    stderr: str
+    wall_time: float
+    cpu_time: float
+    peak_rss_kb: int
+    cached: bool = False
+
+    @property
+    def stats(self) -> PlannerStats:
+        """Statistics parsed from the planner output"""
+        return parse_planner_output(self.stdout, self.exit_code)
+
+
+def build_command(job: FDJob) -> List[str]:
+    """Build the fast-downward.py argument list for a job"""
+    command = [sys.executable, FAST_DOWNWARD_SCRIPT, "--alias", job.alias]
+    if job.plan_file:
+        command += ["--plan-file", job.plan_file]
+    if job.sas_file:
+        command += ["--sas-file", job.sas_file]
+    return command + [job.domain_file, job.problem_file]
+
+
+def build_translate_command(job: FDJob, sas_file: str) -> List[str]:
+    """Build the argument list that runs only the translator into sas_file"""
+    return [sys.executable, FAST_DOWNWARD_SCRIPT, "--sas-file", sas_file,
+            "--translate", job.domain_file, job.problem_file]
+
+
+def build_search_command(job: FDJob, sas_file: str) -> List[str]:
+    """Build the argument list that runs only the search component on sas_file"""
+    command = [sys.executable, FAST_DOWNWARD_SCRIPT, "--alias", job.alias]
+    if job.plan_file:
+        command += ["--plan-file", job.plan_file]
+    return command + ["--search", sas_file]
+
+
+def _resource_limits(time_limit: float, memory_limit_mb: int) -> List[tuple]:
+    limits = []
+    if resource is not None:
+        if memory_limit_mb:
+            memory_bytes = memory_limit_mb * 1024 * 1024
+            limits.append((resource.RLIMIT_AS, (memory_bytes, memory_bytes)))
+        if time_limit:
+            # the soft limit sends SIGXCPU, the hard limit SIGKILL shortly after
+            cpu_seconds = max(1, int(time_limit))
+            limits.append((resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5)))
+    return limits
+
+
+def _exit_code_from_status(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _trace_phases(result: FDResult, start: float):
+    """Add translate and search spans from the times a full fast-downward run reports"""
+    stats = parse_planner_output(result.stdout)
+    if stats.translate_time is not None:
+        add_span("fd.translate", start, stats.translate_time, "planner", source="planner output")
+    if stats.total_time is not None:
+        add_span("fd.search", start + (stats.translate_time or 0.0), stats.total_time, "planner",
+                 source="planner output")
+    elif "Running search" in result.stdout:
+        # the search ran but reported no total time (killed, crashed or older output format)
+        translate_time = stats.translate_time or 0.0
+        add_span("fd.search", start + translate_time, max(0.0, result.wall_time - translate_time), "planner",
+                 source="wall time")
+
+
+def run_fast_downward(job: FDJob) -> FDResult:
+    """Run one Fast Downward job to completion under its resource limits"""
+    with span("fd.run", "planner", alias=job.alias) as current:
+        result = _run_limited(build_command(job), job.time_limit, job.memory_limit_mb)
+        current.set(exit_code=result.exit_code, cpu_time=result.cpu_time, peak_rss_kb=result.peak_rss_kb)
+        _trace_phases(result, current.start)
+    return result
+
+
+def _run_limited(command: List[str], time_limit: float, memory_limit_mb: int) -> FDResult:
+    limits = _resource_limits(time_limit, memory_limit_mb)
+    use_prlimit = resource is not None and hasattr(resource, "prlimit")
+
+    def apply_limits():
+        for limit, value in limits:
+            resource.setrlimit(limit, value)
+
+    start_time = time.time()
+    with tempfile.TemporaryFile() as out_f, tempfile.TemporaryFile() as err_f:
+        try:
+            proc = subprocess.Popen(
+                command,
+                stdout=out_f,
+                stderr=err_f,
+                start_new_session=True,  # so a timeout can kill translate/search too
+                preexec_fn=None if use_prlimit or not limits else apply_limits
+            )
+        except Exception as e:
+            error_msg = f"Command failed with error: {e}"
+            print(error_msg)
+            return FDResult(LAUNCH_ERROR_EXIT_CODE, "", error_msg, time.time() - start_time, 0.0, 0)
+
+        if use_prlimit:
+            # limits set on the driver right after spawn are inherited by translate and search
+            for limit, value in limits:
+                try:
+                    resource.prlimit(proc.pid, limit, value)
+                except (ProcessLookupError, OSError):
+                    pass
+
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        timer = threading.Timer(time_limit, kill_on_timeout) if time_limit else None
+        if timer:
+            timer.start()
+        try:
+            # wait4 reports the usage of the driver and every process it waited for
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            if timer:
+                timer.cancel()
+        proc.returncode = _exit_code_from_status(status)
+        wall_time = time.time() - start_time
+
+        out_f.seek(0)
+        err_f.seek(0)
+        stdout = out_f.read().decode("utf-8", errors="replace")
+        stderr = err_f.read().decode("utf-8", errors="replace")
+
+    exit_code = proc.returncode
+    if timed_out.is_set():
+        error_msg = f"Command timed out after {time_limit:g} seconds"
+        print(error_msg)
+        exit_code = TIMEOUT_EXIT_CODE
+        stderr = f"{stderr}{error_msg}"
+
+    return FDResult(
+        exit_code=exit_code,
+        stdout=stdout,
+        stderr=stderr,
+        wall_time=wall_time,
+        cpu_time=usage.ru_utime + usage.ru_stime,
+        peak_rss_kb=usage.ru_maxrss
+    )
+
+
+class SasStore:
+    """Translated SAS+ tasks keyed on a hash of the exact domain and problem files"""
+
+    def __init__(self, directory: str = "cache/sas"):
+        self.directory = directory
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def sas_path(self, job: FDJob) -> str:
+        digest = hashlib.sha256()
+        for fn in (job.domain_file, job.problem_file):
+            with open(fn, "rb") as f:
+                digest.update(f.read())
+            digest.update(b"\0")
+        return os.path.join(self.directory, f"{digest.hexdigest()}.sas")
+
+    def lock_for(self, sas_path: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(sas_path, threading.Lock())
+
+
+def run_translate_once(job: FDJob, store: SasStore) -> FDResult:
+    """Translate a task only if its SAS file is not stored yet, then run only the search component"""
+    start_time = time.time()
+    sas_file = store.sas_path(job)
+    translate_result = None
+
+    with store.lock_for(sas_file):
+        if not os.path.exists(sas_file):
+            with span("fd.translate", "planner") as current:
+                translate_result = _run_limited(build_translate_command(job, sas_file), job.time_limit, job.memory_limit_mb)
+                current.set(exit_code=translate_result.exit_code)
+            if translate_result.exit_code != 0:
+                if os.path.exists(sas_file):
+                    os.remove(sas_file)
+                return translate_result
+
+    remaining = job.time_limit - (time.time() - start_time) if job.time_limit else None
+    if translate_result is not None and remaining is not None and remaining <= 0:
+        error_msg = f"Command timed out after {job.time_limit} seconds"
+        print(error_msg)
+        return translate_result._replace(exit_code=TIMEOUT_EXIT_CODE, stderr=translate_result.stderr + error_msg)
+    with span("fd.search", "planner", alias=job.alias, translated=translate_result is not None) as current:
+        search_result = _run_limited(build_search_command(job, sas_file), remaining, job.memory_limit_mb)
+        current.set(exit_code=search_result.exit_code)
+    if translate_result is None:
+        return search_result
+
+    return FDResult(
+        exit_code=search_result.exit_code,
+        stdout=translate_result.stdout + search_result.stdout,
+        stderr=translate_result.stderr + search_result.stderr,
+        wall_time=translate_result.wall_time + search_result.wall_time,
+        cpu_time=translate_result.cpu_time + search_result.cpu_time,
+        peak_rss_kb=max(translate_result.peak_rss_kb, search_result.peak_rss_kb)
+    )
+
+
+class PlannerPool:
+    """Runs Fast Downward jobs concurrently, by default one per core"""
+
+    def __init__(self, max_workers: int = None, sas_store: SasStore = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.sas_store = sas_store
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fast-downward")
+
+    def submit(self, job: FDJob) -> Future:
+        # run in a copy of the caller's context so that planner spans nest under the caller's span
+        context = contextvars.copy_context()
+        if self.sas_store is not None:
+            return self._executor.submit(context.run, run_translate_once, job, self.sas_store)
+        return self._executor.submit(context.run, run_fast_downward, job)
+
+    def run(self, job: FDJob) -> FDResult:
+        """Run a job on the pool and wait for its result"""
+        return self.submit(job).result()
+
+    def map(self, jobs: List[FDJob]) -> List[FDResult]:
+        """Run several jobs concurrently and return their results in order"""
+        futures = [self.submit(job) for job in jobs]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_config = {
+    "max_workers": None,
+    "translate_once": os.getenv("FD_TRANSLATE_ONCE", "0") == "1",
+    "sas_dir": os.getenv("SAS_CACHE_DIR", "cache/sas"),
+}
+
+
+def configure_planner_pool(**config):
+    """Set options for the process-wide pool; must be called before its first use"""
+    if _pool is not None:
+        raise RuntimeError("Planner pool is already running")
+    _pool_config.update({k: v for k, v in config.items() if v is not None})
+
+
+def get_planner_pool() -> PlannerPool:
+    """Return the process-wide planner pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            sas_store = SasStore(_pool_config["sas_dir"]) if _pool_config["translate_once"] else None
+            _pool = PlannerPool(max_workers=_pool_config["max_workers"], sas_store=sas_store)
+        return _pool
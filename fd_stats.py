@@ -0,0 +1,187 @@
+"""
+Fast Downward Output Statistics
+Parses the statistics that the translator and search components print into a
+typed record, and gives every planner exit code its meaning as defined by
+Fast Downward's driver (driver/returncodes.py) plus the codes used by this repo.
+"""
+import re
+from typing import NamedTuple, Optional
+
+# exit codes of this repo for planner runs that never produced an exit code of their own
+TIMEOUT_EXIT_CODE = -1
+LAUNCH_ERROR_EXIT_CODE = -2
+
+EXIT_CODES = {
+    0: ("SUCCESS", "plan found"),
+    1: ("SEARCH_PLAN_FOUND_AND_OUT_OF_MEMORY", "plan found, then search ran out of memory"),
+    2: ("SEARCH_PLAN_FOUND_AND_OUT_OF_TIME", "plan found, then search ran out of time"),
+    3: ("SEARCH_PLAN_FOUND_AND_OUT_OF_MEMORY_AND_TIME", "plan found, then search ran out of memory and time"),
+    10: ("TRANSLATE_UNSOLVABLE", "translator proved the task unsolvable"),
+    11: ("SEARCH_UNSOLVABLE", "search proved the task unsolvable"),
+    12: ("SEARCH_UNSOLVED_INCOMPLETE", "incomplete search found no plan"),
+    20: ("TRANSLATE_OUT_OF_MEMORY", "translator ran out of memory"),
+    21: ("TRANSLATE_OUT_OF_TIME", "translator ran out of time"),
+    22: ("SEARCH_OUT_OF_MEMORY", "search ran out of memory"),
+    23: ("SEARCH_OUT_OF_TIME", "search ran out of time"),
+    24: ("SEARCH_OUT_OF_MEMORY_AND_TIME", "search ran out of memory and time"),
+    30: ("TRANSLATE_CRITICAL_ERROR", "translator crashed"),
+    31: ("TRANSLATE_INPUT_ERROR", "translator rejected the PDDL input"),
+    32: ("SEARCH_CRITICAL_ERROR", "search crashed"),
+    33: ("SEARCH_INPUT_ERROR", "search rejected its input"),
+    34: ("SEARCH_UNSUPPORTED", "search does not support the task's features"),
+    35: ("DRIVER_CRITICAL_ERROR", "driver crashed"),
+    36: ("DRIVER_INPUT_ERROR", "driver rejected its arguments"),
+    37: ("DRIVER_UNSUPPORTED", "driver does not support the requested configuration"),
+    TIMEOUT_EXIT_CODE: ("TIMEOUT", "killed after the wall-clock time limit"),
+    LAUNCH_ERROR_EXIT_CODE: ("LAUNCH_ERROR", "planner could not be started"),
+}
+
+PLAN_FOUND_CODES = {0, 1, 2, 3}
+UNSOLVABLE_CODES = {10, 11}
+OUT_OF_TIME_CODES = {2, 3, 21, 23, 24, TIMEOUT_EXIT_CODE}
+OUT_OF_MEMORY_CODES = {1, 3, 20, 22, 24}
+INPUT_ERROR_CODES = {31, 33, 36}
+
+
+class ExitStatus(NamedTuple):
+    code: int
+    name: str
+    description: str
+
+    @property
+    def plan_found(self) -> bool:
+        return self.code in PLAN_FOUND_CODES
+
+    @property
+    def unsolvable(self) -> bool:
+        return self.code in UNSOLVABLE_CODES
+
+    @property
+    def out_of_time(self) -> bool:
+        return self.code in OUT_OF_TIME_CODES
+
+    @property
+    def out_of_memory(self) -> bool:
+        return self.code in OUT_OF_MEMORY_CODES
+
+    @property
+    def input_error(self) -> bool:
+        return self.code in INPUT_ERROR_CODES
+
+
+def exit_status(code: int) -> ExitStatus:
+    """The meaning of a planner exit code"""
+    if code in EXIT_CODES:
+        return ExitStatus(code, *EXIT_CODES[code])
+    if code is not None and code < 0:
+        return ExitStatus(code, "KILLED", f"killed by signal {-code}")
+    return ExitStatus(code, "UNKNOWN", f"unknown exit code {code}")
+
+
+class PlannerStats(NamedTuple):
+    exit_code: Optional[int] = None
+    exit_name: str = "UNKNOWN"
+    exit_description: str = ""
+    translate_exit_code: Optional[int] = None
+    search_exit_code: Optional[int] = None
+    # translator
+    translator_variables: Optional[int] = None
+    translator_derived_variables: Optional[int] = None
+    translator_facts: Optional[int] = None
+    translator_goal_facts: Optional[int] = None
+    translator_mutex_groups: Optional[int] = None
+    translator_operators: Optional[int] = None
+    translator_axioms: Optional[int] = None
+    translator_task_size: Optional[int] = None
+    translator_peak_memory_kb: Optional[int] = None
+    translate_time: Optional[float] = None
+    # search
+    expanded: Optional[int] = None
+    reopened: Optional[int] = None
+    evaluated: Optional[int] = None
+    generated: Optional[int] = None
+    dead_ends: Optional[int] = None
+    expanded_until_last_jump: Optional[int] = None
+    search_time: Optional[float] = None
+    total_time: Optional[float] = None
+    peak_memory_kb: Optional[int] = None
+    plan_length: Optional[int] = None
+    plan_cost: Optional[float] = None
+    plans_found: int = 0
+    planner_time: Optional[float] = None
+
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+# the search component prefixes its log lines with "[t=<elapsed>s, <memory> KB] " (Fast Downward 22.06+)
+_LINE = r"^(?:\[t=[^\]]*\]\s*)?"
+
+# field -> pattern; the last match wins, which for iterated searches is the cumulative value
+_INT_PATTERNS = {
+    "translate_exit_code": r"translate exit code: (-?\d+)",
+    "search_exit_code": r"search exit code: (-?\d+)",
+    "translator_variables": _LINE + r"Translator variables: (\d+)",
+    "translator_derived_variables": _LINE + r"Translator derived variables: (\d+)",
+    "translator_facts": _LINE + r"Translator facts: (\d+)",
+    "translator_goal_facts": _LINE + r"Translator goal facts: (\d+)",
+    "translator_mutex_groups": _LINE + r"Translator mutex groups: (\d+)",
+    "translator_operators": _LINE + r"Translator operators: (\d+)",
+    "translator_axioms": _LINE + r"Translator axioms: (\d+)",
+    "translator_task_size": _LINE + r"Translator task size: (\d+)",
+    "translator_peak_memory_kb": _LINE + r"Translator peak memory: (\d+) KB",
+    "expanded": _LINE + r"Expanded (\d+) state\(s\)",
+    "reopened": _LINE + r"Reopened (\d+) state\(s\)",
+    "evaluated": _LINE + r"Evaluated (\d+) state\(s\)",
+    "generated": _LINE + r"Generated (\d+) state\(s\)",
+    "dead_ends": _LINE + r"Dead ends: (\d+) state\(s\)",
+    "expanded_until_last_jump": _LINE + r"Expanded until last jump: (\d+) state\(s\)",
+    "peak_memory_kb": _LINE + r"Peak memory: (\d+) KB",
+    "plan_length": _LINE + r"Plan length: (\d+) step\(s\)",
+}
+_FLOAT_PATTERNS = {
+    "translate_time": _LINE + r"Done! \[[\d.]+s CPU, ([\d.]+)s wall-clock\]",
+    "search_time": _LINE + rf"Search time: {_NUMBER}s",
+    "total_time": _LINE + rf"Total time: {_NUMBER}s",
+    "planner_time": rf"Planner time: {_NUMBER}s",
+}
+_COMPILED = [(field, re.compile(pattern, re.MULTILINE), int) for field, pattern in _INT_PATTERNS.items()] + \
+            [(field, re.compile(pattern, re.MULTILINE), float) for field, pattern in _FLOAT_PATTERNS.items()]
+_PLAN_COST_RE = re.compile(_LINE + rf"Plan cost: {_NUMBER}", re.MULTILINE)
+
+
+def parse_planner_output(output: str, exit_code: Optional[int] = None) -> PlannerStats:
+    """Parse translator and search statistics from planner output into a PlannerStats record"""
+    fields = {}
+    for field, pattern, convert in _COMPILED:
+        matches = pattern.findall(output)
+        if matches:
+            fields[field] = convert(matches[-1])
+
+    # anytime searches print one cost per plan; the best one is kept
+    costs = [float(cost) for cost in _PLAN_COST_RE.findall(output)]
+    if costs:
+        fields["plan_cost"] = min(costs)
+    fields["plans_found"] = len(costs)
+
+    if exit_code is not None:
+        status = exit_status(exit_code)
+        fields.update(exit_code=exit_code, exit_name=status.name, exit_description=status.description)
+    return PlannerStats(**fields)
+
+
+def format_stats(stats: PlannerStats) -> str:
+    """One-line summary of the statistics that were reported"""
+    parts = [f"{stats.exit_name} ({stats.exit_code})"]
+    if stats.translator_operators is not None:
+        parts.append(f"{stats.translator_variables} variables, {stats.translator_operators} operators")
+    counters = [(label, value) for label, value in (("expanded", stats.expanded), ("evaluated", stats.evaluated),
+                                                     ("generated", stats.generated)) if value is not None]
+    if counters:
+        parts.append(", ".join(f"{label} {value}" for label, value in counters))
+    if stats.search_time is not None:
+        parts.append(f"search {stats.search_time:g} sec")
+    if stats.peak_memory_kb is not None:
+        parts.append(f"peak memory {stats.peak_memory_kb / 1024:.1f} MB")
+    if stats.plan_length is not None:
+        cost = f", cost {stats.plan_cost:g}" if stats.plan_cost is not None else ""
+        parts.append(f"plan length {stats.plan_length}{cost}")
+    return ", ".join(parts)
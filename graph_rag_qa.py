@@ -2,29 +2,56 @@
 Graph RAG System for PDDL QA Bot
 """
 import logging
+import re
 from typing import List, Dict, Any
-from langchain.chat_models import init_chat_model
 from knowledge_graph_qa import PDDLKnowledgeGraphQA
+from llm_cache import CacheMissError
+from llm_client import get_llm_client
 from rank_bm25 import BM25Okapi
+from tracing import span
 import nltk
 from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer
 
-# Download required NLTK data if not already present
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# used when the NLTK stopwords corpus is not installed locally
+FALLBACK_STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my myself
+no nor not now of off on once only or other our ours ourselves out over own same she should so some
+such than that the their theirs them themselves then there these they this those through to too under
+until up very was we were what when where which while who whom why will with you your yours yourself
+yourselves
+""".split())
+
+
+def _regex_tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+|[^\w\s]", text)
+
+
+def resolve_nltk_resources():
+    """Tokenizer and stop words from locally installed NLTK data; never downloads anything"""
+    try:
+        nltk.data.find('tokenizers/punkt_tab')
+        tokenize = word_tokenize
+    except LookupError:
+        logger.warning("NLTK punkt_tab not found, using a regex tokenizer "
+                       "(install it with: python -m nltk.downloader punkt_tab)")
+        tokenize = _regex_tokenize
+
+    try:
+        stop_words = set(stopwords.words('english'))
+    except LookupError:
+        logger.warning("NLTK stopwords not found, using a built-in list "
+                       "(install it with: python -m nltk.downloader stopwords)")
+        stop_words = set(FALLBACK_STOP_WORDS)
+    return tokenize, stop_words
+
+
 class PDDLGraphRAGQA:
     """Graph RAG system for PDDL QA"""
     
@@ -32,16 +59,12 @@ class PDDLGraphRAGQA:
         self.kg = knowledge_graph
         self.cohere_api_key = cohere_api_key
         
-        # Initialize Cohere chat model (keeping Cohere for chat)
-        self.chat_model = init_chat_model(
-            "command-r-plus", 
-            model_provider="cohere", 
-            api_key=cohere_api_key
-        )
+        # Cohere chat goes through the process-wide client so it shares the LLM rate limits
+        self.llm_client = get_llm_client(cohere_api_key)
         
         # Initialize text processing
         self.stemmer = PorterStemmer()
-        self.stop_words = set(stopwords.words('english'))
+        self.tokenize, self.stop_words = resolve_nltk_resources()
         
         # BM25 corpus for keyword search
         self.bm25_corpus = []
@@ -52,7 +75,7 @@ class PDDLGraphRAGQA:
     
     def _preprocess_text(self, text: str) -> List[str]:
         """Preprocess text for BM25"""
-        tokens = word_tokenize(text.lower())
+        tokens = self.tokenize(text.lower())
         tokens = [self.stemmer.stem(token) for token in tokens 
                  if token.isalnum() and token not in self.stop_words]
         return tokens
@@ -111,22 +134,25 @@ class PDDLGraphRAGQA:
         
         # BM25 retrieval
         if self.bm25_model:
-            query_tokens = self._preprocess_text(query)
-            bm25_scores = self.bm25_model.get_scores(query_tokens)
-            
-            # Get top BM25 results
-            bm25_indices = sorted(range(len(bm25_scores)), 
-                                key=lambda i: bm25_scores[i], reverse=True)[:top_k]
-            
-            for idx in bm25_indices:
-                if bm25_scores[idx] > 0:
-                    result = self.bm25_metadata[idx].copy()
-                    result['score'] = float(bm25_scores[idx])
-                    result['retrieval_type'] = 'BM25'
-                    all_results.append(result)
+            with span("kg.bm25", "kg", corpus_size=len(self.bm25_corpus)):
+                query_tokens = self._preprocess_text(query)
+                bm25_scores = self.bm25_model.get_scores(query_tokens)
+                
+                # Get top BM25 results
+                bm25_indices = sorted(range(len(bm25_scores)), 
+                                    key=lambda i: bm25_scores[i], reverse=True)[:top_k]
+                
+                for idx in bm25_indices:
+                    if bm25_scores[idx] > 0:
+                        result = self.bm25_metadata[idx].copy()
+                        result['score'] = float(bm25_scores[idx])
+                        result['retrieval_type'] = 'BM25'
+                        all_results.append(result)
         
         # Semantic similarity retrieval  
-        semantic_results = self.kg.similarity_search(query, top_k)
+        with span("kg.semantic", "kg") as current:
+            semantic_results = self.kg.similarity_search(query, top_k)
+            current.set(results=len(semantic_results))
         for result in semantic_results:
             node = result['node']
             similarity = result['similarity']
@@ -162,7 +188,8 @@ class PDDLGraphRAGQA:
         """Answer a question about PDDL"""
         try:
             # Retrieve relevant context
-            retrieved_results = self.hybrid_retrieve(question, top_k=5)
+            with span("kg.retrieve", "kg"):
+                retrieved_results = self.hybrid_retrieve(question, top_k=5)
             
             if not retrieved_results:
                 return {
@@ -200,8 +227,9 @@ Instructions:
 Answer:"""
 
             # Generate response
-            response = self.chat_model.invoke(prompt)
-            answer = response.content if hasattr(response, 'content') else str(response)
+            with span("llm.answer", "llm"):
+                response = self.llm_client.chat(prompt, model="command-r-plus")
+            answer = response.text
             
             # Calculate confidence based on retrieval scores
             avg_score = sum(r['score'] for r in retrieved_results) / len(retrieved_results)
@@ -213,6 +241,8 @@ Answer:"""
                 'confidence': confidence
             }
             
+        except CacheMissError:
+            raise
         except Exception as e:
             logger.error(f"Error answering question: {e}")
             return {
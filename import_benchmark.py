@@ -0,0 +1,83 @@
+"""
+Import-Time Benchmark
+Measures the cold-start import time of main.py in fresh interpreters, checks that the
+knowledge graph stack is not loaded by it, and appends each measurement to a log so
+regressions are visible. Exits non-zero when the median exceeds the budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# modules that only the RAG method may load
+HEAVY_MODULES = ["graph_rag_qa", "kg_initializer", "knowledge_graph_qa", "neo4j", "langchain",
+                 "langchain_community", "langchain_huggingface", "sentence_transformers", "torch",
+                 "nltk", "rank_bm25", "numpy", "cohere"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeats: int) -> dict:
+    """Import a module in `repeats` fresh interpreters and return the timings"""
+    samples = []
+    heavy = set()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                              capture_output=True, text=True)
+        startup = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+        probe = json.loads(proc.stdout.strip().splitlines()[-1])
+        samples.append({"import": probe["seconds"], "process": startup})
+        heavy.update(probe["heavy"])
+
+    return {
+        "module": module,
+        "python": sys.version.split()[0],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeats": repeats,
+        "median_import": statistics.median(s["import"] for s in samples),
+        "median_process": statistics.median(s["process"] for s in samples),
+        "heavy_modules": sorted(heavy)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold-start import time of main.py against a budget")
+    parser.add_argument('--module', type=str, default="main")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=float(os.getenv("IMPORT_TIME_BUDGET", "0.5")),
+                        help="maximum median import time in seconds")
+    parser.add_argument('--log', type=str, default="./experiments/import_benchmark.jsonl",
+                        help="file that every measurement is appended to")
+    args = parser.parse_args()
+
+    result = measure(args.module, args.repeats)
+    result["budget"] = args.budget
+    result["passed"] = result["median_import"] <= args.budget and not result["heavy_modules"]
+
+    os.makedirs(os.path.dirname(args.log) or ".", exist_ok=True)
+    with open(args.log, "a") as f:
+        f.write(json.dumps(result) + "\n")
+
+    print(f"[info] import {args.module}: median {result['median_import'] * 1000:.1f} ms "
+          f"(process {result['median_process'] * 1000:.1f} ms), budget {args.budget * 1000:.0f} ms")
+    if result["heavy_modules"]:
+        print(f"[error] import {args.module} loaded {', '.join(result['heavy_modules'])}")
+    if result["median_import"] > args.budget:
+        print("[error] import time is over budget")
+    sys.exit(0 if result["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
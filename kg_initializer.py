@@ -6,12 +6,13 @@ with PDDL domain information and planning examples.
 
 import os
 import logging
-import re
 import json
 import glob
-import time
-from typing import List, Dict, Any, NamedTuple
+import hashlib
+from typing import List, Dict, Any, NamedTuple, Set
 from dotenv import load_dotenv
+from fd_stats import exit_status
+from pddl_reader import Domain, parse_domain
 from knowledge_graph_qa import PDDLKnowledgeGraphQA
 
 # Load environment variables
@@ -21,6 +22,60 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# bump when parsing or the node format changes, so unchanged sources are ingested again
+INGESTION_VERSION = 2
+
+
+def content_hash(data) -> str:
+    """SHA-256 of a source file's bytes or of a JSON-serializable record"""
+    if not isinstance(data, bytes):
+        data = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(f"v{INGESTION_VERSION}:".encode("utf-8") + data).hexdigest()
+
+
+# one node per log; cases added without a log keep one node per task and method
+ERROR_CASES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (e:ErrorCase {source_id: row.source_id})
+    SET e:Embedded,
+        e.task_id = row.task_id,
+        e.method = row.method,
+        e.error_type = row.error_type,
+        e.error_description = row.error_description,
+        e.exit_code = row.exit_code,
+        e.domain_name = row.domain_name,
+        e.timestamp = row.timestamp,
+        e.content_hash = row.content_hash,
+        e.embedding = row.embedding
+    
+    // (re)link to the fixes of its error type
+    WITH e, row
+    OPTIONAL MATCH (e)-[r:HAS_FIX]->()
+    DELETE r
+    WITH DISTINCT e, row
+    MATCH (f:ErrorFix {error_type: row.error_type})
+    MERGE (e)-[:HAS_FIX]->(f)
+"""
+
+ERROR_FIXES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (f:ErrorFix {error_type: row.error_type, fix_title: row.fix_title})
+    SET f:Embedded,
+        f.fix_description = row.fix_description,
+        f.fix_strategy = row.fix_strategy,
+        f.source = row.source,
+        f.example_before = row.example_before,
+        f.example_after = row.example_after,
+        f.source_id = row.source_id,
+        f.content_hash = row.content_hash,
+        f.embedding = row.embedding
+    
+    WITH f, row
+    MATCH (e:ErrorCase {error_type: row.error_type})
+    MERGE (e)-[:HAS_FIX]->(f)
+"""
+
+
 # Data structures for PDDL parsing
 class DomainData(NamedTuple):
     name: str
@@ -29,6 +84,8 @@ class DomainData(NamedTuple):
     actions: List[Dict[str, Any]]
     predicates: List[Dict[str, Any]]
     types: List[Dict[str, Any]]
+    source_id: str = ""  # the source file, relative to the working directory
+    content_hash: str = ""
 
 class ActionData(NamedTuple):
     name: str
@@ -52,6 +109,8 @@ class ErrorCase(NamedTuple):
     exit_code: int
     domain_name: str
     timestamp: str
+    log_file: str = ""  # the log the case was read from
+    content_hash: str = ""
 
 class ErrorFix(NamedTuple):
     error_type: str
@@ -68,7 +127,7 @@ class PDDLKnowledgeGraphInitializer:
     Initializes and manages the PDDL Knowledge Graph in Neo4j
     """
     
-    def __init__(self):
+    def __init__(self, batch_size: int = None):
         """Initialize with Neo4j credentials from environment variables"""
         self.neo4j_uri = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
         self.neo4j_username = os.getenv("NEO4J_USERNAME", "neo4j")
@@ -76,6 +135,7 @@ class PDDLKnowledgeGraphInitializer:
         self.neo4j_database = os.getenv("NEO4J_DATABASE", "neo4j")
         self.cohere_api_key = os.getenv("COHERE_API_KEY")
         self.huggingface_token = os.getenv("HUGGINGFACE_TOKEN")
+        self.batch_size = batch_size
         
         if not self.cohere_api_key:
             raise ValueError("COHERE_API_KEY not found in environment variables")
@@ -85,7 +145,9 @@ class PDDLKnowledgeGraphInitializer:
         self.initialize_knowledge_graph()
     
     def initialize_knowledge_graph(self):
-        """Initialize the knowledge graph connection and structure"""
+        """Initialize the knowledge graph connection and structure; a no-op when already connected"""
+        if self.kg is not None:
+            return True
         try:
             logger.info("Connecting to Neo4j database...")
             logger.info(f"Neo4j URI: {self.neo4j_uri}")
@@ -97,7 +159,8 @@ class PDDLKnowledgeGraphInitializer:
                 uri=self.neo4j_uri,
                 username=self.neo4j_username,
                 password=self.neo4j_password,
-                huggingface_token=self.huggingface_token
+                huggingface_token=self.huggingface_token,
+                batch_size=self.batch_size
             )
             
             logger.info("[SUCCESS] Knowledge graph connection established successfully")
@@ -107,42 +170,33 @@ class PDDLKnowledgeGraphInitializer:
             logger.error(f"[ERROR] Failed to initialize knowledge graph: {e}")
             return False
     
-    def parse_pddl_domain(self, domain_file_path: str) -> DomainData:
+    def parse_pddl_domain(self, domain_file_path: str, content: bytes = None) -> DomainData:
         """Parse a PDDL domain file and extract relevant information"""
         try:
-            with open(domain_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Extract domain name
-            name_match = re.search(r'\(domain\s+([^)]+)\)', content, re.IGNORECASE)
-            domain_name = name_match.group(1).strip() if name_match else "unknown_domain"
+            if content is None:
+                with open(domain_file_path, 'rb') as f:
+                    content = f.read()
+            domain = parse_domain(content.decode('utf-8'))
             
             # Generate description based on domain name and content analysis
-            description = self._generate_domain_description(domain_name, content)
-            
-            # Extract actions
-            actions = self._extract_actions(content, domain_name)
-            
-            # Extract predicates
-            predicates = self._extract_predicates(content, domain_name)
-            
-            # Extract types
-            types = self._extract_types(content, domain_name)
+            description = self._generate_domain_description(domain)
             
             return DomainData(
-                name=domain_name,
+                name=domain.name,
                 description=description,
                 file_path=domain_file_path,
-                actions=actions,
-                predicates=predicates,
-                types=types
+                actions=self._extract_actions(domain),
+                predicates=self._extract_predicates(domain),
+                types=self._extract_types(domain),
+                source_id=os.path.relpath(domain_file_path),
+                content_hash=content_hash(content)
             )
             
         except Exception as e:
             logger.error(f"Error parsing domain file {domain_file_path}: {e}")
             return None
     
-    def _generate_domain_description(self, domain_name: str, content: str) -> str:
+    def _generate_domain_description(self, domain: Domain) -> str:
         """Generate a description for the domain based on its name and content"""
         descriptions = {
             "blocksworld": "A classic planning domain involving stacking blocks on a table and on top of each other",
@@ -153,190 +207,149 @@ class PDDLKnowledgeGraphInitializer:
         
         # Check if domain name matches known patterns
         for key, desc in descriptions.items():
-            if key.lower() in domain_name.lower():
+            if key.lower() in domain.name.lower():
                 return desc
         
         # Fallback: generate description based on predicates and actions found
-        action_count = len(re.findall(r':action\s+\w+', content, re.IGNORECASE))
-        predicate_count = len(re.findall(r'\(\w+[^)]*\)', content)) // 2  # Rough estimate
-        
-        return f"PDDL planning domain '{domain_name}' with {action_count} actions and approximately {predicate_count} predicates"
+        return (f"PDDL planning domain '{domain.name}' with {len(domain.actions)} actions "
+                f"and {len(domain.predicates)} predicates")
     
-    def _extract_actions(self, content: str, domain_name: str) -> List[Dict[str, Any]]:
-        """Extract actions from PDDL domain content"""
+    def _extract_actions(self, domain: Domain) -> List[Dict[str, Any]]:
+        """Extract actions from a parsed PDDL domain"""
         actions = []
-        
-        # Find all action definitions - improved regex to handle multiline parameters
-        action_pattern = r'\(:action\s+(\w+)\s*:parameters\s*\((.*?)\)\s*:precondition\s*(.*?)\s*:effect\s*(.*?)(?=\(:action|\Z)'
-        matches = re.findall(action_pattern, content, re.DOTALL | re.IGNORECASE)
-        
-        for match in matches:
-            action_name, parameters_str, preconditions_str, effects_str = match
-            
-            # Parse parameters
-            parameters = self._parse_parameters(parameters_str)
-            
-            # Parse preconditions and effects (simplified)
-            preconditions = [preconditions_str.strip()]
-            effects = [effects_str.strip()]
-            
-            # Generate better description for action
-            action_desc = f"Action {action_name} in {domain_name} domain with parameters: {', '.join(parameters) if parameters else 'none'}"
+        for action in domain.actions:
+            parameters = [str(param) for param in action.parameters]
+            action_desc = f"Action {action.name} in {domain.name} domain with parameters: {', '.join(parameters) if parameters else 'none'}"
             
             action_data = ActionData(
-                name=action_name.strip(),
+                name=action.name,
                 description=action_desc,
                 parameters=parameters,
-                preconditions=preconditions,
-                effects=effects,
-                domain_name=domain_name
+                preconditions=[str(action.precondition)] if action.precondition else [],
+                effects=[str(action.effect)] if action.effect else [],
+                domain_name=domain.name
             )
-            
             actions.append(action_data._asdict())
         
         return actions
     
-    def _extract_predicates(self, content: str, domain_name: str) -> List[Dict[str, Any]]:
-        """Extract predicates from PDDL domain content"""
+    def _extract_predicates(self, domain: Domain) -> List[Dict[str, Any]]:
+        """Extract predicates from a parsed PDDL domain"""
         predicates = []
-        
-        # Find predicates section
-        predicates_match = re.search(r':predicates\s*\((.*?)\)\s*(?=:\w+)', content, re.DOTALL | re.IGNORECASE)
-        if predicates_match:
-            predicates_content = predicates_match.group(1)
-            
-            # Find individual predicates
-            pred_pattern = r'\((\w+)([^)]*)\)'
-            matches = re.findall(pred_pattern, predicates_content)
-            
-            for pred_name, params_str in matches:
-                parameters = self._parse_parameters(params_str)
-                
-                predicate_data = PredicateData(
-                    name=pred_name.strip(),
-                    description=f"Predicate {pred_name} in {domain_name} domain",
-                    parameters=parameters,
-                    domain_name=domain_name
-                )
-                
-                predicates.append(predicate_data._asdict())
+        for predicate in domain.predicates:
+            predicate_data = PredicateData(
+                name=predicate.name,
+                description=f"Predicate {predicate.name} in {domain.name} domain",
+                parameters=[str(param) for param in predicate.parameters],
+                domain_name=domain.name
+            )
+            predicates.append(predicate_data._asdict())
         
         return predicates
     
-    def _extract_types(self, content: str, domain_name: str) -> List[Dict[str, Any]]:
-        """Extract types from PDDL domain content"""
-        types = []
+    def _extract_types(self, domain: Domain) -> List[Dict[str, Any]]:
+        """Extract types and their supertypes from a parsed PDDL domain"""
+        supertypes = {declared.name: declared.type_names for declared in domain.types}
+        # supertypes are declared implicitly
+        for parents in list(supertypes.values()):
+            for parent in parents:
+                if parent != "object":
+                    supertypes.setdefault(parent, ["object"])
         
-        # Find types section
-        types_match = re.search(r':types\s+(.*?)(?=:\w+|\))', content, re.DOTALL | re.IGNORECASE)
-        if types_match:
-            types_content = types_match.group(1).strip()
-            type_names = [t.strip() for t in types_content.split() if t.strip() and t.strip() != '-']
-            
-            for type_name in type_names:
-                if type_name and not type_name.startswith('-'):
-                    types.append({
-                        'name': type_name,
-                        'description': f"Type {type_name} in {domain_name} domain",
-                        'domain_name': domain_name
-                    })
+        types = []
+        for type_name, parents in supertypes.items():
+            types.append({
+                'name': type_name,
+                'description': f"Type {type_name} in {domain.name} domain",
+                'supertypes': parents,
+                'domain_name': domain.name
+            })
         
         return types
     
-    def _parse_parameters(self, params_str: str) -> List[str]:
-        """Parse parameter string into list of parameters"""
-        if not params_str.strip():
-            return []
-        
-        # Simple parameter parsing - could be enhanced
-        params = []
-        tokens = params_str.split()
-        current_param = ""
-        
-        for token in tokens:
-            if token.startswith('?'):
-                if current_param:
-                    params.append(current_param.strip())
-                current_param = token
-            else:
-                current_param += f" {token}"
-        
-        if current_param:
-            params.append(current_param.strip())
-        
-        return params
-    
     def add_error_case_to_kg(self, error_case: ErrorCase):
         """Add an error case to the knowledge graph"""
+        self.add_error_cases_to_kg([error_case])
+    
+    def add_error_cases_to_kg(self, error_cases: List[ErrorCase]):
+        """Add error cases to the knowledge graph in batched writes"""
         try:
-            # Add rate limiting to avoid Cohere API limits
-            time.sleep(1.8)  # ~33 requests per minute to stay under 40/min limit
-            
-            with self.kg.driver.session(database=self.neo4j_database) as session:
-                error_text = f"{error_case.error_type} {error_case.error_description}"
-                if self.kg.embeddings:
-                    embedding = self.kg.embeddings.embed_query(error_text)
-                else:
-                    embedding = self.kg._simple_text_embedding(error_text)
-                
-                session.run("""
-                    MERGE (e:ErrorCase {task_id: $task_id, method: $method})
-                    SET e.error_type = $error_type,
-                        e.error_description = $error_description,
-                        e.exit_code = $exit_code,
-                        e.domain_name = $domain_name,
-                        e.timestamp = $timestamp,
-                        e.embedding = $embedding
-                """, {
-                    'task_id': error_case.task_id,
-                    'method': error_case.method,
-                    'error_type': error_case.error_type,
-                    'error_description': error_case.error_description,
-                    'exit_code': error_case.exit_code,
-                    'domain_name': error_case.domain_name,
-                    'timestamp': error_case.timestamp,
-                    'embedding': embedding
-                })
+            embeddings = self.kg.embed_texts([f"{error_case.error_type} {error_case.error_description}"
+                                              for error_case in error_cases])
+            rows = [dict(
+                error_case._asdict(),
+                source_id=error_case.log_file or f"{error_case.method}/{error_case.task_id}",
+                embedding=embedding
+            ) for error_case, embedding in zip(error_cases, embeddings)]
+            
+            self.kg.write_rows(ERROR_CASES_QUERY, rows, database=self.neo4j_database)
         except Exception as e:
-            logger.error(f"Error adding error case: {e}")
+            logger.error(f"Error adding error cases: {e}")
     
-    def add_error_fix_to_kg(self, error_fix: ErrorFix):
+    def add_error_fix_to_kg(self, error_fix: ErrorFix, source_id: str = None):
         """Add an error fix to the knowledge graph"""
+        self.add_error_fixes_to_kg([error_fix], [source_id])
+    
+    def add_error_fixes_to_kg(self, error_fixes: List[ErrorFix], source_ids: List[str] = None):
+        """Add error fixes to the knowledge graph in batched writes"""
         try:
-            # Add rate limiting to avoid Cohere API limits  
-            time.sleep(1.8)  # ~33 requests per minute to stay under 40/min limit
-            
-            with self.kg.driver.session(database=self.neo4j_database) as session:
-                fix_text = f"{error_fix.error_type} {error_fix.fix_description}"
-                if self.kg.embeddings:
-                    embedding = self.kg.embeddings.embed_query(fix_text)
-                else:
-                    embedding = self.kg._simple_text_embedding(fix_text)
-                
-                session.run("""
-                    MERGE (f:ErrorFix {error_type: $error_type, fix_title: $fix_title})
-                    SET f.fix_description = $fix_description,
-                        f.fix_strategy = $fix_strategy,
-                        f.source = $source,
-                        f.example_before = $example_before,
-                        f.example_after = $example_after,
-                        f.embedding = $embedding
-                    
-                    WITH f
-                    MATCH (e:ErrorCase {error_type: $error_type})
-                    MERGE (e)-[:HAS_FIX]->(f)
-                """, {
-                    'error_type': error_fix.error_type,
-                    'fix_title': error_fix.fix_title,
-                    'fix_description': error_fix.fix_description,
-                    'fix_strategy': error_fix.fix_strategy,
-                    'source': error_fix.source,
-                    'example_before': error_fix.example_before[:500],
-                    'example_after': error_fix.example_after[:500],
-                    'embedding': embedding
-                })
+            embeddings = self.kg.embed_texts([f"{error_fix.error_type} {error_fix.fix_description}"
+                                              for error_fix in error_fixes])
+            rows = [dict(
+                error_fix._asdict(),
+                source_id=source_id or f"{error_fix.source}:{error_fix.error_type}:{error_fix.fix_title}",
+                content_hash=content_hash(error_fix._asdict()),
+                example_before=error_fix.example_before[:500],
+                example_after=error_fix.example_after[:500],
+                embedding=embedding
+            ) for error_fix, source_id, embedding in zip(error_fixes, source_ids or [None] * len(error_fixes),
+                                                         embeddings)]
+            
+            self.kg.write_rows(ERROR_FIXES_QUERY, rows, database=self.neo4j_database)
         except Exception as e:
-            logger.error(f"Error adding error fix: {e}")
+            logger.error(f"Error adding error fixes: {e}")
+    
+    def _stored_hashes(self, label: str, prefix: str = "") -> Dict[str, str]:
+        """source_id -> content_hash of the ingested nodes of a label"""
+        with self.kg.driver.session(database=self.neo4j_database) as session:
+            result = session.run(f"""
+                MATCH (n:{label})
+                WHERE n.source_id STARTS WITH $prefix AND n.content_hash IS NOT NULL
+                RETURN n.source_id AS source_id, n.content_hash AS content_hash
+            """, {'prefix': prefix})
+            return {record["source_id"]: record["content_hash"] for record in result}
+    
+    def _delete_stale(self, label: str, keep: Set[str], prefix: str = "", legacy: bool = True) -> int:
+        """Delete the nodes of a label under prefix whose source is no longer ingested and, with legacy,
+        the nodes from before content hashes were stored; returns the number of deleted nodes"""
+        with self.kg.driver.session(database=self.neo4j_database) as session:
+            result = session.run(f"""
+                MATCH (n:{label})
+                WHERE ($legacy AND n.source_id IS NULL)
+                   OR (n.source_id STARTS WITH $prefix AND NOT n.source_id IN $keep)
+                DETACH DELETE n
+                RETURN count(n) AS deleted
+            """, {'prefix': prefix, 'keep': sorted(keep), 'legacy': legacy})
+            return result.single()["deleted"]
+    
+    def _sync_error_fixes(self, error_fixes: List[ErrorFix], table: str):
+        """Add the fixes of a table that are new or changed and delete the ones that were removed from it"""
+        prefix = f"{table}:"
+        stored = self._stored_hashes("ErrorFix", prefix)
+        keep = set()
+        changed, source_ids = [], []
+        for fix in error_fixes:
+            source_id = f"{prefix}{fix.error_type}:{fix.fix_title}"
+            keep.add(source_id)
+            if stored.get(source_id) != content_hash(fix._asdict()):
+                changed.append(fix)
+                source_ids.append(source_id)
+        if changed:
+            self.add_error_fixes_to_kg(changed, source_ids)
+        added = len(changed)
+        deleted = self._delete_stale("ErrorFix", keep, prefix)
+        logger.info(f"Error fixes from {table}: {added} added or changed, "
+                    f"{len(error_fixes) - added} unchanged, {deleted} deleted")
     
     def classify_error_from_logs(self, exit_code: int, planner_output: str) -> tuple:
         """Classify error from log data"""
@@ -358,6 +371,7 @@ class PDDLKnowledgeGraphInitializer:
                 return "PLANNER_PARSE_ERROR", "General PDDL structure or syntax error"
         
         # Check exit codes for planning failures
+        status = exit_status(exit_code)
         if exit_code == 12:
             if "No relaxed solution" in planner_output:
                 return "UNSOLVABLE_PROBLEM", "Problem has no valid solution path"
@@ -365,10 +379,14 @@ class PDDLKnowledgeGraphInitializer:
                 return "DEAD_END_STATE", "Initial state blocks all actions"
             else:
                 return "SEARCH_FAILURE", "Search could not find solution"
-        elif exit_code == 31:
+        elif status.out_of_time:
             return "TIMEOUT", "Planning exceeded time limit"
-        elif exit_code == 1:
-            return "GENERAL_ERROR", "General planning or parsing error"
+        elif status.unsolvable:
+            return "UNSOLVABLE_PROBLEM", "Problem has no valid solution path"
+        elif exit_code in (30, 31):
+            return "PLANNER_PARSE_ERROR", "Translator could not parse the PDDL input"
+        elif status.name != "UNKNOWN":
+            return "GENERAL_ERROR", f"Exit code {exit_code}: {status.description}"
         else:
             return "UNKNOWN_ERROR", f"Exit code {exit_code}"
     
@@ -488,10 +506,7 @@ class PDDLKnowledgeGraphInitializer:
             )
         ]
         
-        for fix in error_fixes:
-            self.add_error_fix_to_kg(fix)
-        
-        logger.info(f"Added {len(error_fixes)} error fixes from online sources")
+        self._sync_error_fixes(error_fixes, "online_sources")
     
     def populate_error_fixes_from_user_table(self):
         """Add error fixes from user-provided table"""
@@ -580,47 +595,66 @@ class PDDLKnowledgeGraphInitializer:
             )
         ]
         
-        for fix in error_fixes:
-            self.add_error_fix_to_kg(fix)
-        
-        logger.info(f"Added {len(error_fixes)} error fixes from user table")
+        self._sync_error_fixes(error_fixes, "user_table")
     
     def populate_error_cases_from_logs(self, log_directory: str = "logs"):
         """Extract error cases from planning logs"""
         try:
-            log_files = glob.glob(f'{log_directory}/run*/*.json')
-            error_count = 0
+            # sorted, so the same logs are picked on every run
+            log_files = sorted(glob.glob(f'{log_directory}/run*/*.json'))
+            prefix = os.path.join(os.path.relpath(log_directory), "")
+            stored = self._stored_hashes("ErrorCase", prefix)
+            keep = set()
+            error_cases = []
+            unchanged = 0
             
-            logger.info(f"Processing error cases with rate limiting (this may take a few minutes)...")
+            logger.info(f"Processing error cases from {len(log_files)} logs...")
             
-            for log_file in log_files[:15]:  # Reduced to 15 to avoid rate limits
+            for log_file in log_files:
                 try:
-                    with open(log_file, 'r') as f:
-                        data = json.load(f)
+                    with open(log_file, 'rb') as f:
+                        content = f.read()
+                    source_id = os.path.relpath(log_file)
+                    log_hash = content_hash(content)
+                    if stored.get(source_id) == log_hash:
+                        # only logs of failed attempts have a node
+                        keep.add(source_id)
+                        unchanged += 1
+                        continue
+                    data = json.loads(content)
                     
-                    if not data.get('plan_found', True) or data.get('planner_exit_code', 0) != 0:
+                    # text-plan methods record no planner exit code
+                    exit_code = data.get('planner_exit_code') or 0
+                    if not data.get('plan_found', True) or exit_code != 0:
                         error_type, error_desc = self.classify_error_from_logs(
-                            data.get('planner_exit_code', 0),
+                            exit_code,
                             data.get('planner_output', '')
                         )
+                        # results_log records already carry the category found at run time
+                        error_type = data.get('error_category') or error_type
                         
                         error_case = ErrorCase(
                             task_id=data.get('task_id', -1),
                             method=data.get('method', 'unknown'),
                             error_type=error_type,
                             error_description=error_desc,
-                            exit_code=data.get('planner_exit_code', 0),
-                            domain_name="blocksworld",  # Assuming blocksworld domain
-                            timestamp=data.get('timestamp', '')
+                            exit_code=exit_code,
+                            domain_name=data.get('domain', 'blocksworld'),
+                            timestamp=data.get('timestamp', ''),
+                            log_file=source_id,
+                            content_hash=log_hash
                         )
                         
-                        self.add_error_case_to_kg(error_case)
-                        error_count += 1
+                        error_cases.append(error_case)
+                        keep.add(source_id)
                         
                 except Exception as e:
                     continue
             
-            logger.info(f"Added {error_count} error cases from logs")
+            if error_cases:
+                self.add_error_cases_to_kg(error_cases)
+            deleted = self._delete_stale("ErrorCase", keep, prefix)
+            logger.info(f"Added {len(error_cases)} error cases from logs, {unchanged} unchanged, {deleted} deleted")
             
         except Exception as e:
             logger.error(f"Failed to populate error cases: {e}")
@@ -650,6 +684,9 @@ class PDDLKnowledgeGraphInitializer:
             if not self.kg:
                 raise ValueError("Knowledge graph must be initialized first")
             
+            # only a run over the default paths owns the whole graph; otherwise stale domains
+            # are looked for under the given paths only
+            full_run = domain_paths is None
             if domain_paths is None:
                 # Default domain paths
                 domain_paths = [
@@ -661,14 +698,26 @@ class PDDLKnowledgeGraphInitializer:
             
             logger.info(f"Populating knowledge graph with {len(domain_paths)} domains...")
             
+            stored = self._stored_domains()
+            sources = {}  # domain name -> source_id of the file it is read from
+            counts = {"added": 0, "unchanged": 0}
             for domain_path in domain_paths:
                 full_path = os.path.abspath(domain_path)
                 if os.path.exists(full_path):
                     logger.info(f"Processing domain: {domain_path}")
-                    self._process_domain_folder(full_path)
+                    self._process_domain_folder(full_path, stored, sources, counts)
                 else:
                     logger.warning(f"Domain path not found: {full_path}")
             
+            keep = set(sources.values())
+            if full_run:
+                deleted = self._delete_stale("Domain", keep)
+            else:
+                deleted = sum(self._delete_stale("Domain", keep, self._source_prefix(path), legacy=False)
+                              for path in domain_paths)
+            orphans = self.kg.delete_orphans()
+            logger.info(f"Domains: {counts['added']} added or changed, {counts['unchanged']} unchanged, "
+                        f"{deleted} deleted ({orphans} actions, predicates and types no longer used)")
             logger.info("[SUCCESS] Domain population completed successfully")
             return True
             
@@ -676,31 +725,70 @@ class PDDLKnowledgeGraphInitializer:
             logger.error(f"[ERROR] Failed to populate domains: {e}")
             return False
     
-    def _process_domain_folder(self, domain_path: str):
+    @staticmethod
+    def _source_prefix(path: str) -> str:
+        """Prefix of the source_ids of the files read from a domain file or folder"""
+        source_id = os.path.relpath(path)
+        return source_id if os.path.isfile(path) else os.path.join(source_id, "")
+    
+    def _stored_domains(self) -> Dict[str, tuple]:
+        """source_id -> (content_hash, name) of the ingested domains"""
+        with self.kg.driver.session(database=self.neo4j_database) as session:
+            result = session.run("""
+                MATCH (d:Domain)
+                WHERE d.source_id IS NOT NULL AND d.content_hash IS NOT NULL
+                RETURN d.source_id AS source_id, d.content_hash AS content_hash, d.name AS name
+            """)
+            return {record["source_id"]: (record["content_hash"], record["name"]) for record in result}
+    
+    def _process_domain_folder(self, domain_path: str, stored: Dict[str, tuple] = None,
+                               sources: Dict[str, str] = None, counts: Dict[str, int] = None):
         """Process a domain folder or file"""
         try:
             if os.path.isfile(domain_path):
                 # Single PDDL file
-                if domain_path.endswith('.pddl'):
-                    domain_data = self.parse_pddl_domain(domain_path)
-                    if domain_data:
-                        self.kg.add_domain(domain_data)
-                        logger.info(f"Processed domain file: {domain_path}")
+                domain_files = [domain_path] if domain_path.endswith('.pddl') else []
             else:
                 # Directory containing PDDL files
-                pddl_files = [f for f in os.listdir(domain_path) if f.endswith('.pddl')]
-                for pddl_file in pddl_files:
-                    if pddl_file.startswith('domain'):
-                        domain_file_path = os.path.join(domain_path, pddl_file)
-                        domain_data = self.parse_pddl_domain(domain_file_path)
-                        if domain_data:
-                            self.kg.add_domain(domain_data)
-                            logger.info(f"Processed domain: {domain_data.name}")
+                domain_files = [os.path.join(domain_path, f) for f in sorted(os.listdir(domain_path))
+                                if f.endswith('.pddl') and f.startswith('domain')]
+            for domain_file_path in domain_files:
+                self._ingest_domain_file(domain_file_path, stored or {}, {} if sources is None else sources,
+                                         {"added": 0, "unchanged": 0} if counts is None else counts)
                             
         except Exception as e:
             logger.error(f"Error processing domain path {domain_path}: {e}")
             raise
     
+    def _ingest_domain_file(self, domain_file_path: str, stored: Dict[str, tuple], sources: Dict[str, str],
+                            counts: Dict[str, int]):
+        """Add a domain file unless its content hash is already stored; the first file of a domain name wins"""
+        with open(domain_file_path, 'rb') as f:
+            content = f.read()
+        source_id = os.path.relpath(domain_file_path)
+        stored_hash, stored_name = stored.get(source_id, (None, None))
+        if stored_hash == content_hash(content) and sources.get(stored_name, source_id) == source_id:
+            sources[stored_name] = source_id
+            counts["unchanged"] += 1
+            logger.info(f"Unchanged domain: {stored_name} ({source_id})")
+            return
+        
+        domain_data = self.parse_pddl_domain(domain_file_path, content)
+        if not domain_data:
+            return
+        if sources.get(domain_data.name, source_id) != source_id:
+            logger.info(f"Skipping {source_id}: domain {domain_data.name} is already read from "
+                        f"{sources[domain_data.name]}")
+            return
+        sources[domain_data.name] = source_id
+        if stored_name and stored_name != domain_data.name:
+            # the file renamed its domain
+            with self.kg.driver.session(database=self.neo4j_database) as session:
+                session.run("MATCH (d:Domain {name: $name}) DETACH DELETE d", {'name': stored_name})
+        self.kg.add_domain(domain_data)
+        counts["added"] += 1
+        logger.info(f"Processed domain: {domain_data.name}")
+    
     def verify_data_ingestion(self):
         """Verify that data has been properly ingested into the knowledge graph"""
         try:
@@ -769,11 +857,17 @@ class PDDLKnowledgeGraphInitializer:
 
 def main():
     """Main function to initialize and populate the knowledge graph"""
-    import sys
+    import argparse
     
+    parser = argparse.ArgumentParser(description="Initialize and update the PDDL knowledge graph")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="delete the whole graph first instead of updating only changed sources")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="rows per UNWIND write (default: KG_BATCH_SIZE or 500)")
+    args = parser.parse_args()
     
     # Original initialization flow
-    initializer = PDDLKnowledgeGraphInitializer()
+    initializer = PDDLKnowledgeGraphInitializer(batch_size=args.batch_size)
     
     try:
         # Step 1: Initialize knowledge graph
@@ -785,11 +879,14 @@ def main():
             print("[ERROR] Failed to initialize knowledge graph")
             return False
         
-        # Step 2: Clear existing data to start fresh
-        print("\n[WARNING]  Clearing existing data...")
-        if not initializer.clear_existing_data():
-            print("[ERROR] Failed to clear existing data")
-            return False
+        # Step 2: Clear existing data to start fresh; otherwise unchanged sources are skipped
+        if args.rebuild:
+            print("\n[WARNING]  Clearing existing data...")
+            if not initializer.clear_existing_data():
+                print("[ERROR] Failed to clear existing data")
+                return False
+        else:
+            print("\n[INFO] Updating changed sources only (use --rebuild to start fresh)...")
         
         # Step 3: Populate with domain data
         print("\n[INFO] Populating knowledge graph with PDDL domains...")
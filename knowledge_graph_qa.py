@@ -2,46 +2,157 @@
 Simplified Knowledge Graph for PDDL QA Bot
 """
 import logging
+import os
 import time
 from typing import List, Dict, Any
 from neo4j import GraphDatabase
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings as CommunityHuggingFaceEmbeddings
-import numpy as np
+from tracing import span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# rows sent per UNWIND statement
+BATCH_SIZE = int(os.getenv("KG_BATCH_SIZE", "500"))
+# texts per embed_documents call; all-MiniLM-L6-v2 on CPU levels off around 64
+EMBEDDING_BATCH_SIZE = int(os.getenv("KG_EMBEDDING_BATCH_SIZE", "64"))
+# seconds between embedding requests to a remote backend (~33 requests per minute)
+EMBEDDING_MIN_INTERVAL = float(os.getenv("KG_EMBEDDING_MIN_INTERVAL", "1.8"))
+# embedding classes that run in process and need no rate limiting
+LOCAL_EMBEDDINGS = {"HuggingFaceEmbeddings", "HuggingFaceBgeEmbeddings", "SentenceTransformerEmbeddings",
+                    "FakeEmbeddings", "DeterministicFakeEmbedding"}
+
+# every node with an embedding also carries this label, which the vector index covers
+EMBEDDING_LABEL = "Embedded"
+SIMILARITY_THRESHOLD = 0.3
+# nearest neighbours fetched per result when results are filtered by label; the count grows by
+# this factor until enough results pass the filter or no more nodes are above the threshold
+LABEL_FILTER_CANDIDATES = 5
+# size of the _simple_text_embedding fallback
+SIMPLE_EMBEDDING_DIMENSIONS = 128
+
+DOMAIN_QUERY = """
+    MERGE (d:Domain {name: $name})
+    SET d:Embedded,
+        d.description = $description,
+        d.file_path = $file_path,
+        d.num_actions = $num_actions,
+        d.num_predicates = $num_predicates,
+        d.num_types = $num_types,
+        d.source_id = $source_id,
+        d.content_hash = $content_hash,
+        d.embedding = $embedding
+"""
+
+PRUNE_DOMAIN_QUERY = """
+    MATCH (d:Domain {name: $name})-[r:HAS_ACTION|HAS_PREDICATE|HAS_TYPE]->(n)
+    WHERE NOT n.name IN CASE type(r)
+        WHEN 'HAS_ACTION' THEN $actions
+        WHEN 'HAS_PREDICATE' THEN $predicates
+        ELSE $types END
+    DELETE r
+    WITH DISTINCT n
+    WHERE NOT (n)<-[:HAS_ACTION|HAS_PREDICATE|HAS_TYPE]-()
+    DETACH DELETE n
+"""
+
+ACTIONS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (a:Action {name: row.name})
+    SET a:Embedded,
+        a.description = row.description,
+        a.parameters = row.parameters,
+        a.preconditions = row.preconditions,
+        a.effects = row.effects,
+        a.domain_name = row.domain_name,
+        a.embedding = row.embedding
+    WITH a, row
+    MATCH (d:Domain {name: row.domain_name})
+    MERGE (d)-[:HAS_ACTION]->(a)
+"""
+
+PREDICATES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (p:Predicate {name: row.name})
+    SET p:Embedded,
+        p.description = row.description,
+        p.parameters = row.parameters,
+        p.domain_name = row.domain_name,
+        p.embedding = row.embedding
+    WITH p, row
+    MATCH (d:Domain {name: row.domain_name})
+    MERGE (d)-[:HAS_PREDICATE]->(p)
+"""
+
+TYPES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (t:Type {name: row.name})
+    SET t:Embedded,
+        t.description = row.description,
+        t.supertypes = row.supertypes,
+        t.domain_name = row.domain_name,
+        t.embedding = row.embedding
+    WITH t, row
+    MATCH (d:Domain {name: row.domain_name})
+    MERGE (d)-[:HAS_TYPE]->(t)
+"""
+
+DELETE_ORPHANS_QUERY = """
+    MATCH (n)
+    WHERE (n:Action OR n:Predicate OR n:Type) AND NOT (n)<-[:HAS_ACTION|HAS_PREDICATE|HAS_TYPE]-()
+    DETACH DELETE n
+    RETURN count(n) AS deleted
+"""
+
 class PDDLKnowledgeGraphQA:
     """Simplified Knowledge Graph for PDDL QA"""
     
-    def __init__(self, uri: str, username: str, password: str, huggingface_token: str = None):
+    def __init__(self, uri: str, username: str, password: str, huggingface_token: str = None,
+                 batch_size: int = None, embeddings=None, embedding_batch_size: int = None):
         self.driver = GraphDatabase.driver(uri, auth=(username, password))
+        self.batch_size = batch_size or BATCH_SIZE
+        self.embedding_batch_size = embedding_batch_size or EMBEDDING_BATCH_SIZE
         # Try multiple embedding options
-        try:
-            from langchain_huggingface import HuggingFaceEmbeddings
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={'device': 'cpu'}
-            )
-        except ImportError:
+        if embeddings is not None:
+            self.embeddings = embeddings
+        else:
             try:
-                # Fallback to community embeddings
-                self.embeddings = CommunityHuggingFaceEmbeddings(
-                    model_name="sentence-transformers/all-MiniLM-L6-v2"
+                from langchain_huggingface import HuggingFaceEmbeddings
+                self.embeddings = HuggingFaceEmbeddings(
+                    model_name="sentence-transformers/all-MiniLM-L6-v2",
+                    model_kwargs={'device': 'cpu'},
+                    encode_kwargs={'batch_size': self.embedding_batch_size}
                 )
             except ImportError:
-                # Final fallback to simple text embeddings (using a hash-based approach)
-                self.embeddings = None
-                logger.warning("Could not load HuggingFace embeddings, using fallback method")
+                try:
+                    # Fallback to community embeddings
+                    from langchain_community.embeddings import HuggingFaceEmbeddings as CommunityHuggingFaceEmbeddings
+                    self.embeddings = CommunityHuggingFaceEmbeddings(
+                        model_name="sentence-transformers/all-MiniLM-L6-v2",
+                        encode_kwargs={'batch_size': self.embedding_batch_size}
+                    )
+                except ImportError:
+                    # Final fallback to simple text embeddings (using a hash-based approach)
+                    self.embeddings = None
+                    logger.warning("Could not load HuggingFace embeddings, using fallback method")
+        self.remote_embeddings = (self.embeddings is not None
+                                  and type(self.embeddings).__name__ not in LOCAL_EMBEDDINGS)
         self.last_api_call = 0  # Track last API call for rate limiting
+        # one vector index per embedding size, so switching the embedding backend never mixes sizes;
+        # a size the backend does not report is taken from the first embedding
+        self.embedding_dimensions = None
+        self.vector_index = None
         self._create_constraints_and_indices()
+        dimensions = self._configured_dimensions()
+        if dimensions:
+            self._create_vector_index(dimensions)
     
     def _rate_limit_delay(self):
-        """Add delay for consistency (HuggingFace embeddings don't need rate limiting)"""
+        """Space out requests to a remote embedding backend; local models are not rate limited"""
+        if not self.remote_embeddings:
+            return
         current_time = time.time()
         time_since_last = current_time - self.last_api_call
-        min_interval = 0.1  # Minimal delay for HuggingFace local embeddings
+        min_interval = EMBEDDING_MIN_INTERVAL
         
         if time_since_last < min_interval:
             sleep_time = min_interval - time_since_last
@@ -83,140 +194,146 @@ class PDDLKnowledgeGraphQA:
                 except Exception as e:
                     logger.debug(f"Index creation: {e}")
     
-    def add_domain(self, domain_data):
-        """Add a domain to the knowledge graph"""
+    def _configured_dimensions(self):
+        """Embedding size from the backend's model config, or None if it has to be learned from an embedding"""
+        if not self.embeddings:
+            return SIMPLE_EMBEDDING_DIMENSIONS
+        if os.getenv("KG_EMBEDDING_DIMENSIONS"):
+            return int(os.getenv("KG_EMBEDDING_DIMENSIONS"))
+        # the sentence-transformers model of the HuggingFace embedding classes
+        model = getattr(self.embeddings, "client", None)
+        if hasattr(model, "get_sentence_embedding_dimension"):
+            return model.get_sentence_embedding_dimension()
+        return None
+    
+    def _create_vector_index(self, dimensions: int):
+        self.embedding_dimensions = dimensions
+        self.vector_index = f"embedding_{dimensions}"
         with self.driver.session() as session:
-            # Create domain node with embedding
-            domain_text = f"{domain_data.name} {domain_data.description}"
-            self._rate_limit_delay()  # Add rate limiting delay
-            if self.embeddings:
-                embedding = self.embeddings.embed_query(domain_text)
-            else:
-                embedding = self._simple_text_embedding(domain_text)
-            
-            session.run("""
-                MERGE (d:Domain {name: $name})
-                SET d.description = $description,
-                    d.file_path = $file_path,
-                    d.num_actions = $num_actions,
-                    d.num_predicates = $num_predicates,
-                    d.num_types = $num_types,
-                    d.embedding = $embedding
-            """, {
+            try:
+                session.run(f"""
+                    CREATE VECTOR INDEX {self.vector_index} IF NOT EXISTS
+                    FOR (n:{EMBEDDING_LABEL}) ON (n.embedding)
+                    OPTIONS {{indexConfig: {{
+                        `vector.dimensions`: {dimensions},
+                        `vector.similarity_function`: 'cosine'
+                    }}}}
+                """)
+            except Exception as e:
+                logger.warning(f"Vector index creation failed (needs Neo4j 5.15 or later): {e}")
+    
+    def _ensure_vector_index(self, embedding: List[float]):
+        if self.vector_index is None:
+            self._create_vector_index(len(embedding))
+    
+    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents with one embed_documents call per embedding_batch_size texts"""
+        if not self.embeddings:
+            return [self._simple_text_embedding(text) for text in texts]
+        embeddings = []
+        with span("kg.embed_documents", "kg", texts=len(texts)):
+            for start in range(0, len(texts), self.embedding_batch_size):
+                self._rate_limit_delay()  # Add rate limiting delay
+                embeddings.extend(self.embeddings.embed_documents(texts[start:start + self.embedding_batch_size]))
+        if embeddings:
+            self._ensure_vector_index(embeddings[0])
+        return embeddings
+    
+    def _embedded_rows(self, rows: List[Dict[str, Any]], texts: List[str]) -> List[Dict[str, Any]]:
+        return [dict(row, embedding=embedding) for row, embedding in zip(rows, self.embed_texts(texts))]
+    
+    def write_rows(self, query: str, rows: List[Dict[str, Any]], tx=None, database: str = None, **params):
+        """Run an UNWIND $rows query in batches of batch_size, in the given transaction or a new one"""
+        if tx is None:
+            with self.driver.session(database=database) as session, session.begin_transaction() as tx:
+                self.write_rows(query, rows, tx, **params)
+                tx.commit()
+            return
+        for start in range(0, len(rows), self.batch_size):
+            tx.run(query, {'rows': rows[start:start + self.batch_size], **params})
+    
+    def add_domain(self, domain_data):
+        """Add a domain with all its actions, predicates and types in one transaction"""
+        # one embedding pipeline for the domain and everything it declares
+        texts = ([f"{domain_data.name} {domain_data.description}"]
+                 + [self._action_text(action) for action in domain_data.actions]
+                 + [self._predicate_text(predicate) for predicate in domain_data.predicates]
+                 + [self._type_text(type_data) for type_data in domain_data.types])
+        embeddings = iter(self.embed_texts(texts))
+        domain_embedding = next(embeddings)
+        actions = [dict(action, embedding=next(embeddings)) for action in domain_data.actions]
+        predicates = [dict(predicate, embedding=next(embeddings)) for predicate in domain_data.predicates]
+        types = [dict(type_data, supertypes=type_data.get('supertypes', []), embedding=next(embeddings))
+                 for type_data in domain_data.types]
+        
+        with self.driver.session() as session, session.begin_transaction() as tx:
+            tx.run(DOMAIN_QUERY, {
                 'name': domain_data.name,
                 'description': domain_data.description,
                 'file_path': domain_data.file_path,
                 'num_actions': len(domain_data.actions),
                 'num_predicates': len(domain_data.predicates),
                 'num_types': len(domain_data.types),
-                'embedding': embedding
+                'source_id': domain_data.source_id or None,
+                'content_hash': domain_data.content_hash or None,
+                'embedding': domain_embedding
             })
-            
-            logger.info(f"Added domain: {domain_data.name}")
-    
-    def add_action(self, action_data):
-        """Add an action to the knowledge graph"""
-        with self.driver.session() as session:
-            # Create action text for embedding
-            action_text = f"{action_data.name} {action_data.description} {' '.join(action_data.parameters)}"
-            self._rate_limit_delay()  # Add rate limiting delay
-            if self.embeddings:
-                embedding = self.embeddings.embed_query(action_text)
-            else:
-                embedding = self._simple_text_embedding(action_text)
-            
-            session.run("""
-                MERGE (a:Action {name: $name})
-                SET a.description = $description,
-                    a.parameters = $parameters,
-                    a.preconditions = $preconditions,
-                    a.effects = $effects,
-                    a.domain_name = $domain_name,
-                    a.embedding = $embedding
-                
-                // Link to domain
-                WITH a
-                MATCH (d:Domain {name: $domain_name})
-                MERGE (d)-[:HAS_ACTION]->(a)
-            """, {
-                'name': action_data.name,
-                'description': action_data.description,
-                'parameters': action_data.parameters,
-                'preconditions': action_data.preconditions,
-                'effects': action_data.effects,
-                'domain_name': action_data.domain_name,
-                'embedding': embedding
+            # items the domain no longer declares lose their link, and are deleted if no domain links them
+            tx.run(PRUNE_DOMAIN_QUERY, {
+                'name': domain_data.name,
+                'actions': [row['name'] for row in actions],
+                'predicates': [row['name'] for row in predicates],
+                'types': [row['name'] for row in types]
             })
+            self.write_rows(ACTIONS_QUERY, actions, tx)
+            self.write_rows(PREDICATES_QUERY, predicates, tx)
+            self.write_rows(TYPES_QUERY, types, tx)
+            tx.commit()
+        
+        logger.info(f"Added domain: {domain_data.name} ({len(actions)} actions, {len(predicates)} predicates, "
+                    f"{len(types)} types)")
     
-    def add_predicate(self, predicate_data):
-        """Add a predicate to the knowledge graph"""
-        with self.driver.session() as session:
-            # Create predicate text for embedding
-            pred_text = f"{predicate_data.name} {predicate_data.description} {' '.join(predicate_data.parameters)}"
-            self._rate_limit_delay()  # Add rate limiting delay
-            if self.embeddings:
-                embedding = self.embeddings.embed_query(pred_text)
-            else:
-                embedding = self._simple_text_embedding(pred_text)
-            
-            session.run("""
-                MERGE (p:Predicate {name: $name})
-                SET p.description = $description,
-                    p.parameters = $parameters,
-                    p.domain_name = $domain_name,
-                    p.embedding = $embedding
-                
-                // Link to domain
-                WITH p
-                MATCH (d:Domain {name: $domain_name})
-                MERGE (d)-[:HAS_PREDICATE]->(p)
-            """, {
-                'name': predicate_data.name,
-                'description': predicate_data.description,
-                'parameters': predicate_data.parameters,
-                'domain_name': predicate_data.domain_name,
-                'embedding': embedding
-            })
+    def add_actions(self, actions: List[Dict[str, Any]]):
+        """Add actions (ActionData dicts) and link them to their domains"""
+        self.write_rows(ACTIONS_QUERY, self._embedded_rows(actions, [self._action_text(a) for a in actions]))
+    
+    def add_predicates(self, predicates: List[Dict[str, Any]]):
+        """Add predicates (PredicateData dicts) and link them to their domains"""
+        self.write_rows(PREDICATES_QUERY, self._embedded_rows(
+            predicates, [self._predicate_text(p) for p in predicates]))
     
-    def add_type(self, type_data):
-        """Add a type to the knowledge graph"""
+    def add_types(self, types: List[Dict[str, Any]]):
+        """Add types and link them to their domains"""
+        rows = [dict(type_data, supertypes=type_data.get('supertypes', [])) for type_data in types]
+        self.write_rows(TYPES_QUERY, self._embedded_rows(rows, [self._type_text(t) for t in types]))
+    
+    def delete_orphans(self) -> int:
+        """Delete actions, predicates and types that no domain links to; returns the number deleted"""
         with self.driver.session() as session:
-            type_text = f"{type_data['name']} {type_data['description']}"
-            if self.embeddings:
-                embedding = self.embeddings.embed_query(type_text)
-            else:
-                embedding = self._simple_text_embedding(type_text)
-            
-            session.run("""
-                MERGE (t:Type {name: $name})
-                SET t.description = $description,
-                    t.domain_name = $domain_name,
-                    t.embedding = $embedding
-                
-                // Link to domain
-                WITH t
-                MATCH (d:Domain {name: $domain_name})
-                MERGE (d)-[:HAS_TYPE]->(t)
-            """, {
-                'name': type_data['name'],
-                'description': type_data['description'],
-                'domain_name': type_data['domain_name'],
-                'embedding': embedding
-            })
+            return session.run(DELETE_ORPHANS_QUERY).single()["deleted"]
+    
+    @staticmethod
+    def _action_text(action: Dict[str, Any]) -> str:
+        return f"{action['name']} {action['description']} {' '.join(action['parameters'])}"
+    
+    @staticmethod
+    def _predicate_text(predicate: Dict[str, Any]) -> str:
+        return f"{predicate['name']} {predicate['description']} {' '.join(predicate['parameters'])}"
+    
+    @staticmethod
+    def _type_text(type_data: Dict[str, Any]) -> str:
+        return f"{type_data['name']} {type_data['description']}"
     
     def add_task(self, task_data):
         """Add an ALFWORLD task to the knowledge graph"""
         with self.driver.session() as session:
             task_text = f"{task_data['task_type']} {task_data['target_object']} {task_data['toggle_target']} {task_data['description']}"
-            self._rate_limit_delay()
-            if self.embeddings:
-                embedding = self.embeddings.embed_query(task_text)
-            else:
-                embedding = self._simple_text_embedding(task_text)
+            embedding = self.embed_texts([task_text])[0]
             
             session.run("""
                 MERGE (t:Task {task_id: $task_id, trial_id: $trial_id})
-                SET t.task_type = $task_type,
+                SET t:Embedded,
+                    t.task_type = $task_type,
                     t.target_object = $target_object,
                     t.toggle_target = $toggle_target,
                     t.description = $description,
@@ -239,15 +356,12 @@ class PDDLKnowledgeGraphQA:
         """Add an ALFWORLD initial state to the knowledge graph"""
         with self.driver.session() as session:
             state_text = f"Initial state for {initial_state_data['trial_id']}: {' '.join(initial_state_data['predicates'][:10])}"
-            self._rate_limit_delay()
-            if self.embeddings:
-                embedding = self.embeddings.embed_query(state_text)
-            else:
-                embedding = self._simple_text_embedding(state_text)
+            embedding = self.embed_texts([state_text])[0]
             
             session.run("""
                 MERGE (i:InitialState {trial_id: $trial_id})
-                SET i.predicates = $predicates,
+                SET i:Embedded,
+                    i.predicates = $predicates,
                     i.objects = $objects,
                     i.locations = $locations,
                     i.receptacles = $receptacles,
@@ -266,38 +380,54 @@ class PDDLKnowledgeGraphQA:
                 'embedding': embedding
             })
     
-    def similarity_search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Perform semantic similarity search"""
-        if self.embeddings:
-            query_embedding = self.embeddings.embed_query(query)
-        else:
-            # Fallback: simple hash-based embedding
-            query_embedding = self._simple_text_embedding(query)
+    def similarity_search(self, query: str, limit: int = 10, labels: List[str] = None) -> List[Dict[str, Any]]:
+        """Perform semantic similarity search over the vector index, optionally only over nodes with one of labels"""
+        with span("kg.embed_query", "kg"):
+            if self.embeddings:
+                query_embedding = self.embeddings.embed_query(query)
+            else:
+                # Fallback: simple hash-based embedding
+                query_embedding = self._simple_text_embedding(query)
         
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (n)
-                WHERE n.embedding IS NOT NULL
-                WITH n, 
-                     gds.similarity.cosine(n.embedding, $query_embedding) AS similarity
-                WHERE similarity > 0.3
-                RETURN n, similarity
-                ORDER BY similarity DESC
-                LIMIT $limit
-            """, {
-                'query_embedding': query_embedding,
-                'limit': limit
-            })
+        self._ensure_vector_index(query_embedding)
+        
+        # without a label filter the nearest `limit` nodes are the answer; with one, more candidates
+        # are fetched until `limit` of them match or the index has no more nodes above the threshold
+        candidates = limit * LABEL_FILTER_CANDIDATES if labels else limit
+        with span("neo4j.query", "neo4j", query="similarity_search") as current, self.driver.session() as session:
+            while True:
+                # the index scores cosine similarity as (1 + cos) / 2
+                record = session.run("""
+                    CALL db.index.vector.queryNodes($index, $candidates, $query_embedding)
+                    YIELD node AS n, score
+                    WITH n, 2 * score - 1 AS similarity
+                    WHERE similarity > $threshold
+                    WITH collect({n: n, similarity: similarity}) AS hits
+                    RETURN size(hits) AS found,
+                           [hit IN hits WHERE $labels IS NULL
+                                OR any(label IN labels(hit.n) WHERE label IN $labels)][..$limit] AS hits
+                """, {
+                    'index': self.vector_index,
+                    'candidates': candidates,
+                    'query_embedding': query_embedding,
+                    'threshold': SIMILARITY_THRESHOLD,
+                    'labels': labels,
+                    'limit': limit
+                }).single()
+                if len(record['hits']) >= limit or record['found'] < candidates:
+                    break
+                candidates *= LABEL_FILTER_CANDIDATES
+            current.set(candidates=candidates)
             
             results = []
-            for record in result:
-                node = record['n']
-                similarity = record['similarity']
+            for hit in record['hits']:
+                node = hit['n']
+                similarity = hit['similarity']
                 
                 results.append({
                     'node': dict(node),
                     'similarity': similarity,
-                    'labels': list(node.labels)
+                    'labels': [label for label in node.labels if label != EMBEDDING_LABEL]
                 })
             
             return results
@@ -330,7 +460,7 @@ class PDDLKnowledgeGraphQA:
     
     def get_all_domains(self) -> List[Dict[str, Any]]:
         """Get all domains"""
-        with self.driver.session() as session:
+        with span("neo4j.query", "neo4j", query="get_all_domains"), self.driver.session() as session:
             result = session.run("""
                 MATCH (d:Domain)
                 RETURN d.name AS name, d.description AS description,
@@ -342,7 +472,7 @@ class PDDLKnowledgeGraphQA:
     
     def get_actions_by_domain(self, domain_name: str) -> List[Dict[str, Any]]:
         """Get all actions for a domain"""
-        with self.driver.session() as session:
+        with span("neo4j.query", "neo4j", query="get_actions_by_domain"), self.driver.session() as session:
             result = session.run("""
                 MATCH (d:Domain {name: $domain_name})-[:HAS_ACTION]->(a:Action)
                 RETURN a.name AS name, a.description AS description,
@@ -354,7 +484,7 @@ class PDDLKnowledgeGraphQA:
     
     def get_predicates_by_domain(self, domain_name: str) -> List[Dict[str, Any]]:
         """Get all predicates for a domain"""
-        with self.driver.session() as session:
+        with span("neo4j.query", "neo4j", query="get_predicates_by_domain"), self.driver.session() as session:
             result = session.run("""
                 MATCH (d:Domain {name: $domain_name})-[:HAS_PREDICATE]->(p:Predicate)
                 RETURN p.name AS name, p.description AS description,
@@ -366,11 +496,11 @@ class PDDLKnowledgeGraphQA:
     
     def get_stats(self) -> Dict[str, int]:
         """Get knowledge graph statistics"""
-        with self.driver.session() as session:
+        with span("neo4j.query", "neo4j", query="get_stats"), self.driver.session() as session:
             result = session.run("""
                 MATCH (n)
-                RETURN labels(n)[0] AS node_type, count(n) AS count
-            """)
+                RETURN [label IN labels(n) WHERE label <> $embedding_label][0] AS node_type, count(n) AS count
+            """, {'embedding_label': EMBEDDING_LABEL})
             
             stats = {}
             total = 0
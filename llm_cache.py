@@ -0,0 +1,62 @@
+"""
+Content-Addressed Cache for LLM Responses
+Responses are stored on disk under a hash of model, prompt and sampling parameters,
+so re-running a sweep does not pay for the same completions twice. In replay mode a
+cache miss raises instead of calling the API.
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from disk_cache import DiskCache
+
+
+class CacheMissError(Exception):
+    """Raised in replay mode when a request has no recorded response"""
+
+
+class ResponseCache(DiskCache):
+    """On-disk LLM response cache with size- and age-based eviction"""
+
+    name = "LLM cache"
+
+    def __init__(self, directory: str = "cache/llm", max_bytes: int = 1024 * 1024 * 1024,
+                 max_age_days: float = 30.0, replay: bool = False):
+        self.replay = replay
+        super().__init__(directory, max_bytes, max_age_days)
+
+    @staticmethod
+    def make_key(model: str, message: str, params: Dict[str, Any]) -> str:
+        """Hash of everything that determines the completion"""
+        payload = json.dumps({"model": model, "message": message, "params": params},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached record, or None (CacheMissError in replay mode)"""
+        path = self._path(key)
+        try:
+            if path is None:
+                raise FileNotFoundError(key)
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            if not self.replay and time.time() - record.get("created", 0) > self.max_age:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            os.utime(path)  # mtime tracks last use for LRU eviction
+            return record
+        except (FileNotFoundError, json.JSONDecodeError):
+            if self.replay:
+                raise CacheMissError(f"No recorded LLM response for key {key}")
+            return None
+
+    def put(self, key: str, record: Dict[str, Any]):
+        """Store a record atomically"""
+        self._write(key, record)
+
+    def evict(self):
+        """Evict expired and least recently used entries; recorded responses are kept in replay mode"""
+        if not self.replay:
+            super().evict()
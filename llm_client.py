@@ -0,0 +1,343 @@
+"""
+Shared LLM Client for the PDDL Framework
+All Cohere traffic of the process goes through one asyncio client, so a single
+concurrency limit and request-rate limit govern planning, repair and RAG calls.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from llm_cache import ResponseCache
+
+try:
+    import httpx  # the Cohere SDK's transport
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "command-r-plus"
+
+
+class LLMResponse(NamedTuple):
+    text: str
+    input_tokens: int
+    output_tokens: int
+    latency: float
+    attempts: int
+    cached: bool = False
+    stopped_early: bool = False  # a streamed completion was cut off by its on_text callback
+
+
+class RetryPolicy(NamedTuple):
+    """Bounded exponential backoff with jitter"""
+    max_attempts: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class TokenBucket:
+    """Token bucket limiting how many requests are started per second"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on in-flight requests: halved on throttling, +1 after a full window of successes"""
+
+    def __init__(self, maximum: int, minimum: int = 1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = maximum
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False):
+        async with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit // 2)
+                self._successes = 0
+                logger.warning(f"LLM rate limited, concurrency reduced to {self.limit}")
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    return _status_code(error) == 429 or type(error).__name__ == "TooManyRequestsError"
+
+
+# connection failures and timeouts; any other exception without an HTTP status is a bug or a bad response
+TRANSPORT_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError) + \
+                   ((httpx.TransportError,) if httpx is not None else ())
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Retry throttling, server errors and transport errors; everything else fails on the first attempt"""
+    status = _status_code(error)
+    if _is_rate_limited(error) or (isinstance(status, int) and status >= 500):
+        return True
+    return status is None and isinstance(error, TRANSPORT_ERRORS)
+
+
+def _cache_params(params: Dict[str, Any], sample: Optional[str]) -> Dict[str, Any]:
+    """Parameters a response is cached under; requests without a sample keep their existing keys"""
+    return params if sample is None else dict(params, sample=sample)
+
+
+class LLMClient:
+    """Concurrency- and rate-limited Cohere chat client running on its own event loop"""
+
+    def __init__(self, api_key: str = None, max_concurrency: int = 4,
+                 requests_per_second: float = 1.0, retry_policy: RetryPolicy = None,
+                 cache: ResponseCache = None, stream: bool = False):
+        self.api_key = api_key or os.getenv("COHERE_API_KEY")
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.stream = stream  # PDDL-generating callers stream and stop once their blocks are complete
+
+        # the loop runs in a background thread so synchronous callers (and sweep workers) can share it
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._setup(), self._loop).result()
+
+    async def _setup(self):
+        if self.cache is not None and self.cache.replay:
+            self._client = None  # replay never reaches the API
+        else:
+            import cohere
+            self._client = cohere.AsyncClient(api_key=self.api_key)
+        self._limiter = AdaptiveConcurrencyLimiter(self.max_concurrency)
+        self._bucket = TokenBucket(self.requests_per_second, capacity=self.max_concurrency)
+
+    async def achat(self, message: str, model: str = DEFAULT_MODEL, sample: str = None, **params) -> LLMResponse:
+        """Send one chat request, retrying throttling and transient errors under the retry policy.
+        sample names an independent sample of a sampled request, so that each one is cached on its own"""
+        start_time = time.time()
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key(model, message, _cache_params(params, sample))
+            record = self.cache.get(cache_key)
+            if record is not None:
+                return LLMResponse(
+                    text=record["text"],
+                    input_tokens=record.get("input_tokens", 0),
+                    output_tokens=record.get("output_tokens", 0),
+                    latency=time.time() - start_time,
+                    attempts=0,
+                    cached=True
+                )
+
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            await self._limiter.acquire()
+            throttled = False
+            try:
+                response = await self._client.chat(model=model, message=message, **params)
+            except Exception as e:
+                throttled = _is_rate_limited(e)
+                attempt += 1
+                if attempt >= self.retry_policy.max_attempts or not _is_retryable(e):
+                    raise
+                logger.warning(f"LLM request failed (attempt {attempt}/{self.retry_policy.max_attempts}): {e}")
+            else:
+                billed = getattr(getattr(response, "meta", None), "billed_units", None)
+                result = LLMResponse(
+                    text=response.text,
+                    input_tokens=int(getattr(billed, "input_tokens", 0) or 0),
+                    output_tokens=int(getattr(billed, "output_tokens", 0) or 0),
+                    latency=time.time() - start_time,
+                    attempts=attempt + 1
+                )
+                if cache_key is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self.cache.put, cache_key, {
+                        "model": model,
+                        "params": params,
+                        "text": result.text,
+                        "input_tokens": result.input_tokens,
+                        "output_tokens": result.output_tokens
+                    })
+                return result
+            finally:
+                await self._limiter.release(throttled)
+
+            await asyncio.sleep(self.retry_policy.delay(attempt - 1))
+
+    def chat(self, message: str, model: str = DEFAULT_MODEL, sample: str = None, **params) -> LLMResponse:
+        """Blocking wrapper around achat for synchronous callers"""
+        future = asyncio.run_coroutine_threadsafe(self.achat(message, model, sample, **params), self._loop)
+        return future.result()
+
+    async def astream_chat(self, message: str, on_text: Callable[[str], bool], model: str = DEFAULT_MODEL,
+                           sample: str = None, **params) -> LLMResponse:
+        """Stream one chat request, passing each text chunk to on_text; a True return ends the stream.
+        Requests are retried only while no text has arrived."""
+        start_time = time.time()
+        cache_key = None
+        if self.cache is not None:
+            # a cut-off completion differs from the full one, so it is cached separately
+            cache_key = ResponseCache.make_key(model, message, dict(_cache_params(params, sample), stream=True))
+            record = self.cache.get(cache_key)
+            if record is not None:
+                on_text(record["text"])
+                return LLMResponse(
+                    text=record["text"],
+                    input_tokens=record.get("input_tokens", 0),
+                    output_tokens=record.get("output_tokens", 0),
+                    latency=time.time() - start_time,
+                    attempts=0,
+                    cached=True,
+                    stopped_early=record.get("stopped_early", False)
+                )
+
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            await self._limiter.acquire()
+            throttled = False
+            chunks = []
+            stopped_early = False
+            billed = None
+            try:
+                stream = self._client.chat_stream(model=model, message=message, **params)
+                try:
+                    async for event in stream:
+                        event_type = getattr(event, "event_type", None)
+                        if event_type == "text-generation":
+                            chunks.append(event.text)
+                            if on_text(event.text):
+                                stopped_early = True
+                                break
+                        elif event_type == "stream-end":
+                            billed = getattr(getattr(getattr(event, "response", None), "meta", None),
+                                             "billed_units", None)
+                finally:
+                    if hasattr(stream, "aclose"):
+                        await stream.aclose()
+            except Exception as e:
+                throttled = _is_rate_limited(e)
+                attempt += 1
+                if chunks or attempt >= self.retry_policy.max_attempts or not _is_retryable(e):
+                    raise
+                logger.warning(f"LLM stream failed (attempt {attempt}/{self.retry_policy.max_attempts}): {e}")
+            else:
+                result = LLMResponse(
+                    text="".join(chunks),
+                    input_tokens=int(getattr(billed, "input_tokens", 0) or 0),
+                    # a cut-off stream reports no usage; each text event carries about one token
+                    output_tokens=int(getattr(billed, "output_tokens", 0) or 0) if billed else len(chunks),
+                    latency=time.time() - start_time,
+                    attempts=attempt + 1,
+                    stopped_early=stopped_early
+                )
+                if cache_key is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self.cache.put, cache_key, {
+                        "model": model,
+                        "params": params,
+                        "text": result.text,
+                        "input_tokens": result.input_tokens,
+                        "output_tokens": result.output_tokens,
+                        "stopped_early": stopped_early
+                    })
+                return result
+            finally:
+                await self._limiter.release(throttled)
+
+            await asyncio.sleep(self.retry_policy.delay(attempt - 1))
+
+    def chat_stream(self, message: str, on_text: Callable[[str], bool], model: str = DEFAULT_MODEL,
+                    sample: str = None, **params) -> LLMResponse:
+        """Blocking wrapper around astream_chat; on_text runs on the client's event loop and must be quick"""
+        future = asyncio.run_coroutine_threadsafe(self.astream_chat(message, on_text, model, sample, **params),
+                                                  self._loop)
+        return future.result()
+
+    def close(self):
+        """Stop the client's event loop"""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_client = None
+_client_lock = threading.Lock()
+_client_config = {
+    "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+    "requests_per_second": float(os.getenv("LLM_REQUESTS_PER_SECOND", "1.0")),
+    "use_cache": os.getenv("LLM_CACHE", "1") != "0",
+    "cache_dir": os.getenv("LLM_CACHE_DIR", "cache/llm"),
+    "cache_max_mb": float(os.getenv("LLM_CACHE_MAX_MB", "1024")),
+    "cache_max_age_days": float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30")),
+    "replay": False,
+    "stream": os.getenv("LLM_STREAM", "0") == "1",
+}
+
+
+def configure_llm_client(**config):
+    """Set options for the process-wide client; must be called before its first use"""
+    if _client is not None:
+        raise RuntimeError("LLM client is already running")
+    _client_config.update({k: v for k, v in config.items() if v is not None})
+
+
+def get_llm_client(api_key: str = None) -> LLMClient:
+    """Return the process-wide LLM client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            cache = None
+            if _client_config["use_cache"] or _client_config["replay"]:
+                cache = ResponseCache(
+                    directory=_client_config["cache_dir"],
+                    max_bytes=int(_client_config["cache_max_mb"] * 1024 * 1024),
+                    max_age_days=_client_config["cache_max_age_days"],
+                    replay=_client_config["replay"]
+                )
+            _client = LLMClient(
+                api_key=api_key,
+                max_concurrency=_client_config["max_concurrency"],
+                requests_per_second=_client_config["requests_per_second"],
+                cache=cache,
+                stream=_client_config["stream"]
+            )
+        return _client
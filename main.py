@@ -1,15 +1,34 @@
 import argparse
+import contextvars
 import glob
 import os
+import shutil
+import sys
+import threading
 import time
-import backoff
-import subprocess
 import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional
 from dotenv import load_dotenv
-from graph_rag_qa import PDDLGraphRAGQA
-from kg_initializer import PDDLKnowledgeGraphInitializer
-
-import cohere
+from fd_runner import TIMEOUT_EXIT_CODE, FDJob, FDResult, configure_planner_pool, get_planner_pool
+from fd_stats import UNSOLVABLE_CODES, PlannerStats, exit_status, format_stats, parse_planner_output
+from llm_cache import CacheMissError
+from pddl_repair import repair_pddl
+from pddl_stream import PDDLBlockExtractor
+from prompt_packing import PromptPacker, split_packed_response
+from pddl_validator import format_issues, has_errors, validate_domain, validate_pddl
+from plan_validator import UnsupportedTaskError, validate_plan_file
+from plan_cache import configure_plan_cache, get_plan_cache
+from rag_context import get_rag_context, shutdown_rag_context
+from results_log import TaskRecord, configure_results_log, get_results_log
+from strips_planner import configure_fast_path, try_fast_path
+from tracing import configure_tracing, export_trace, span
+from llm_client import LLMResponse, configure_llm_client, get_llm_client
+
+# the knowledge graph stack (neo4j, langchain, embeddings, nltk) is imported only by the RAG method
+if TYPE_CHECKING:
+    from graph_rag_qa import PDDLGraphRAGQA
 
 load_dotenv()
 
@@ -22,6 +41,19 @@ NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
 # FAST_DOWNWARD_ALIAS = "lama"
 # FAST_DOWNWARD_ALIAS = "seq-opt-fdss-1"
 FAST_DOWNWARD_ALIAS = "seq-opt-lmcut"  # Default alias for Fast Downward planner
+PREVALIDATION_EXIT_CODE = 31  # fast-downward's exit code for translator input errors
+
+# output limit of a packed request answering several tasks
+PACKED_MAX_TOKENS = 4000
+
+# sampling parameters of the PDDL and plan generation calls
+GENERATION_PARAMS = {
+    "temperature": 0.0,
+    "max_tokens": 2048,
+    "p": 1.0,  # equivalent to top_p
+    "frequency_penalty": 0.0,
+    "presence_penalty": 0.0
+}
 
 
 def get_cost(x):
@@ -38,35 +70,83 @@ def get_cost(x):
         cost = float(splitted[counter+2])
     return cost
 
-def run_command_with_timeout(command, timeout_seconds=200, capture_output=False):
-    """Run a command with timeout and return exit code, optionally capture output"""
-    try:
-        if capture_output:
-            result = subprocess.run(
-                command,
-                shell=True,
-                timeout=timeout_seconds,
-                capture_output=True,
-                text=True
-            )
-            return result.returncode, result.stdout, result.stderr
-        else:
-            result = subprocess.run(
-                command,
-                shell=True,
-                timeout=timeout_seconds,
-                capture_output=False,
-                text=True
-            )
-            return result.returncode, "", ""
-    except subprocess.TimeoutExpired:
-        error_msg = f"Command timed out after {timeout_seconds} seconds"
-        print(error_msg)
-        return -1, "", error_msg  # Timeout error code
-    except Exception as e:
-        error_msg = f"Command failed with error: {e}"
-        print(error_msg)
-        return -2, "", error_msg  # Other error code
+def prevalidate_planner_input(domain_file, problem_file, plan_file=None):
+    """Validate PDDL in-process; returns a failed FDResult if fast-downward would reject it, else None"""
+    with open(domain_file, "r", encoding="utf-8", errors="replace") as f:
+        domain_pddl = f.read()
+    with open(problem_file, "r", encoding="utf-8", errors="replace") as f:
+        problem_pddl = f.read()
+
+    issues = validate_pddl(domain_pddl, problem_pddl)
+    if issues:
+        print(format_issues(issues))
+    if not has_errors(issues):
+        return None
+
+    # fast-downward removes stale plans before it runs, so do the same when skipping it
+    if plan_file:
+        for fn in glob.glob(glob.escape(plan_file)) + glob.glob(f"{glob.escape(plan_file)}.[0-9]*"):
+            os.remove(fn)
+    print("[info] pre-validation failed, skipping fast-downward")
+    return FDResult(
+        exit_code=PREVALIDATION_EXIT_CODE,
+        stdout="Pre-validation failed:\n" + format_issues(issues),
+        stderr="",
+        wall_time=0.0,
+        cpu_time=0.0,
+        peak_rss_kb=0
+    )
+
+def run_planner(domain_file, problem_file, plan_file=None, sas_file=None, time_limit=200, memory_limit_mb=None,
+                prevalidate=True):
+    """Plan with Fast Downward on the shared planner pool and return its FDResult"""
+    with span("planner", "planner") as current:
+        result = _run_planner(domain_file, problem_file, plan_file, sas_file, time_limit, memory_limit_mb, prevalidate)
+        stats = result.stats
+        print(f"[info] planner stats: {format_stats(stats)}")
+        current.set(**{k: v for k, v in stats._asdict().items() if v is not None})
+    return result
+
+def _run_planner(domain_file, problem_file, plan_file, sas_file, time_limit, memory_limit_mb, prevalidate):
+    if prevalidate:
+        with span("prevalidate", "planner"):
+            result = prevalidate_planner_input(domain_file, problem_file, plan_file)
+        if result:
+            return result
+
+    job = FDJob(
+        domain_file=domain_file,
+        problem_file=problem_file,
+        plan_file=plan_file,
+        sas_file=sas_file,
+        alias=FAST_DOWNWARD_ALIAS,
+        time_limit=time_limit
+    )
+    if memory_limit_mb:
+        job = job._replace(memory_limit_mb=memory_limit_mb)
+
+    plan_cache = get_plan_cache()
+    if plan_cache:
+        with span("plan_cache.lookup", "planner") as current:
+            result = plan_cache.lookup(job)
+            current.set(hit=result is not None)
+        if result:
+            print(f"[info] plan cache hit, skipping fast-downward (exit code {result.exit_code})")
+            return result
+
+    with span("fast_path", "planner") as current:
+        result = try_fast_path(job)
+        current.set(solved=result is not None)
+    if result:
+        print(f"[info] solved in-process in {result.wall_time:.2f} sec, skipping fast-downward "
+              f"(exit code {result.exit_code})")
+    else:
+        result = get_planner_pool().run(job)
+        print(f"[info] planner took {result.wall_time:.2f} sec wall, {result.cpu_time:.2f} sec CPU, "
+              f"peak RSS {result.peak_rss_kb / 1024:.1f} MB")
+    if plan_cache:
+        plan_cache.store(job, result)
+    return result
 
 class Blocksworld:
     def __init__(self):
@@ -206,9 +286,11 @@ class Gripper:
     def get_domain_nl_file(self):return f"./domains/gripper/domain.nl"
 
 class Planner:
-    def __init__(self):
+    def __init__(self, pack_size=1):
         self.cohere_api_key = os.getenv("COHERE_API_KEY")
-        self.client = cohere.Client(self.cohere_api_key)
+        self.client = get_llm_client(self.cohere_api_key)
+        # answers several problem-only tasks of a sweep with one request
+        self.packer = PromptPacker(pack_size) if pack_size > 1 else None
 
     def create_llm_prompt(self, task_nl, domain_nl):
         # Baseline 1 (LLM-as-P): directly ask the LLM for plan
@@ -259,32 +341,79 @@ class Planner:
                  f"Make sure both files use consistent naming and types. Do not provide any other explanations."
         return prompt
 
+    def create_llm_ic_pddl_problem_prompt(self, task_nl, domain_pddl, context):
+        # Generate only the problem PDDL file; the given domain is used as is
+        context_nl, context_pddl, _ = context
+        prompt = f"I want you to solve planning problems. " + \
+                 f"Here is the domain PDDL file: \n {domain_pddl} \n" + \
+                 f"An example planning problem is: \n {context_nl} \n" + \
+                 f"The problem PDDL file to this problem is: \n {context_pddl} \n" + \
+                 f"Now I have a new planning problem and its description is: \n {task_nl} \n" + \
+                 f"Provide me with ONLY the problem PDDL file that describes the new planning problem " + \
+                 f"for the domain above; do not repeat the domain. Format your response as follows:\n" + \
+                 f"PROBLEM:\n[problem PDDL content]\n\n" + \
+                 f"Use exactly the domain name, predicates and types of the domain file. Do not provide any other explanations."
+        return prompt
+
+    def create_packed_problem_prompt(self, tasks_nl, domain_pddl, context):
+        # Generate the problem PDDL files of several tasks in one response, one labeled section per task
+        context_nl, context_pddl, _ = context
+        descriptions = "\n".join(f"TASK {i}:\n {task_nl} \n" for i, task_nl in enumerate(tasks_nl, 1))
+        sections = "\n".join(f"TASK {i}:\nPROBLEM:\n[problem PDDL content of task {i}]\n" for i in range(1, len(tasks_nl) + 1))
+        prompt = f"I want you to solve planning problems. " + \
+                 f"Here is the domain PDDL file: \n {domain_pddl} \n" + \
+                 f"An example planning problem is: \n {context_nl} \n" + \
+                 f"The problem PDDL file to this problem is: \n {context_pddl} \n" + \
+                 f"Now I have {len(tasks_nl)} new planning problems and their descriptions are: \n{descriptions}" + \
+                 f"Provide me with ONLY the problem PDDL file of each new planning problem " + \
+                 f"for the domain above; do not repeat the domain. Format your response as follows, " + \
+                 f"with one section per task in the same order:\n{sections}\n" + \
+                 f"Use exactly the domain name, predicates and types of the domain file. Do not provide any other explanations."
+        return prompt
+
     def query(self, prompt_text):
-        server_cnt = 0
-        result_text = ""
-        
-        while server_cnt < 10:
-            try:
-                @backoff.on_exception(backoff.expo, Exception)
-                def completions_with_backoff(**kwargs):
-                    return self.client.chat(**kwargs)
+        return self.query_with_meta(prompt_text).text
 
-                response = completions_with_backoff(
+    def query_with_meta(self, prompt_text, max_tokens=None):
+        """Query the LLM and return the full LLMResponse (text, token usage, latency)"""
+        params = dict(GENERATION_PARAMS, max_tokens=max_tokens) if max_tokens else GENERATION_PARAMS
+        try:
+            with span("llm.call", "llm", prompt_chars=len(prompt_text)) as current:
+                response = self.client.chat(
+                    prompt_text,
                     model="command-r-plus",  # or "command-r" for faster responses
-                    message=prompt_text,
-                    temperature=0.0,
-                    max_tokens=2048,
-                    p=1.0,  # equivalent to top_p
-                    frequency_penalty=0.0,
-                    presence_penalty=0.0
+                    **params
                 )
-                result_text = response.text
-                break
-            except Exception as e:
-                server_cnt += 1
-                print(f"Error: {e}")
-                time.sleep(2 ** server_cnt)
-        return result_text
+                current.set(input_tokens=response.input_tokens, output_tokens=response.output_tokens,
+                            cached=response.cached, attempts=response.attempts)
+            return response
+        except CacheMissError:
+            raise
+        except Exception as e:
+            print(f"Error: {e}")
+            return LLMResponse(text="", input_tokens=0, output_tokens=0, latency=0.0, attempts=0)
+
+    def query_pddl_stream(self, prompt_text, on_block=None, max_blocks=2):
+        """Stream the completion and stop it once max_blocks PDDL blocks (domain and problem) are balanced;
+        returns the LLMResponse and the extractor holding the blocks"""
+        extractor = PDDLBlockExtractor(on_block=on_block, max_blocks=max_blocks)
+        try:
+            with span("llm.stream", "llm", prompt_chars=len(prompt_text)) as current:
+                response = self.client.chat_stream(
+                    prompt_text,
+                    extractor.feed,
+                    model="command-r-plus",
+                    **GENERATION_PARAMS
+                )
+                current.set(input_tokens=response.input_tokens, output_tokens=response.output_tokens,
+                            cached=response.cached, attempts=response.attempts,
+                            stopped_early=response.stopped_early)
+            return response, extractor
+        except CacheMissError:
+            raise
+        except Exception as e:
+            print(f"Error: {e}")
+            return LLMResponse(text="", input_tokens=0, output_tokens=0, latency=0.0, attempts=0), extractor
 
     def parse_domain_problem_result(self, response):
         """Parse LLM response containing both domain and problem PDDL"""
@@ -323,6 +452,12 @@ class Planner:
             # Fallback: return original response as problem, empty domain
             return "", response
 
+    def parse_problem_result(self, response):
+        """Parse an LLM response that contains only the problem PDDL"""
+        if "PROBLEM:" in response:
+            response = response.split("PROBLEM:", 1)[1]
+        return self.clean_pddl_response(response)
+
     def clean_pddl_response(self, pddl_text):
         """Remove markdown formatting and clean up PDDL text"""
         # Remove markdown code blocks
@@ -341,57 +476,239 @@ class Planner:
         return pddl_text
 
 # RAG Helper Functions for llm_ic_pddl_rag
-def run_llm_ic_pddl_internal(task_id: int, run: int, time_limit: int = 200):
-    """Run the original llm_ic_pddl method and return results"""
-    print(f"Running llm_ic_pddl for task {task_id}, run {run}...")
+class PlanningResult(NamedTuple):
+    """Outcome of one PDDL planning attempt"""
+    exit_code: int
+    error_category: Optional[str]  # error type of the knowledge graph, None on success
+    plan: Optional[str]
+    cost: Optional[float]
+    timings: Dict[str, float]  # seconds per stage: llm, parse, write, planner, total
+    domain_file: str
+    problem_file: str
+    plan_file: str
+    prompt_chars: int = 0
+    llm_response: Optional[LLMResponse] = None
+    planner_output: str = ""
+    planner_stats: Optional[PlannerStats] = None
+
+    @property
+    def success(self):
+        return exit_status(self.exit_code).plan_found and self.plan is not None
+
+    @property
+    def total_time(self):
+        return self.timings.get("total", 0.0)
+
+def collect_best_plan(plan_file_name):
+    """Return (plan, cost) of the least cost plan written to plan_file_name, or (None, None)"""
+    best_cost = 1e10
+    best_plan = None
+    for fn in glob.glob(f"{plan_file_name}"):
+        with open(fn, "r") as f:
+            try:
+                plans = f.readlines()
+                cost = get_cost(plans[-1])
+                if cost < best_cost:
+                    best_cost = cost
+                    best_plan = "\n".join([p.strip() for p in plans[:-1]])
+            except:
+                continue
+    if best_plan is None:
+        return None, None
+    return best_plan, best_cost
+
+def classify_planner_result(fd_result, plan_found):
+    """Map a planner outcome to the error categories used by the knowledge graph"""
+    status = exit_status(fd_result.exit_code)
+    if status.plan_found:
+        return None if plan_found else "SEARCH_FAILURE"
+    # issues found by the pre-validator carry their category
+    for line in fd_result.stdout.splitlines():
+        if line.startswith("[error] "):
+            return line[len("[error] "):].split(":", 1)[0]
+    if status.out_of_time:
+        return "TIMEOUT"
+    if status.unsolvable:
+        return "UNSOLVABLE_PROBLEM"
+    if fd_result.exit_code == 12:
+        if "Initial state is a dead end" in fd_result.stdout:
+            return "DEAD_END_STATE"
+        return "SEARCH_FAILURE"
+    if fd_result.exit_code in (30, 31):
+        if "Missing ')'" in fd_result.stdout + fd_result.stderr:
+            return "UNMATCHED_PARENTHESES"
+        return "PLANNER_PARSE_ERROR"
+    return "GENERAL_ERROR"
+
+def run_pddl_method(args, planner, domain, method, prompt, domain_file=None, response=None) -> PlanningResult:
+    """Generate domain and problem PDDL with the LLM, plan with fast-downward and collect the best plan;
+    with domain_file only the problem is generated and planned against that domain, and a
+    response that was already generated (e.g. by a packed request) skips the LLM call"""
+    # create the tmp / result folders
+    problem_folder = f"./experiments/run{args.run}/problems/{method}/{domain.name}"
+    plan_folder    = f"./experiments/run{args.run}/plans/{method}/{domain.name}"
+    result_folder  = f"./experiments/run{args.run}/results/{method}/{domain.name}"
+
+    os.makedirs(problem_folder, exist_ok=True)
+    os.makedirs(plan_folder, exist_ok=True)
+    os.makedirs(result_folder, exist_ok=True)
+
+    task = args.task
+    timings = {}
+
+    start_time = time.time()
+
+    # A. generate domain and problem pddl files
+    task_suffix = domain.get_task_suffix(task)
+    extractor = None
+    if response is not None:
+        print("[info] using the problem of a packed request")
+    elif planner.client.stream:
+        def check_domain(kind, text):
+            # the domain is validated on arrival, while the problem is still streaming
+            if kind == "domain":
+                issues = validate_domain(text)
+                if has_errors(issues):
+                    print(f"[info] generated domain has errors:\n{format_issues(issues)}")
+        response, extractor = planner.query_pddl_stream(prompt, on_block=check_domain,
+                                                        max_blocks=1 if domain_file else 2)
+    else:
+        response = planner.query_with_meta(prompt)
+    timings["llm"] = time.time() - start_time
+
+    stage_start = time.time()
+    with span("parse", "task"):
+        if domain_file:
+            domain_pddl_ = None
+            if extractor is not None and extractor.block("problem"):
+                task_pddl_ = extractor.block("problem")
+            else:
+                task_pddl_ = planner.parse_problem_result(response.text)
+        elif extractor is not None and extractor.block("domain") and extractor.block("problem"):
+            domain_pddl_, task_pddl_ = extractor.block("domain"), extractor.block("problem")
+        else:
+            domain_pddl_, task_pddl_ = planner.parse_domain_problem_result(response.text)
+    timings["parse"] = time.time() - stage_start
+
+    # B. write both domain and problem files
+    stage_start = time.time()
+    task_domain_file_name = domain_file or \
+        f"./experiments/run{args.run}/problems/{method}/{task_suffix.replace('.pddl', '_domain.pddl')}"
+    task_pddl_file_name = f"./experiments/run{args.run}/problems/{method}/{task_suffix}"
+    
+    with span("write", "io"):
+        if domain_pddl_ is not None:
+            with open(task_domain_file_name, "w") as f:
+                f.write(domain_pddl_)
+        with open(task_pddl_file_name, "w") as f:
+            f.write(task_pddl_)
+    timings["write"] = time.time() - stage_start
+
+    ## C. run fastforward to plan
+    plan_file_name = f"./experiments/run{args.run}/plans/{method}/{task_suffix}"
+    sas_file_name  = f"./experiments/run{args.run}/plans/{method}/{task_suffix}.sas"
+    
+    stage_start = time.time()
+    fd_result = run_planner(
+        task_domain_file_name, task_pddl_file_name,
+        plan_file=plan_file_name,
+        sas_file=sas_file_name,
+        time_limit=args.time_limit,
+        memory_limit_mb=args.memory_limit,
+        prevalidate=args.prevalidate
+    )
+    timings["planner"] = time.time() - stage_start
+    exit_code, planner_output, planner_errors = fd_result.exit_code, fd_result.stdout, fd_result.stderr
     
+    if planner_output:
+        print(planner_output)
+    if planner_errors:
+        print(planner_errors)
+    
+    if exit_code == TIMEOUT_EXIT_CODE:
+        print(f"Planning timed out after {args.time_limit} seconds")
+    elif exit_code != 0:
+        print(f"Planning failed with exit code: {exit_code} ({exit_status(exit_code).description})")
+
+    # D. collect the least cost plan
+    best_plan, best_cost = collect_best_plan(plan_file_name)
+    timings["total"] = time.time() - start_time
+
+    return PlanningResult(
+        exit_code=exit_code,
+        error_category=classify_planner_result(fd_result, best_plan is not None),
+        plan=best_plan,
+        cost=best_cost,
+        timings=timings,
+        domain_file=task_domain_file_name,
+        problem_file=task_pddl_file_name,
+        plan_file=plan_file_name,
+        prompt_chars=len(prompt),
+        llm_response=response,
+        planner_output=planner_output + planner_errors,
+        planner_stats=fd_result.stats
+    )
+
+def run_llm_ic_pddl_internal(args, planner, domain) -> PlanningResult:
+    """Run the llm_ic_pddl method in-process and return its PlanningResult"""
+    with span("prompt", "task"):
+        task_nl, _ = domain.get_task(args.task)
+        prompt = planner.create_llm_ic_pddl_prompt(task_nl, domain.get_domain_pddl(), domain.get_context())
+    return run_pddl_method(args, planner, domain, "llm_ic_pddl", prompt)
+
+def validate_against_ground_truth(domain, task, plan_file):
+    """PlanValidation of a plan file against the ground-truth task, or None if it cannot be checked"""
+    _, problem_file = domain.get_task_file(task)
     try:
-        # Run the main.py with llm_ic_pddl method
-        cmd = [
-            "python", "main.py", 
-            "--method", "llm_ic_pddl_planner",
-            "--task", str(task_id),
-            "--run", str(run),
-            "--time-limit", str(time_limit)
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        
-        # Parse the output for errors
-        stdout = result.stdout
-        stderr = result.stderr
-        exit_code = result.returncode
-        
-        print(f"llm_ic_pddl completed with exit code: {exit_code}")
-        
-        # Check for planning failures in the output, not just subprocess exit code
-        planning_failed = any([
-            "Planning failed" in stdout,
-            "no solution found" in stdout,
-            "Missing ')'" in stdout,
-            "translate exit code:" in stdout and "translate exit code: 0" not in stdout,
-            "Error: Could not parse" in stdout
-        ])
-        
-        print(f"Planning failed check: {planning_failed}")
-        if planning_failed:
-            print("Detected planning failure in output")
-        
-        return {
-            "success": exit_code == 0 and not planning_failed,
-            "exit_code": exit_code,
-            "stdout": stdout,
-            "stderr": stderr
-        }
-        
-    except Exception as e:
-        print(f"Error running llm_ic_pddl: {e}")
-        return {
-            "success": False,
-            "exit_code": -1,
-            "error": str(e),
-            "log_data": None
-        }
+        return validate_plan_file(domain.get_domain_pddl_file(), problem_file, plan_file)
+    except (OSError, UnsupportedTaskError):
+        return None
+
+def record_task_result(args, domain, method, plan_found, prompt_chars=0, response=None, timings=None,
+                       plan_file=None, **fields):
+    """Append one TaskRecord for a task attempt to the results log"""
+    results_log = get_results_log()
+    if results_log is None:
+        return None
+    validation = validate_against_ground_truth(domain, args.task, plan_file) if plan_found and plan_file else None
+    if validation is not None:
+        fields.setdefault("plan_length", validation.steps)
+    _, task_name = domain.tasks[args.task]
+    return results_log.record(TaskRecord(
+        run=args.run,
+        domain=domain.name,
+        task_id=args.task,
+        task_name=task_name,
+        method=method,
+        plan_found=plan_found,
+        prompt_chars=prompt_chars,
+        response_chars=len(response.text) if response else 0,
+        input_tokens=response.input_tokens if response else 0,
+        output_tokens=response.output_tokens if response else 0,
+        llm_latency=response.latency if response else 0.0,
+        llm_cached=response.cached if response else False,
+        llm_stopped_early=response.stopped_early if response else False,
+        plan_valid=validation.valid if validation is not None else None,
+        timings=timings or {},
+        **fields
+    ))
+
+def record_planning_result(args, domain, method, result: PlanningResult):
+    """Append the TaskRecord of a PDDL method's PlanningResult"""
+    return record_task_result(
+        args, domain, method,
+        plan_found=result.success,
+        prompt_chars=result.prompt_chars,
+        response=result.llm_response,
+        timings=result.timings,
+        plan_file=result.plan_file,
+        planner_exit_code=result.exit_code,
+        plan_length=len(result.plan.splitlines()) if result.plan else None,
+        plan_cost=result.cost,
+        error_category=result.error_category,
+        planner_output=result.planner_output,
+        planner_stats=result.planner_stats._asdict() if result.planner_stats else {}
+    )
 
 def extract_error_reason(stdout: str, stderr: str) -> str:
     """Extract the main error reason from the planning attempt"""
@@ -403,16 +720,23 @@ def extract_error_reason(stdout: str, stderr: str) -> str:
         error_reasons.append("Missing closing parenthesis")
     if "Tokens remaining" in combined_output:
         error_reasons.append("Extra text after PDDL")
-    if "exit code: 31" in combined_output:
+    stats = parse_planner_output(combined_output)
+    component_codes = (stats.translate_exit_code, stats.search_exit_code)
+    if any(code in (30, 31) for code in component_codes):
         error_reasons.append("PDDL syntax error")
-    if "exit code: 37" in combined_output:
+    if any(code in UNSOLVABLE_CODES or code == 12 for code in component_codes):
         error_reasons.append("Unsolvable problem")
     if "Plan length: 0 step(s)" in combined_output:
         error_reasons.append("Goal already satisfied")
     
+    # Issues reported by the in-process pre-validator
+    for line in combined_output.splitlines():
+        if line.startswith("[error] ") and line[len("[error] "):] not in error_reasons:
+            error_reasons.append(line[len("[error] "):])
+    
     return " | ".join(error_reasons) if error_reasons else "Unknown error"
 
-def query_knowledge_graph_for_solution(error_reason: str, graph_rag_qa: PDDLGraphRAGQA) -> str:
+def query_knowledge_graph_for_solution(error_reason: str, graph_rag_qa: "PDDLGraphRAGQA") -> str:
     """Query the Knowledge Graph RAG for solutions to the error"""
     print(f"Querying Knowledge Graph RAG for: {error_reason}")
     
@@ -421,7 +745,8 @@ def query_knowledge_graph_for_solution(error_reason: str, graph_rag_qa: PDDLGrap
         question = f"How do I fix this PDDL error: {error_reason}? What are the common causes and solutions?"
         
         # Query the graph RAG system
-        response = graph_rag_qa.answer_question(question)
+        with span("kg.answer_question", "kg"):
+            response = graph_rag_qa.answer_question(question)
         
         answer = response.get('answer', 'No specific knowledge found')
         context = response.get('context', [])
@@ -443,6 +768,8 @@ def query_knowledge_graph_for_solution(error_reason: str, graph_rag_qa: PDDLGrap
         
         return answer
         
+    except CacheMissError:
+        raise
     except Exception as e:
         print(f"Error querying Knowledge Graph RAG: {e}")
         fallback_guidance = get_fallback_error_guidance(error_reason)
@@ -466,12 +793,20 @@ def get_fallback_error_guidance(error_reason: str) -> str:
     # Default guidance
     return "Check PDDL syntax, verify parentheses matching, ensure proper file structure, and validate that goals are achievable with available actions."
 
-def regenerate_problem_with_cohere_and_graph(original_problem: str, domain_content: str, error_reason: str, graph_rag_context: str, task_id: int) -> str:
-    """Use Cohere LLM to regenerate the problem file based on Knowledge Graph RAG context"""
+def regenerate_problem_with_cohere_and_graph(original_problem: str, domain_content: str, error_reason: str, graph_rag_context: str, task_id: int,
+                                            temperature: float = 0.1, feedback: str = "", sample: str = None) -> str:
+    """Use Cohere LLM to regenerate the problem file based on Knowledge Graph RAG context;
+    sample identifies the candidate in the LLM response cache (see repair_candidate)"""
     print("Regenerating problem file using Cohere LLM with Knowledge Graph context...")
     
     try:
-        cohere_client = cohere.Client(api_key=COHERE_API_KEY)
+        llm_client = get_llm_client(COHERE_API_KEY)
+        
+        # errors of earlier repair rounds, so the next candidates do not repeat them
+        feedback_section = f"""
+PREVIOUS REPAIR ATTEMPTS (ALL FAILED):
+{feedback}
+""" if feedback else ""
         
         prompt = f"""You are a PDDL (Planning Domain Definition Language) expert. I need you to fix a PDDL problem file that has errors.
 
@@ -485,7 +820,7 @@ ERROR DETECTED: {error_reason}
 
 KNOWLEDGE FROM GRAPH RAG SYSTEM:
 {graph_rag_context}
-
+{feedback_section}
 TASK: Please regenerate the PROBLEM file only, ensuring:
 1. Apply the specific fixes suggested by the knowledge graph
 2. Proper parentheses matching (every '(' has a corresponding ')')
@@ -498,15 +833,25 @@ IMPORTANT: Return ONLY the corrected PROBLEM PDDL content, starting with (define
 
 CORRECTED PROBLEM:"""
 
-        response = cohere_client.chat(
-            model="command-r-plus",
-            message=prompt,
-            temperature=0.1,  # Low temperature for consistent fixes
-            max_tokens=1500,
-            p=0.95
-        )
+        repair_params = {
+            "temperature": temperature,  # low for the first candidate, higher ones for diversity
+            "max_tokens": 1500,
+            "p": 0.95
+        }
+        with span("llm.repair", "llm", prompt_chars=len(prompt), temperature=temperature) as current:
+            if llm_client.stream:
+                # stop as soon as the (define (problem ...)) block is balanced
+                extractor = PDDLBlockExtractor(max_blocks=1)
+                response = llm_client.chat_stream(prompt, extractor.feed, model="command-r-plus", sample=sample,
+                                                  **repair_params)
+            else:
+                response = llm_client.chat(prompt, model="command-r-plus", sample=sample, **repair_params)
+            current.set(input_tokens=response.input_tokens, output_tokens=response.output_tokens,
+                        cached=response.cached, stopped_early=response.stopped_early)
         
         corrected_problem = response.text.strip()
+        if llm_client.stream and extractor.blocks:
+            corrected_problem = extractor.blocks[0]
         
         # Basic validation - ensure it starts and ends correctly
         if not corrected_problem.startswith("(define"):
@@ -517,11 +862,128 @@ CORRECTED PROBLEM:"""
         print("Problem regenerated successfully with Knowledge Graph guidance")
         return corrected_problem
         
+    except CacheMissError:
+        raise
     except Exception as e:
         print(f"Error regenerating problem with Cohere and Knowledge Graph: {e}")
         return original_problem  # Return original if regeneration fails
 
+class RepairAttempt(NamedTuple):
+    """One candidate problem file of the repair loop and its planner outcome"""
+    round: int
+    candidate: int
+    temperature: float
+    problem_file: str
+    fd_result: FDResult
+    plan: Optional[str]
+    cost: Optional[float]
+    plan_source: Optional[str]  # plan file holding the best plan of this candidate
+    error_reason: str
+
+def repair_temperature(candidate: int) -> float:
+    """Sampling temperature of a repair candidate: 0.1 for the first, then more diverse"""
+    return min(0.1 + 0.3 * candidate, 1.0)
+
+def repair_candidate(args, repair_round, candidate, original_problem, domain_content, error_reason, rag_context,
+                     feedback, domain_file, candidate_dir, candidate_plan_dir, task_base_name, task_id,
+                     cancel: threading.Event) -> Optional[RepairAttempt]:
+    """Generate one repaired problem file and plan with it; None if another candidate won first"""
+    if cancel.is_set():
+        return None
+    temperature = repair_temperature(candidate - 1)
+    name = f"{task_base_name}_r{repair_round}c{candidate}"
+    problem_file = os.path.join(candidate_dir, f"{name}.pddl").replace('\\', '/')
+    plan_file = os.path.join(candidate_plan_dir, f"{name}.pddl").replace('\\', '/')
+
+    with span("repair.candidate", "task", round=repair_round, candidate=candidate, temperature=temperature):
+        # candidates are sampled, so each run, round and candidate is its own entry in the response cache:
+        # a rerun replays the same samples, while the run0..run4 repetitions stay independent trials
+        corrected_problem = regenerate_problem_with_cohere_and_graph(
+            original_problem, domain_content, error_reason, rag_context, task_id,
+            temperature=temperature, feedback=feedback, sample=f"run{args.run} {name}"
+        )
+        if cancel.is_set():
+            return None
+        with span("write", "io"), open(problem_file, 'w', encoding='utf-8') as f:
+            f.write(corrected_problem)
+
+        fd_result = run_planner(
+            domain_file, problem_file,
+            plan_file=plan_file,
+            sas_file=os.path.join(candidate_plan_dir, f"{name}.sas").replace('\\', '/'),
+            time_limit=args.time_limit,
+            memory_limit_mb=args.memory_limit,
+            prevalidate=args.prevalidate
+        )
+
+    best_plan, best_cost, plan_source = None, None, None
+    for fn in glob.glob(glob.escape(plan_file)) + glob.glob(f"{glob.escape(plan_file)}.[0-9]*"):
+        plan, cost = collect_best_plan(fn)
+        if plan is not None and (best_cost is None or cost < best_cost):
+            best_plan, best_cost, plan_source = plan, cost, fn
+
+    reason = "" if best_plan is not None else extract_error_reason(fd_result.stdout, fd_result.stderr)
+    if corrected_problem.strip() == original_problem.strip():
+        reason = f"returned the original problem unchanged ({reason})"
+    print(f"Repair round {repair_round} candidate {candidate} (temperature {temperature:g}): "
+          f"{'plan found' if best_plan is not None else reason}")
+    return RepairAttempt(repair_round, candidate, temperature, problem_file, fd_result,
+                         best_plan, best_cost, plan_source, reason)
+
+def run_repair_round(executor, cancel, args, repair_round, original_problem, domain_content, error_reason,
+                     rag_context, feedback, domain_file, candidate_dir, candidate_plan_dir, task_base_name, task_id):
+    """Generate and check the candidates of one round concurrently; returns (winner or None, finished attempts).
+    After a winner the other candidates stop before their next stage, and all of them have returned
+    when this does, so nothing of this task runs on into the next one."""
+    futures = [
+        # a copy of the caller's context keeps the candidate spans under this round's span
+        executor.submit(contextvars.copy_context().run, repair_candidate, args, repair_round, candidate,
+                        original_problem, domain_content, error_reason, rag_context, feedback,
+                        domain_file, candidate_dir, candidate_plan_dir, task_base_name, task_id, cancel)
+        for candidate in range(1, args.repair_candidates + 1)
+    ]
+    attempts = []
+    winner = None
+    completed = False
+    try:
+        for future in as_completed(futures):
+            attempt = future.result()
+            if attempt is None:
+                continue
+            attempts.append(attempt)
+            if attempt.plan is not None:
+                winner = attempt
+                break
+        completed = winner is None
+    finally:
+        if not completed:
+            # a plan was found or a candidate failed: the others stop before their next stage
+            cancel.set()
+        wait(futures)
+    attempts.sort(key=lambda a: a.candidate)
+    return winner, attempts
+
 def llm_ic_pddl_rag(args, planner, domain):
+    """RAG-enhanced PDDL planning; records the outcome in the results log"""
+    start_time = time.time()
+    result = run_llm_ic_pddl_rag(args, planner, domain)
+    plan_file = result.get("plan_file")
+    plan, cost = collect_best_plan(plan_file) if plan_file else (None, None)
+    record_task_result(
+        args, domain, "llm_ic_pddl_rag",
+        plan_found=plan is not None,
+        timings={"total": time.time() - start_time},
+        plan_file=plan_file,
+        planner_exit_code=result.get("exit_code"),
+        plan_length=len(plan.splitlines()) if plan else None,
+        plan_cost=cost,
+        error_category=result.get("error_category") or (None if result.get("success") else "GENERAL_ERROR"),
+        planner_output=result.get("error", ""),
+        planner_stats=result.get("planner_stats", {})
+    )
+    return result
+
+def run_llm_ic_pddl_rag(args, planner, domain):
     """Simplified RAG-enhanced PDDL planning function"""
     task_id = args.task
     run = args.run
@@ -560,138 +1022,187 @@ def llm_ic_pddl_rag(args, planner, domain):
     # Step 2: Run fast-downward on the original files to check for errors
     print("\nStep 2: Testing original PDDL files with fast-downward...")
     
-    fd_command = f"python ./downward-release-24.06.1/downward-release-24.06.1/fast-downward.py --alias {FAST_DOWNWARD_ALIAS} {original_domain_path} {original_problem_path}"
-    print(f"Running: {fd_command}")
+    # Create plans directory
+    rag_plan_folder = f"experiments/run{run}/plans/llm_ic_pddl_rag/{domain.name}"
+    os.makedirs(rag_plan_folder, exist_ok=True)
     
-    exit_code, output, errors = run_command_with_timeout(fd_command, timeout_seconds=time_limit, capture_output=True)
+    print(f"Running fast-downward on {original_domain_path} {original_problem_path}")
+    original_plan_file = os.path.join(rag_plan_folder, f"{task_base_name}_original.pddl").replace('\\', '/')
+    fd_result = run_planner(
+        original_domain_path, original_problem_path,
+        plan_file=original_plan_file,
+        sas_file=os.path.join(rag_plan_folder, f"{task_base_name}_original.sas").replace('\\', '/'),
+        time_limit=time_limit,
+        memory_limit_mb=args.memory_limit,
+        prevalidate=args.prevalidate
+    )
+    exit_code, output, errors = fd_result.exit_code, fd_result.stdout, fd_result.stderr
     
     if exit_code == 0:
         print("SUCCESS: Original PDDL files work fine. No RAG needed.")
-        return {"success": True, "message": "No errors found in original PDDL"}
+        return {"success": True, "message": "No errors found in original PDDL",
+                "exit_code": exit_code, "plan_file": original_plan_file,
+                "planner_stats": fd_result.stats._asdict()}
     
-    # Step 3: Extract error and use KG RAG to fix it
     print(f"FAILED: Fast-downward failed with exit code {exit_code}")
-    print("Step 3: Analyzing error and using KG RAG to fix it...")
+    
+    # Step 3: Fix mechanical errors in process before spending a retrieval and an LLM call on them
+    corrected_dir = f"experiments/run{run}/problems/llm_ic_pddl_rag/{domain.name}"
+    local_fixes = []
+    if args.local_repair:
+        print("\nStep 3: Trying local repair...")
+        with span("repair.local", "task") as current:
+            local = repair_pddl(domain_content, original_problem)
+            current.set(fixes=len(local.fixes))
+        local_fixes = local.fixes
+        if local_fixes:
+            print("\n".join(local_fixes))
+            os.makedirs(corrected_dir, exist_ok=True)
+            local_problem_path = os.path.join(corrected_dir, f"{task_base_name}_local.pddl").replace('\\', '/')
+            local_domain_path = os.path.join(corrected_dir, f"{task_base_name}_domain_local.pddl").replace('\\', '/')
+            with span("write", "io"):
+                with open(local_problem_path, 'w', encoding='utf-8') as f:
+                    f.write(local.problem)
+                with open(local_domain_path, 'w', encoding='utf-8') as f:
+                    f.write(local.domain)
+            local_plan_file = os.path.join(rag_plan_folder, f"{task_base_name}_local.pddl").replace('\\', '/')
+            local_result = run_planner(
+                local_domain_path, local_problem_path,
+                plan_file=local_plan_file,
+                sas_file=os.path.join(rag_plan_folder, f"{task_base_name}_local.sas").replace('\\', '/'),
+                time_limit=time_limit,
+                memory_limit_mb=args.memory_limit,
+                prevalidate=args.prevalidate
+            )
+            if exit_status(local_result.exit_code).plan_found:
+                print("SUCCESS: Local repair fixed the PDDL errors. No RAG needed.")
+                return {"success": True, "message": "Local repair fixed the PDDL errors",
+                        "exit_code": local_result.exit_code, "plan_file": local_plan_file,
+                        "local_fixes": local_fixes, "planner_stats": local_result.stats._asdict()}
+            # the LLM starts from the repaired files and only sees the errors that are left
+            print(f"Local repair was not enough (exit code {local_result.exit_code})")
+            original_problem, domain_content, fd_result = local.problem, local.domain, local_result
+            exit_code, output, errors = fd_result.exit_code, fd_result.stdout, fd_result.stderr
+        else:
+            print("No local fixes apply")
+    
+    # Step 4: Extract error and use KG RAG to fix it
+    print("\nStep 4: Analyzing error and using KG RAG to fix it...")
     
     error_reason = extract_error_reason(output, errors)
     print(f"Error reason: {error_reason}")
     
-    # Initialize KG RAG
+    # Use the process-wide KG RAG session
     try:
-        kg_initializer = PDDLKnowledgeGraphInitializer()
-        if not kg_initializer.initialize_knowledge_graph():
-            raise Exception("Failed to initialize knowledge graph")
-        kg = kg_initializer.get_knowledge_graph_instance()
-        graph_rag_qa = PDDLGraphRAGQA(kg, COHERE_API_KEY)
-        print("KG RAG system initialized")
+        graph_rag_qa = get_rag_context(COHERE_API_KEY).get_graph_rag_qa()
     except Exception as e:
         print(f"Failed to initialize KG RAG: {e}")
-        return {"success": False, "error": f"KG RAG init failed: {e}"}
+        return {"success": False, "error": f"KG RAG init failed: {e}", "exit_code": exit_code,
+                "error_category": classify_planner_result(fd_result, False),
+                "planner_stats": fd_result.stats._asdict()}
     
     # Get RAG advice
     rag_context = query_knowledge_graph_for_solution(error_reason, graph_rag_qa)
     
-    # Generate corrected problem
-    corrected_problem = regenerate_problem_with_cohere_and_graph(
-        original_problem, domain_content, error_reason, rag_context, task_id
-    )
-    
-    # Step 4: Save corrected files
-    print("\nStep 4: Saving corrected files...")
+    # Step 5: Save the faulty file and the domain used by every candidate
+    print("\nStep 5: Saving faulty file...")
     
     # Create directories - wrong_pddl goes inside the run directory
     wrong_pddl_dir = f"experiments/run{run}/wrong_pddl/llm_ic_pddl_rag/{domain.name}"
-    corrected_dir = f"experiments/run{run}/problems/llm_ic_pddl_rag/{domain.name}"
-    os.makedirs(wrong_pddl_dir, exist_ok=True)
-    os.makedirs(corrected_dir, exist_ok=True)
+    candidate_dir = os.path.join(corrected_dir, "candidates")
+    candidate_plan_dir = os.path.join(rag_plan_folder, "candidates")
+    for folder in (wrong_pddl_dir, candidate_dir, candidate_plan_dir):
+        os.makedirs(folder, exist_ok=True)
     
-    # Save faulty file
     faulty_path = os.path.join(wrong_pddl_dir, f"{task_base_name}_faulty.pddl")
-    with open(faulty_path, 'w', encoding='utf-8') as f:
-        f.write(original_problem)
-    
-    # Save corrected files
     corrected_problem_path = os.path.join(corrected_dir, f"{task_base_name}_rag.pddl")
     corrected_domain_path = os.path.join(corrected_dir, f"{task_base_name}_domain_rag.pddl")
     
-    with open(corrected_problem_path, 'w', encoding='utf-8') as f:
-        f.write(corrected_problem)
-    
-    with open(corrected_domain_path, 'w', encoding='utf-8') as f:
-        f.write(domain_content)
+    with span("write", "io"):
+        with open(faulty_path, 'w', encoding='utf-8') as f:
+            f.write(original_problem)
+        with open(corrected_domain_path, 'w', encoding='utf-8') as f:
+            f.write(domain_content)
     
     print(f"Faulty file: {faulty_path}")
-    print(f"Corrected problem: {corrected_problem_path}")
     print(f"Corrected domain: {corrected_domain_path}")
     
-    # Step 5: Test corrected files and generate plan
-    print("\nStep 5: Testing corrected PDDL files and generating plan...")
+    # Step 6: Repair rounds; every candidate is generated and planned concurrently
+    print(f"\nStep 6: Repairing with up to {args.repair_rounds} round(s) of {args.repair_candidates} candidate(s)...")
     
-    # Create plans directory
-    rag_plan_folder = f"experiments/run{run}/plans/llm_ic_pddl_rag/{domain.name}"
-    os.makedirs(rag_plan_folder, exist_ok=True)
-    
-    # Set up plan file paths
     plan_file_name = os.path.join(rag_plan_folder, f"{task_base_name}_rag.pddl").replace('\\', '/')
-    sas_file_name = os.path.join(rag_plan_folder, f"{task_base_name}_rag.sas").replace('\\', '/')
-    
-    test_command = f"python ./downward-release-24.06.1/downward-release-24.06.1/fast-downward.py --alias {FAST_DOWNWARD_ALIAS} --plan-file {plan_file_name} --sas-file {sas_file_name} {corrected_domain_path} {corrected_problem_path}"
-    test_exit_code, test_output, test_errors = run_command_with_timeout(test_command, timeout_seconds=time_limit, capture_output=True)
-    
-    if test_exit_code == 0:
-        # Look for generated plan files
-        import glob
-        plan_files = glob.glob(f"{plan_file_name}*")
-        best_cost = 1e10
-        best_plan = ""
-        plan_found = False
-        
-        for plan_fn in plan_files:
-            try:
-                with open(plan_fn, "r") as f:
-                    plans = f.readlines()
-                    if plans:
-                        cost = get_cost(plans[-1])
-                        if cost < best_cost:
-                            best_cost = cost
-                            best_plan = "\n".join([p.strip() for p in plans[:-1]])
-                            plan_found = True
-            except Exception as e:
-                print(f"Error reading plan file {plan_fn}: {e}")
-                continue
-        
-        if plan_found:
-            print(f"SUCCESS: Corrected PDDL files work! Plan found with cost: {best_cost}")
-            print(f"Plan saved to: {plan_file_name}")
-            return {
-                "success": True,
-                "message": "RAG successfully fixed the PDDL errors and generated plan",
-                "corrected_files": {
-                    "problem": corrected_problem_path,
-                    "domain": corrected_domain_path
-                },
-                "plan_file": plan_file_name,
-                "plan_cost": best_cost,
-                "faulty_file": faulty_path
-            }
-        else:
-            print("SUCCESS: Corrected PDDL files are valid, but no plan generated")
-            return {
-                "success": True,
-                "message": "RAG fixed PDDL errors but no plan was generated",
-                "corrected_files": {
-                    "problem": corrected_problem_path,
-                    "domain": corrected_domain_path
-                },
-                "faulty_file": faulty_path
-            }
-    else:
-        print(f"FAILED: Corrected files still have errors (exit code: {test_exit_code})")
+    feedback = []
+    attempts = []
+    cancel = threading.Event()  # set once a candidate finds a plan
+    with ThreadPoolExecutor(max_workers=args.repair_candidates, thread_name_prefix="repair") as executor:
+        for repair_round in range(1, args.repair_rounds + 1):
+            with span("repair.round", "task", round=repair_round):
+                winner, round_attempts = run_repair_round(
+                    executor, cancel, args, repair_round, original_problem, domain_content, error_reason,
+                    rag_context, "\n".join(feedback), corrected_domain_path, candidate_dir, candidate_plan_dir,
+                    task_base_name, task_id
+                )
+            attempts.extend(round_attempts)
+            if winner:
+                break
+            feedback.append(f"Round {repair_round}:")
+            feedback.extend(f"- candidate {a.candidate} (temperature {a.temperature:g}): {a.error_reason}"
+                            for a in round_attempts)
+    
+    # keep the usual <task>_rag.pddl names for the winning (or last) candidate
+    final = winner or (attempts[-1] if attempts else None)
+    if final is None:
+        return {"success": False, "message": "RAG could not fix the PDDL errors", "error": "No repair candidates",
+                "exit_code": exit_code, "error_category": classify_planner_result(fd_result, False)}
+    shutil.copyfile(final.problem_file, corrected_problem_path)
+    print(f"Corrected problem: {corrected_problem_path}")
+    
+    repair_info = {
+        "corrected_files": {
+            "problem": corrected_problem_path,
+            "domain": corrected_domain_path
+        },
+        "faulty_file": faulty_path,
+        "local_fixes": local_fixes,
+        "repair_rounds": attempts[-1].round,
+        "repair_attempts": len(attempts),
+        "exit_code": final.fd_result.exit_code,
+        "planner_stats": final.fd_result.stats._asdict()
+    }
+    
+    if winner:
+        for fn in glob.glob(glob.escape(plan_file_name)) + glob.glob(f"{glob.escape(plan_file_name)}.[0-9]*"):
+            os.remove(fn)
+        shutil.copyfile(winner.plan_source, plan_file_name)
+        print(f"SUCCESS: Candidate {winner.candidate} of round {winner.round} works! "
+              f"Plan found with cost: {winner.cost}")
+        print(f"Plan saved to: {plan_file_name}")
         return {
-            "success": False,
-            "message": "RAG could not fix the PDDL errors",
-            "error": f"Test failed with exit code {test_exit_code}"
+            "success": True,
+            "message": "RAG successfully fixed the PDDL errors and generated plan",
+            "plan_file": plan_file_name,
+            "plan_cost": winner.cost,
+            **repair_info
         }
+    
+    if any(exit_status(a.fd_result.exit_code).plan_found for a in attempts):
+        print("SUCCESS: Corrected PDDL files are valid, but no plan generated")
+        return {
+            "success": True,
+            "message": "RAG fixed PDDL errors but no plan was generated",
+            "error_category": classify_planner_result(final.fd_result, False),
+            **repair_info
+        }
+    
+    print(f"FAILED: Corrected files still have errors after {len(attempts)} candidate(s) "
+          f"(exit code: {final.fd_result.exit_code})")
+    return {
+        "success": False,
+        "message": "RAG could not fix the PDDL errors",
+        "error": f"Test failed with exit code {final.fd_result.exit_code}",
+        "error_category": classify_planner_result(final.fd_result, False),
+        **repair_info
+    }
 
 def llm_ic_pddl_planner(args, planner, domain):
     """
@@ -702,83 +1213,59 @@ def llm_ic_pddl_planner(args, planner, domain):
         Then, we use a planner to find the near optimal solution, and translate
         that back to natural language.
     """
-    context     = domain.get_context()
-    domain_pddl = domain.get_domain_pddl()
-    
-    # create the tmp / result folders
-    problem_folder = f"./experiments/run{args.run}/problems/llm_ic_pddl/{domain.name}"
-    plan_folder    = f"./experiments/run{args.run}/plans/llm_ic_pddl/{domain.name}"
-    result_folder  = f"./experiments/run{args.run}/results/llm_ic_pddl/{domain.name}"
-
-    os.makedirs(problem_folder, exist_ok=True)
-    os.makedirs(plan_folder, exist_ok=True)
-    os.makedirs(result_folder, exist_ok=True)
-
-    task = args.task
-
-    start_time = time.time()
+    result = run_llm_ic_pddl_internal(args, planner, domain)
 
-    # A. generate domain and problem pddl files
-    task_suffix = domain.get_task_suffix(task)
-    task_nl, _ = domain.get_task(task)
-    prompt = planner.create_llm_ic_pddl_prompt(task_nl, domain_pddl, context)
-    
-    raw_result = planner.query(prompt)
-    domain_pddl_, task_pddl_ = planner.parse_domain_problem_result(raw_result)
-
-    # B. write both domain and problem files
-    task_domain_file_name = f"./experiments/run{args.run}/problems/llm_ic_pddl/{task_suffix.replace('.pddl', '_domain.pddl')}"
-    task_pddl_file_name = f"./experiments/run{args.run}/problems/llm_ic_pddl/{task_suffix}"
-    
-    with open(task_domain_file_name, "w") as f:
-        f.write(domain_pddl_)
-    with open(task_pddl_file_name, "w") as f:
-        f.write(task_pddl_)
-    time.sleep(1)
-
-    ## C. run fastforward to plan
-    plan_file_name = f"./experiments/run{args.run}/plans/llm_ic_pddl/{task_suffix}"
-    sas_file_name  = f"./experiments/run{args.run}/plans/llm_ic_pddl/{task_suffix}.sas"
-    
-    command = f"python ./downward-release-24.06.1/downward-release-24.06.1/fast-downward.py --alias {FAST_DOWNWARD_ALIAS} " + \
-              f"--plan-file {plan_file_name} " + \
-              f"--sas-file {sas_file_name} " + \
-              f"{task_domain_file_name} {task_pddl_file_name}"
-    
-    exit_code, planner_output, planner_errors = run_command_with_timeout(command, timeout_seconds=args.time_limit, capture_output=True)
-    
-    if planner_output:
-        print(planner_output)
-    if planner_errors:
-        print(planner_errors)
-    
-    if exit_code == -1:
-        print(f"Planning timed out after {args.time_limit} seconds")
-    elif exit_code != 0:
-        print(f"Planning failed with exit code: {exit_code}")
+    # E. Print results
+    if result.success:
+        print(f"[info] task {args.task} takes {result.total_time} sec, found a plan with cost {result.cost}")
+    else:
+        print(f"[info] task {args.task} takes {result.total_time} sec, no solution found")
+    record_planning_result(args, domain, "llm_ic_pddl_planner", result)
+    return result
 
-    # D. collect the least cost plan
-    best_cost = 1e10
-    best_plan = None
-    for fn in glob.glob(f"{plan_file_name}"):
-        with open(fn, "r") as f:
-            try:
-                plans = f.readlines()
-                cost = get_cost(plans[-1])
-                if cost < best_cost:
-                    best_cost = cost
-                    best_plan = "\n".join([p.strip() for p in plans[:-1]])
-            except:
-                continue
+def llm_ic_pddl_problem_planner(args, planner, domain):
+    """
+    Problem-only variant of our method:
+        Same context as llm_ic_pddl_planner, but the LLM only writes the problem PDDL,
+        which is planned against the known domain PDDL instead of a regenerated one.
+    """
+    with span("prompt", "task"):
+        task_nl, _ = domain.get_task(args.task)
+        prompt = planner.create_llm_ic_pddl_problem_prompt(task_nl, domain.get_domain_pddl(), domain.get_context())
+
+    # in a packed sweep the problem may come from a request shared with other tasks
+    packed = None
+    if planner.packer is not None:
+        sweep_tasks = getattr(args, "sweep_tasks", {}).get((args.run, domain.name), [args.task])
+        packed = planner.packer.section((args.run, domain.name), args.task, sweep_tasks,
+                                        lambda batch: request_packed_problems(planner, domain, batch))
+        if packed is None:
+            print(f"[info] task {args.task} has no usable packed answer, querying it on its own")
+    result = run_pddl_method(args, planner, domain, "llm_ic_pddl_problem", prompt,
+                             domain_file=domain.get_domain_pddl_file(),
+                             response=packed.response if packed else None)
 
     # E. Print results
-    end_time = time.time()
-    execution_time = end_time - start_time
-    
-    if best_plan:
-        print(f"[info] task {task} takes {execution_time} sec, found a plan with cost {best_cost}")
+    response = result.llm_response
+    tokens = f"{response.input_tokens} input / {response.output_tokens} output tokens" if response else "no response"
+    if result.success:
+        print(f"[info] task {args.task} takes {result.total_time} sec ({tokens}), found a plan with cost {result.cost}")
     else:
-        print(f"[info] task {task} takes {execution_time} sec, no solution found")
+        print(f"[info] task {args.task} takes {result.total_time} sec ({tokens}), no solution found")
+    record_planning_result(args, domain, "llm_ic_pddl_problem_planner", result)
+    return result
+
+def request_packed_problems(planner, domain, tasks):
+    """Ask for the problem PDDL of several tasks in one request; returns {task: PackedSection} for the sections that parse"""
+    with span("llm.packed", "llm", tasks=len(tasks)):
+        with span("prompt", "task"):
+            prompt = planner.create_packed_problem_prompt([domain.get_task(task)[0] for task in tasks],
+                                                          domain.get_domain_pddl(), domain.get_context())
+        response = planner.query_with_meta(prompt, max_tokens=PACKED_MAX_TOKENS)
+        sections = split_packed_response(response, len(tasks))
+    print(f"[info] packed request for tasks {tasks}: {len(sections)}/{len(tasks)} problem(s) parsed, "
+          f"{response.input_tokens} input / {response.output_tokens} output tokens")
+    return {tasks[label - 1]: section for label, section in sections.items()}
 
 def llm_pddl_planner(args, planner, domain):
     """
@@ -786,82 +1273,18 @@ def llm_pddl_planner(args, planner, domain):
         Same as ours, except that no context is given. In other words, the LLM
         will be asked to directly generate both domain and problem PDDL files without any context.
     """
-    domain_nl = domain.get_domain_nl()
-    
-    # create the tmp / result folders
-    problem_folder = f"./experiments/run{args.run}/problems/llm_pddl/{domain.name}"
-    plan_folder = f"./experiments/run{args.run}/plans/llm_pddl/{domain.name}"
-    result_folder  = f"./experiments/run{args.run}/results/llm_pddl/{domain.name}"
-
-    os.makedirs(problem_folder, exist_ok=True)
-    os.makedirs(plan_folder, exist_ok=True)
-    os.makedirs(result_folder, exist_ok=True)
-
-    task = args.task
-
-    start_time = time.time()
-
-    # A. generate domain and problem pddl files
-    task_suffix = domain.get_task_suffix(task)
-    task_nl, _ = domain.get_task(task)
-    prompt = planner.create_llm_pddl_prompt(task_nl, domain_nl)
-    
-    raw_result = planner.query(prompt)
-    domain_pddl_, task_pddl_ = planner.parse_domain_problem_result(raw_result)
-
-    # B. write both domain and problem files
-    task_domain_file_name = f"./experiments/run{args.run}/problems/llm_pddl/{task_suffix.replace('.pddl', '_domain.pddl')}"
-    task_pddl_file_name = f"./experiments/run{args.run}/problems/llm_pddl/{task_suffix}"
-    
-    with open(task_domain_file_name, "w") as f:
-        f.write(domain_pddl_)
-    with open(task_pddl_file_name, "w") as f:
-        f.write(task_pddl_)
-    time.sleep(1)
-
-    # C. run fastforward to plan
-    plan_file_name = f"./experiments/run{args.run}/plans/llm_pddl/{task_suffix}"
-    sas_file_name  = f"./experiments/run{args.run}/plans/llm_pddl/{task_suffix}.sas"
-    
-    command = f"python ./downward-release-24.06.1/downward-release-24.06.1/fast-downward.py --alias {FAST_DOWNWARD_ALIAS} " + \
-              f"--plan-file {plan_file_name} " + \
-              f"--sas-file {sas_file_name} " + \
-              f"{task_domain_file_name} {task_pddl_file_name}"
-    
-    exit_code, planner_output, planner_errors = run_command_with_timeout(command, timeout_seconds=args.time_limit, capture_output=True)
-    
-    if planner_output:
-        print(planner_output)
-    if planner_errors:
-        print(planner_errors)
-    
-    if exit_code == -1:
-        print(f"Planning timed out after {args.time_limit} seconds")
-    elif exit_code != 0:
-        print(f"Planning failed with exit code: {exit_code}")
-
-    # D. collect the least cost plan
-    best_cost = 1e10
-    best_plan = None
-    for fn in glob.glob(f"{plan_file_name}"):
-        with open(fn, "r") as f:
-            try:
-                plans = f.readlines()
-                cost = get_cost(plans[-1])
-                if cost < best_cost:
-                    best_cost = cost
-                    best_plan = "\n".join([p.strip() for p in plans[:-1]])
-            except:
-                continue
+    with span("prompt", "task"):
+        task_nl, _ = domain.get_task(args.task)
+        prompt = planner.create_llm_pddl_prompt(task_nl, domain.get_domain_nl())
+    result = run_pddl_method(args, planner, domain, "llm_pddl", prompt)
 
     # E. Print results
-    end_time = time.time()
-    execution_time = end_time - start_time
-    
-    if best_plan:
-        print(f"[info] task {task} takes {execution_time} sec, found a plan with cost {best_cost}")
+    if result.success:
+        print(f"[info] task {args.task} takes {result.total_time} sec, found a plan with cost {result.cost}")
     else:
-        print(f"[info] task {task} takes {execution_time} sec, no solution found")
+        print(f"[info] task {args.task} takes {result.total_time} sec, no solution found")
+    record_planning_result(args, domain, "llm_pddl_planner", result)
+    return result
 
 def llm_planner(args, planner, domain):
     """
@@ -885,16 +1308,22 @@ def llm_planner(args, planner, domain):
 
     # A. generate problem pddl file
     task_suffix = domain.get_task_suffix(task)
-    task_nl, _ = domain.get_task(task) 
-    prompt = planner.create_llm_prompt(task_nl, domain_nl)
-    text_plan = planner.query(prompt)
+    with span("prompt", "task"):
+        task_nl, _ = domain.get_task(task) 
+        prompt = planner.create_llm_prompt(task_nl, domain_nl)
+    response = planner.query_with_meta(prompt)
+    text_plan = response.text
+    llm_time = time.time() - start_time
 
     # B. write the problem file into the problem folder
     text_plan_file_name = f"./experiments/run{args.run}/results/llm/{task_suffix}"
-    with open(text_plan_file_name, "w") as f:
+    with span("write", "io"), open(text_plan_file_name, "w") as f:
         f.write(text_plan)
     end_time = time.time()
     print(f"[info] task {task} takes {end_time - start_time} sec")
+    record_task_result(args, domain, "llm_planner", plan_found=bool(text_plan.strip()),
+                       prompt_chars=len(prompt), response=response, plan_file=text_plan_file_name,
+                       timings={"llm": llm_time, "total": end_time - start_time})
 
 def llm_ic_planner(args, planner, domain):
     """
@@ -919,16 +1348,22 @@ def llm_ic_planner(args, planner, domain):
 
     # A. generate problem pddl file
     task_suffix        = domain.get_task_suffix(task)
-    task_nl, _ = domain.get_task(task) 
-    prompt             = planner.create_llm_ic_prompt(task_nl, domain_nl, context, domain.name)
-    text_plan          = planner.query(prompt)
+    with span("prompt", "task"):
+        task_nl, _ = domain.get_task(task) 
+        prompt     = planner.create_llm_ic_prompt(task_nl, domain_nl, context, domain.name)
+    response           = planner.query_with_meta(prompt)
+    text_plan          = response.text
+    llm_time           = time.time() - start_time
 
     # B. write the problem file into the problem folder
     text_plan_file_name = f"./experiments/run{args.run}/results/llm_ic/{task_suffix}"
-    with open(text_plan_file_name, "w") as f:
+    with span("write", "io"), open(text_plan_file_name, "w") as f:
         f.write(text_plan)
     end_time = time.time()
     print(f"[info] task {task} takes {end_time - start_time} sec")
+    record_task_result(args, domain, "llm_ic_planner", plan_found=bool(text_plan.strip()),
+                       prompt_chars=len(prompt), response=response, plan_file=text_plan_file_name,
+                       timings={"llm": llm_time, "total": end_time - start_time})
 
 def print_all_prompts(planner):
     domain = Blocksworld()
@@ -940,7 +1375,8 @@ def print_all_prompts(planner):
         f"./prompts/llm/{domain.name}",
         f"./prompts/llm_ic/{domain.name}",
         f"./prompts/llm_pddl/{domain.name}",
-        f"./prompts/llm_ic_pddl/{domain.name}"]:
+        f"./prompts/llm_ic_pddl/{domain.name}",
+        f"./prompts/llm_ic_pddl_problem/{domain.name}"]:
         
         os.makedirs(folder_name, exist_ok=True)
 
@@ -952,6 +1388,7 @@ def print_all_prompts(planner):
         llm_ic_prompt = planner.create_llm_ic_prompt(task_nl, domain_nl, context, domain.name)
         llm_pddl_prompt = planner.create_llm_pddl_prompt(task_nl, domain_nl)
         llm_ic_pddl_prompt = planner.create_llm_ic_pddl_prompt(task_nl, domain_pddl, context)
+        llm_ic_pddl_problem_prompt = planner.create_llm_ic_pddl_problem_prompt(task_nl, domain_pddl, context)
         
         with open(f"./prompts/llm/{task_suffix}.prompt", "w") as f:
             f.write(llm_prompt)
@@ -961,43 +1398,216 @@ def print_all_prompts(planner):
             f.write(llm_pddl_prompt)
         with open(f"./prompts/llm_ic_pddl/{task_suffix}.prompt", "w") as f:
             f.write(llm_ic_pddl_prompt)
+        with open(f"./prompts/llm_ic_pddl_problem/{task_suffix}.prompt", "w") as f:
+            f.write(llm_ic_pddl_problem_prompt)
+
+METHODS = {
+    "llm_ic_pddl_planner" : llm_ic_pddl_planner,
+    "llm_ic_pddl_rag" : llm_ic_pddl_rag,
+    "llm_ic_pddl_problem_planner" : llm_ic_pddl_problem_planner,
+    "llm_pddl_planner" : llm_pddl_planner,
+    "llm_planner" : llm_planner,
+    "llm_ic_planner" : llm_ic_planner
+}
+
+DOMAINS = {
+    "blocksworld" : Blocksworld,
+    "gripper" : Gripper
+}
+
+def expand_sweep_args(args, domains):
+    """Expand --domain/--method/--task/--run into the list of (run, domain, task, methods) jobs"""
+    # methods of one task always run in METHODS order, so llm_ic_pddl_rag sees llm_ic_pddl output
+    methods = list(METHODS) if "all" in args.method else [m for m in METHODS if m in args.method]
+
+    jobs = []
+    for run in args.run:
+        for domain_name, domain in domains.items():
+            if "all" in args.task:
+                tasks = list(range(len(domain)))
+            else:
+                tasks = []
+                for t in args.task:
+                    t = int(t)
+                    if 0 <= t < len(domain):
+                        tasks.append(t)
+                    else:
+                        print(f"[warning] {domain_name} has no task {t}, skipping")
+            for task in tasks:
+                jobs.append((run, domain_name, task, methods))
+    return jobs
+
+def run_sweep_job(args, planner, domain, run, task, methods, raise_errors=False):
+    """Run the requested methods for one task in-process and return one summary row per method;
+    with raise_errors a failing method raises instead of being recorded as an error row"""
+    rows = []
+    for method_name in methods:
+        job_args = argparse.Namespace(**vars(args))
+        job_args.domain = domain.name
+        job_args.method = method_name
+        job_args.task = task
+        job_args.run = run
+
+        start_time = time.time()
+        status, error = "ok", None
+        try:
+            with span(method_name, "task", domain=domain.name, task=task, run=run):
+                METHODS[method_name](job_args, planner, domain)
+        except CacheMissError:
+            raise  # --replay ends the sweep on the first miss
+        except Exception as e:
+            if raise_errors:
+                raise
+            status, error = "error", f"{type(e).__name__}: {e}"
+            print(f"[error] {method_name} {domain.name} task {task} run {run} failed: {error}")
+            traceback.print_exc()
+
+        rows.append({
+            "run": run,
+            "domain": domain.name,
+            "task": task,
+            "method": method_name,
+            "status": status,
+            "elapsed": time.time() - start_time,
+            "error": error
+        })
+    return rows
+
+def run_sweep(args, planner):
+    """Run the whole (run x domain x task x method) matrix in one process"""
+    domain_names = list(DOMAINS) if args.domain == "all" else [args.domain]
+    domains = {name: DOMAINS[name]() for name in domain_names}
+    jobs = expand_sweep_args(args, domains)
+    # tasks of every (run, domain), from which packed requests are batched
+    args.sweep_tasks = {}
+    for run, domain_name, task, _ in jobs:
+        args.sweep_tasks.setdefault((run, domain_name), []).append(task)
+
+    print(f"[info] sweep: {len(jobs)} task(s) x {len(jobs[0][3]) if jobs else 0} method(s) with {args.workers} worker(s)")
+    if args.rag_warmup and any("llm_ic_pddl_rag" in methods for _, _, _, methods in jobs):
+        # connect and index once up front instead of inside the first failing task
+        with span("rag.warm_up", "kg"):
+            get_rag_context(COHERE_API_KEY).warm_up()
+    # a single job fails like a plain script run, with its own traceback
+    single_job = len(jobs) == 1 and len(jobs[0][3]) == 1
+    sweep_start = time.time()
+    rows = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(run_sweep_job, args, planner, domains[domain_name], run, task, methods,
+                                   single_job)
+                   for run, domain_name, task, methods in jobs]
+        try:
+            for future in as_completed(futures):
+                rows.extend(future.result())
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    rows.sort(key=lambda r: (r["run"], r["domain"], r["task"], list(METHODS).index(r["method"])))
+    summary = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sweep_start)),
+        "wall_time": time.time() - sweep_start,
+        "workers": args.workers,
+        "num_jobs": len(rows),
+        "num_errors": sum(1 for r in rows if r["status"] != "ok"),
+        "jobs": rows
+    }
+
+    if len(rows) > 1:
+        summary_file = args.summary_file or time.strftime("./experiments/sweep_summary_%Y%m%d-%H%M%S.json")
+        os.makedirs(os.path.dirname(summary_file) or ".", exist_ok=True)
+        with open(summary_file, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"[info] sweep finished in {summary['wall_time']:.1f} sec, "
+              f"{summary['num_errors']}/{summary['num_jobs']} job(s) failed, summary written to {summary_file}")
+    return summary
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="LLM-Planner")
-    parser.add_argument('--domain', type=str, choices=["blocksworld", "gripper"], default="blocksworld")
-    parser.add_argument('--method', type=str, choices=["llm_ic_pddl_planner",
-                                                       "llm_ic_pddl_rag",
-                                                       "llm_pddl_planner",
-                                                       "llm_planner",
-                                                       "llm_ic_planner"],
-                                              default="llm_planner")
+    parser.add_argument('--domain', type=str, choices=list(DOMAINS) + ["all"], default="blocksworld")
+    parser.add_argument('--method', type=str, nargs='+', choices=list(METHODS) + ["all"],
+                                              default=["llm_planner"])
     parser.add_argument('--time-limit', type=int, default=200)
-    parser.add_argument('--task', type=int, default=0)
-    parser.add_argument('--run', type=int, default=2)
+    parser.add_argument('--task', type=str, nargs='+', default=["0"],
+                        help="task index(es), or 'all' for every task of the domain")
+    parser.add_argument('--run', type=int, nargs='+', default=[2])
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of tasks processed concurrently in a sweep")
+    parser.add_argument('--summary-file', type=str, default=None,
+                        help="where to write the sweep summary (default: experiments/sweep_summary_<time>.json)")
+    parser.add_argument('--llm-concurrency', type=int, default=None,
+                        help="maximum number of in-flight LLM requests (default: $LLM_MAX_CONCURRENCY or 4)")
+    parser.add_argument('--llm-rate', type=float, default=None,
+                        help="maximum LLM requests started per second (default: $LLM_REQUESTS_PER_SECOND or 1.0)")
+    parser.add_argument('--llm-cache-dir', type=str, default=None,
+                        help="directory of the LLM response cache (default: $LLM_CACHE_DIR or cache/llm)")
+    parser.add_argument('--no-llm-cache', action='store_true',
+                        help="always call the LLM API, without reading or recording the response cache")
+    parser.add_argument('--stream', action='store_true', default=None,
+                        help="stream PDDL completions and stop once the domain and problem blocks are complete")
+    parser.add_argument('--pack', type=int, default=int(os.getenv("LLM_PACK_SIZE", "1")),
+                        help="tasks answered by one request in llm_ic_pddl_problem_planner sweeps (default: 1, no packing)")
+    parser.add_argument('--replay', action='store_true',
+                        help="answer LLM calls only from the response cache and fail on a cache miss")
+    parser.add_argument('--planner-workers', type=int, default=None,
+                        help="number of concurrent Fast Downward jobs (default: number of cores)")
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help="address-space limit per Fast Downward job in MB (default: $FD_MEMORY_LIMIT_MB or 4096)")
+    parser.add_argument('--translate-once', action='store_true',
+                        help="reuse translated SAS files (cache/sas) and run only the search for known inputs")
+    parser.add_argument('--no-prevalidate', dest='prevalidate', action='store_false',
+                        help="send generated PDDL to fast-downward without the in-process pre-validation")
+    parser.add_argument('--no-plan-cache', action='store_true',
+                        help="always run fast-downward instead of reusing results for equivalent PDDL")
+    parser.add_argument('--no-fast-path', action='store_true',
+                        help="always use fast-downward instead of trying the in-process planner first")
+    parser.add_argument('--fast-path-budget', type=float, default=None,
+                        help="seconds the in-process planner may search before falling back to fast-downward")
+    parser.add_argument('--repair-rounds', type=int, default=int(os.getenv("REPAIR_ROUNDS", "3")),
+                        help="maximum number of llm_ic_pddl_rag repair rounds per task")
+    parser.add_argument('--repair-candidates', type=int, default=int(os.getenv("REPAIR_CANDIDATES", "3")),
+                        help="problem files generated and planned concurrently in each repair round")
+    parser.add_argument('--no-local-repair', dest='local_repair', action='store_false',
+                        help="send every llm_ic_pddl_rag failure to the LLM repair, also mechanical ones")
+    parser.add_argument('--no-rag-warmup', dest='rag_warmup', action='store_false',
+                        help="connect to the knowledge graph only when the first llm_ic_pddl_rag task needs it")
+    parser.add_argument('--results-log', type=str, default=None,
+                        help="JSONL file that every task result is appended to (default: experiments/results.jsonl)")
+    parser.add_argument('--no-results-log', action='store_true',
+                        help="do not write task result records")
+    parser.add_argument('--trace-file', type=str, default=None,
+                        help="Chrome trace-event file the timing spans are written to (default: experiments/trace.json)")
+    parser.add_argument('--no-trace', action='store_true',
+                        help="do not record timing spans")
     parser.add_argument('--print-prompts', action='store_true')
     args = parser.parse_args()
 
-    # 1. initialize problem domain
-    if args.domain == "blocksworld":
-        domain = Blocksworld()
-    elif args.domain == "gripper":
-        domain = Gripper()
-    else:
-        raise ValueError(f"Unknown domain: {args.domain}")
-
-    # 2. initialize the planner
-    planner = Planner()
-
-    # 3. execute the llm planner
-    method = {
-        "llm_ic_pddl_planner" : llm_ic_pddl_planner,
-        "llm_ic_pddl_rag" : llm_ic_pddl_rag,
-        "llm_pddl_planner" : llm_pddl_planner,
-        "llm_planner" : llm_planner,
-        "llm_ic_planner" : llm_ic_planner
-    }[args.method]
-
+    configure_llm_client(max_concurrency=args.llm_concurrency,
+                         requests_per_second=args.llm_rate,
+                         cache_dir=args.llm_cache_dir,
+                         use_cache=False if args.no_llm_cache else None,
+                         replay=args.replay,
+                         stream=args.stream)
+    configure_planner_pool(max_workers=args.planner_workers, translate_once=args.translate_once or None)
+    configure_plan_cache(enabled=False if args.no_plan_cache else None)
+    configure_fast_path(enabled=False if args.no_fast_path else None, time_budget=args.fast_path_budget)
+    configure_results_log(enabled=False if args.no_results_log else None, path=args.results_log)
+    configure_tracing(enabled=False if args.no_trace else None, path=args.trace_file)
+
+    # 1. initialize the planner
+    planner = Planner(pack_size=args.pack)
+
+    # 2. execute the llm planner(s) for every requested domain / task / run
     if args.print_prompts:
         print_all_prompts(planner)
     else:
-        method(args, planner, domain)
+        try:
+            summary = run_sweep(args, planner)
+        finally:
+            shutdown_rag_context()
+            trace_file = export_trace()
+            if trace_file:
+                print(f"[info] timing spans written to {trace_file}")
+        if summary["num_errors"]:
+            sys.exit(1)
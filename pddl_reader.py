@@ -0,0 +1,290 @@
+"""
+PDDL S-Expression Reader
+Tokenizes PDDL text in a single pass, reads it into nested lists of lowercase
+tokens and builds a typed AST of domains and problems from them (types with
+supertypes, constants, predicates, actions with structured preconditions and
+effects, problem objects, init and goal).
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+SExpr = Union[str, list]
+
+# comments, parentheses and atoms, in a single left-to-right pass
+TOKEN_RE = re.compile(r";[^\n]*|[()]|[^\s();]+")
+
+
+class PDDLSyntaxError(ValueError):
+    """Raised when PDDL text is not a single well-formed S-expression"""
+
+    def __init__(self, message: str, kind: str):
+        super().__init__(message)
+        self.kind = kind  # "empty", "missing_close", "extra_close", "trailing_tokens" or "structure"
+
+
+def tokenize(text: str) -> List[str]:
+    """Split PDDL text into lowercase tokens, dropping comments"""
+    return [tok for tok in TOKEN_RE.findall(text.lower()) if tok[0] != ";"]
+
+
+def read_sexpr(tokens: List[str]) -> list:
+    """Read exactly one S-expression from a token list"""
+    if not tokens or tokens[0] != "(":
+        raise PDDLSyntaxError("PDDL text does not start with '('", "empty" if not tokens else "trailing_tokens")
+
+    stack = [[]]
+    for i, tok in enumerate(tokens):
+        if tok == "(":
+            stack.append([])
+        elif tok == ")":
+            if len(stack) == 1:
+                raise PDDLSyntaxError("Unexpected ')'", "extra_close")
+            closed = stack.pop()
+            stack[-1].append(closed)
+            if len(stack) == 1:
+                if i + 1 < len(tokens):
+                    remaining = " ".join(tokens[i + 1:i + 6])
+                    kind = "extra_close" if tokens[i + 1] == ")" else "trailing_tokens"
+                    raise PDDLSyntaxError(f"Tokens remaining after final ')': {remaining}", kind)
+                return closed
+        else:
+            stack[-1].append(tok)
+    raise PDDLSyntaxError(f"Missing ')': {len(stack) - 1} unclosed parenthes{'is' if len(stack) == 2 else 'es'}",
+                          "missing_close")
+
+
+def parse_sexpr(text: str) -> list:
+    """Parse PDDL text into a nested list"""
+    return read_sexpr(tokenize(text))
+
+
+def to_text(sexpr: SExpr) -> str:
+    """Render an S-expression with single spaces"""
+    if isinstance(sexpr, str):
+        return sexpr
+    return "(" + " ".join(to_text(item) for item in sexpr) + ")"
+
+
+CONNECTIVES = {"and", "or", "not", "imply"}
+QUANTIFIERS = {"forall", "exists"}
+# numeric effects and comparisons, and equality, which are kept as plain S-expressions
+EXPRESSION_OPS = {"increase", "decrease", "assign", "scale-up", "scale-down",
+                  "<", ">", "<=", ">=", "=", "+", "-", "*", "/"}
+
+
+def type_names(type_spec: SExpr) -> List[str]:
+    """Type names referenced by a type spec, which may be (either t1 t2)"""
+    if isinstance(type_spec, list):
+        return [t for t in type_spec[1:] if isinstance(t, str)]
+    return [type_spec]
+
+
+class TypedName(NamedTuple):
+    name: str
+    type: SExpr = "object"  # a type name or ['either', t1, t2, ...]
+
+    @property
+    def type_names(self) -> List[str]:
+        return type_names(self.type)
+
+    def __str__(self):
+        return self.name if self.type == "object" else f"{self.name} - {to_text(self.type)}"
+
+
+class Atom(NamedTuple):
+    predicate: str
+    args: Tuple[SExpr, ...]
+
+    def __str__(self):
+        return to_text([self.predicate, *self.args])
+
+
+class Compound(NamedTuple):
+    connective: str  # and, or, not, imply
+    parts: Tuple["Formula", ...]
+
+    def __str__(self):
+        return f"({' '.join([self.connective, *map(str, self.parts)])})"
+
+
+class Quantified(NamedTuple):
+    quantifier: str  # forall, exists
+    variables: Tuple[TypedName, ...]
+    body: Optional["Formula"]
+
+    def __str__(self):
+        return f"({self.quantifier} ({' '.join(map(str, self.variables))}) {self.body or '()'})"
+
+
+class When(NamedTuple):
+    condition: Optional["Formula"]
+    effect: Optional["Formula"]
+
+    def __str__(self):
+        return f"(when {self.condition or '()'} {self.effect or '()'})"
+
+
+class Expression(NamedTuple):
+    operator: str
+    args: Tuple[SExpr, ...]
+
+    def __str__(self):
+        return to_text([self.operator, *self.args])
+
+
+Formula = Union[Atom, Compound, Quantified, When, Expression]
+
+
+class Predicate(NamedTuple):
+    name: str
+    parameters: Tuple[TypedName, ...]
+
+    def __str__(self):
+        return f"({' '.join([self.name, *map(str, self.parameters)])})"
+
+
+class Action(NamedTuple):
+    name: str
+    parameters: Tuple[TypedName, ...]
+    precondition: Optional[Formula]
+    effect: Optional[Formula]
+
+
+class Domain(NamedTuple):
+    name: str
+    requirements: Tuple[str, ...]
+    types: Tuple[TypedName, ...]  # each type with its supertype
+    constants: Tuple[TypedName, ...]
+    predicates: Tuple[Predicate, ...]
+    functions: Tuple[Predicate, ...]
+    actions: Tuple[Action, ...]
+
+
+class Problem(NamedTuple):
+    name: str
+    domain_name: Optional[str]
+    requirements: Tuple[str, ...]
+    objects: Tuple[TypedName, ...]
+    init: Tuple[Formula, ...]
+    goal: Optional[Formula]
+
+    @property
+    def goal_parts(self) -> Tuple[Formula, ...]:
+        """The conjuncts of the goal"""
+        if isinstance(self.goal, Compound) and self.goal.connective == "and":
+            return self.goal.parts
+        return (self.goal,) if self.goal is not None else ()
+
+
+def parse_typed_list(items: list) -> List[TypedName]:
+    """Turn ['a', 'b', '-', 't', 'c'] into [a - t, b - t, c - object]"""
+    result = []
+    pending = []
+    i = 0
+    while i < len(items):
+        item = items[i]
+        if item == "-" and i + 1 < len(items):
+            result.extend(TypedName(name, items[i + 1]) for name in pending)
+            pending = []
+            i += 2
+            continue
+        if isinstance(item, str):
+            pending.append(item)
+        i += 1
+    result.extend(TypedName(name) for name in pending)
+    return result
+
+
+def read_formula(sexpr: SExpr) -> Optional[Formula]:
+    """Build a condition or effect; anything that is not a formula, like (), gives None"""
+    if not isinstance(sexpr, list) or not sexpr or not isinstance(sexpr[0], str):
+        return None
+    head = sexpr[0]
+    if head in CONNECTIVES:
+        return Compound(head, tuple(part for part in map(read_formula, sexpr[1:]) if part is not None))
+    if head in QUANTIFIERS:
+        if len(sexpr) < 3 or not isinstance(sexpr[1], list):
+            return None
+        return Quantified(head, tuple(parse_typed_list(sexpr[1])), read_formula(sexpr[2]))
+    if head == "when":
+        return When(read_formula(sexpr[1]) if len(sexpr) > 1 else None,
+                    read_formula(sexpr[2]) if len(sexpr) > 2 else None)
+    if head in EXPRESSION_OPS:
+        return Expression(head, tuple(sexpr[1:]))
+    return Atom(head, tuple(sexpr[1:]))
+
+
+def _sections(sexpr: list, kind: str) -> Dict[str, list]:
+    """Check the (define (<kind> name) ...) wrapper and index its sections by keyword"""
+    if not sexpr or sexpr[0] != "define" or len(sexpr) < 2 or not isinstance(sexpr[1], list) \
+            or len(sexpr[1]) != 2 or sexpr[1][0] != kind or not isinstance(sexpr[1][1], str):
+        raise PDDLSyntaxError(f"missing (define ({kind} <name>) ...) block", "structure")
+    sections = {}
+    for section in sexpr[2:]:
+        if isinstance(section, list) and section and isinstance(section[0], str):
+            sections.setdefault(section[0], []).append(section)
+    return sections
+
+
+def _flags(sections: Dict[str, list]) -> Tuple[str, ...]:
+    return tuple(flag for s in sections.get(":requirements", []) for flag in s[1:] if isinstance(flag, str))
+
+
+def _typed_sections(sections: Dict[str, list], keyword: str) -> Tuple[TypedName, ...]:
+    return tuple(name for s in sections.get(keyword, []) for name in parse_typed_list(s[1:]))
+
+
+def _signatures(sections: Dict[str, list], keyword: str) -> Tuple[Predicate, ...]:
+    return tuple(Predicate(item[0], tuple(parse_typed_list(item[1:])))
+                 for s in sections.get(keyword, []) for item in s[1:]
+                 if isinstance(item, list) and item and isinstance(item[0], str))
+
+
+def _read_action(section: list) -> Action:
+    fields = {section[i]: section[i + 1] for i in range(2, len(section) - 1, 2) if isinstance(section[i], str)}
+    parameters = fields.get(":parameters")
+    return Action(
+        name=to_text(section[1]) if len(section) > 1 else "",
+        parameters=tuple(parse_typed_list(parameters)) if isinstance(parameters, list) else (),
+        precondition=read_formula(fields.get(":precondition")),
+        effect=read_formula(fields.get(":effect"))
+    )
+
+
+def read_domain(sexpr: list) -> Domain:
+    """Build the AST of a parsed domain file"""
+    sections = _sections(sexpr, "domain")
+    return Domain(
+        name=sexpr[1][1],
+        requirements=_flags(sections),
+        types=_typed_sections(sections, ":types"),
+        constants=_typed_sections(sections, ":constants"),
+        predicates=_signatures(sections, ":predicates"),
+        functions=_signatures(sections, ":functions"),
+        actions=tuple(_read_action(section) for section in sections.get(":action", []))
+    )
+
+
+def read_problem(sexpr: list) -> Problem:
+    """Build the AST of a parsed problem file"""
+    sections = _sections(sexpr, "problem")
+    domain_refs = sections.get(":domain", [])
+    goals = [goal for s in sections.get(":goal", []) for goal in map(read_formula, s[1:]) if goal is not None]
+    return Problem(
+        name=sexpr[1][1],
+        domain_name=domain_refs[0][1] if domain_refs and len(domain_refs[0]) > 1 else None,
+        requirements=_flags(sections),
+        objects=_typed_sections(sections, ":objects"),
+        init=tuple(fact for s in sections.get(":init", []) for fact in map(read_formula, s[1:]) if fact is not None),
+        goal=goals[0] if len(goals) == 1 else (Compound("and", tuple(goals)) if goals else None)
+    )
+
+
+def parse_domain(text: str) -> Domain:
+    """Parse domain PDDL text into a Domain"""
+    return read_domain(parse_sexpr(text))
+
+
+def parse_problem(text: str) -> Problem:
+    """Parse problem PDDL text into a Problem"""
+    return read_problem(parse_sexpr(text))
@@ -0,0 +1,297 @@
+"""
+Local PDDL Repair
+Fixes the mechanical mistakes of generated PDDL in process, without an LLM call:
+markdown fences, text before (define or after its final ')', unbalanced
+parentheses, a (:domain ...) reference that does not match the domain name,
+misspelled section keywords and wrong or missing requirement flags. Whatever it
+cannot fix is left to the RAG + LLM repair of llm_ic_pddl_rag.
+"""
+import difflib
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from pddl_reader import TOKEN_RE, PDDLSyntaxError, parse_sexpr, to_text
+from pddl_validator import DOMAIN_SECTIONS, PROBLEM_SECTIONS
+
+ACTION_FIELDS = {":parameters", ":precondition", ":effect"}
+REQUIREMENTS = {
+    ":strips", ":typing", ":negative-preconditions", ":disjunctive-preconditions", ":equality",
+    ":existential-preconditions", ":universal-preconditions", ":quantified-preconditions",
+    ":conditional-effects", ":fluents", ":numeric-fluents", ":object-fluents", ":adl",
+    ":durative-actions", ":duration-inequalities", ":continuous-effects", ":derived-predicates",
+    ":timed-initial-literals", ":preferences", ":constraints", ":action-costs",
+}
+ADL_REQUIREMENTS = {
+    ":strips", ":typing", ":negative-preconditions", ":disjunctive-preconditions", ":equality",
+    ":existential-preconditions", ":universal-preconditions", ":quantified-preconditions",
+    ":conditional-effects",
+}
+# requirement flag needed by each connective of a precondition or goal
+PRECONDITION_REQUIREMENTS = {
+    "not": ":negative-preconditions",
+    "=": ":equality",
+    "or": ":disjunctive-preconditions",
+    "imply": ":disjunctive-preconditions",
+    "exists": ":existential-preconditions",
+    "forall": ":universal-preconditions",
+}
+EFFECT_REQUIREMENTS = {"when": ":conditional-effects", "forall": ":conditional-effects"}
+
+FENCE_RE = re.compile(r"^[ \t]*```[^\n]*\n?", re.MULTILINE)
+DEFINE_RE = re.compile(r"\(\s*define\b", re.IGNORECASE)
+
+
+class LocalRepair(NamedTuple):
+    domain: str
+    problem: str
+    fixes: List[str]  # one line per fix, labeled DOMAIN: or PROBLEM: like the validator's issues
+
+
+def _strip_wrapping(text: str, label: str, fixes: List[str]) -> str:
+    """Drop markdown fences and any text before (define"""
+    if "```" in text:
+        text = FENCE_RE.sub("", text)
+        fixes.append(f"{label}: removed markdown fences")
+    match = DEFINE_RE.search(text)
+    if match and re.sub(r";[^\n]*", "", text[:match.start()]).strip():
+        text = text[match.start():]
+        fixes.append(f"{label}: removed text before (define")
+    return text
+
+
+def _balance(text: str, label: str, fixes: List[str]) -> str:
+    """Close sections and action fields that run into the next one, drop extra ')'
+    and trailing text, and close whatever is still open at the end"""
+    tokens = [m for m in TOKEN_RE.finditer(text) if not m.group().startswith(";")]
+    inserts = {}  # position -> number of ')' inserted before it
+    deletes = set()  # positions of ')' that are dropped
+    heads = []  # first token of every open list
+    last_close = None  # the ')' that closed (define ...)
+    cut = len(text)
+    added = removed = 0
+
+    def close_to(depth: int, pos: int):
+        nonlocal added
+        count = len(heads) - depth
+        inserts[pos] = inserts.get(pos, 0) + count
+        added += count
+        del heads[depth:]
+
+    for i, match in enumerate(tokens):
+        tok = match.group().lower()
+        following = tokens[i + 1].group().lower() if i + 1 < len(tokens) else ""
+        if not heads and last_close is not None:
+            if tok == "(" and following in DOMAIN_SECTIONS | PROBLEM_SECTIONS:
+                # (define ...) was closed too early by an extra ')'
+                deletes.add(last_close)
+                removed += 1
+                heads.append("define")
+                last_close = None
+            elif tok == ")":
+                deletes.add(match.start())
+                removed += 1
+                continue
+            else:
+                cut = match.start()
+                fixes.append(f"{label}: removed text after the final ')'")
+                break
+        if tok == "(":
+            if following in DOMAIN_SECTIONS | PROBLEM_SECTIONS and len(heads) > 1:
+                close_to(1, match.start())
+            heads.append(following)
+        elif tok == ")":
+            if not heads:
+                deletes.add(match.start())
+                removed += 1
+                continue
+            heads.pop()
+            if not heads:
+                last_close = match.start()
+        elif tok in ACTION_FIELDS and len(heads) > 2 and heads[1] == ":action":
+            close_to(2, match.start())
+
+    if heads:
+        inserts[cut] = inserts.get(cut, 0) + len(heads)
+        added += len(heads)
+    if added:
+        fixes.append(f"{label}: added {added} missing ')'")
+    if removed:
+        fixes.append(f"{label}: removed {removed} extra ')'")
+    if not added and not removed and cut == len(text):
+        return text
+
+    out = []
+    for pos, char in enumerate(text[:cut]):
+        out.append(")" * inserts.get(pos, 0))
+        if pos not in deletes:
+            out.append(char)
+    out.append(")" * inserts.get(cut, 0))
+    return "".join(out).rstrip() + "\n"
+
+
+def _rename_keywords(sexpr: list, allowed: set, label: str, fixes: List[str]) -> bool:
+    """Fix misspelled section keywords and action fields; returns True if any was renamed"""
+    changed = False
+    for section in sexpr[2:]:
+        if not isinstance(section, list) or not section or not isinstance(section[0], str):
+            continue
+        if section[0] not in allowed and section[0] not in DOMAIN_SECTIONS | PROBLEM_SECTIONS:
+            close = difflib.get_close_matches(section[0], sorted(allowed), n=1, cutoff=0.8)
+            if close:
+                fixes.append(f"{label}: renamed section {section[0]} to {close[0]}")
+                section[0] = close[0]
+                changed = True
+        if section[0] == ":action":
+            for i in range(2, len(section), 2):
+                field = section[i]
+                if isinstance(field, str) and field.startswith(":") and field not in ACTION_FIELDS:
+                    close = difflib.get_close_matches(field, sorted(ACTION_FIELDS), n=1, cutoff=0.8)
+                    if close:
+                        fixes.append(f"{label}: renamed {field} of action {section[1]} to {close[0]}")
+                        section[i] = close[0]
+                        changed = True
+    return changed
+
+
+def _heads(formula) -> set:
+    """Heads of every list nested in a formula"""
+    if not isinstance(formula, list) or not formula:
+        return set()
+    heads = {formula[0]} if isinstance(formula[0], str) else set()
+    for sub in formula[1:]:
+        heads |= _heads(sub)
+    return heads
+
+
+def _has_typed_list(sexpr) -> bool:
+    """Whether any list uses '-' to give a type (a leading '-' is numeric minus)"""
+    if not isinstance(sexpr, list):
+        return False
+    return "-" in sexpr[1:] or any(_has_typed_list(item) for item in sexpr)
+
+
+def _needed_requirements(sexpr: list) -> set:
+    """Requirement flags a domain uses"""
+    needed = {":strips"}
+    for section in sexpr[2:]:
+        if not isinstance(section, list) or not section:
+            continue
+        if section[0] == ":types" or _has_typed_list(section):
+            needed.add(":typing")
+        if section[0] == ":action":
+            fields = {section[i]: section[i + 1] for i in range(2, len(section) - 1, 2)}
+            needed.update(flag for head, flag in PRECONDITION_REQUIREMENTS.items()
+                          if head in _heads(fields.get(":precondition")))
+            needed.update(flag for head, flag in EFFECT_REQUIREMENTS.items()
+                          if head in _heads(fields.get(":effect")))
+        elif section[0] == ":derived":
+            needed.add(":derived-predicates")
+    return needed
+
+
+def _fix_requirements(sexpr: list, needed: set, label: str, fixes: List[str]) -> bool:
+    """Correct misspelled flags, drop unknown ones and add the missing ones; returns True if changed"""
+    sections = [s for s in sexpr[2:] if isinstance(s, list) and s and s[0] == ":requirements"]
+    if not sections and not needed - {":strips"}:
+        return False
+    if not sections:
+        sections = [[":requirements"]]
+        sexpr.insert(2, sections[0])
+    section = sections[0]
+
+    flags = []
+    for flag in section[1:]:
+        if not isinstance(flag, str):
+            continue
+        if flag not in REQUIREMENTS:
+            close = difflib.get_close_matches(flag if flag.startswith(":") else f":{flag}",
+                                              sorted(REQUIREMENTS), n=1, cutoff=0.75)
+            fixes.append(f"{label}: " + (f"replaced requirement {flag} with {close[0]}" if close
+                                         else f"removed unknown requirement {flag}"))
+            if not close:
+                continue
+            flag = close[0]
+        if flag not in flags:
+            flags.append(flag)
+    covered = set(flags) | (ADL_REQUIREMENTS if ":adl" in flags else set())
+    missing = sorted(needed - covered - {":strips"})
+    if missing:
+        fixes.append(f"{label}: added requirement(s) {' '.join(missing)}")
+        flags.extend(missing)
+    if flags == section[1:]:
+        return False
+    section[1:] = flags
+    return True
+
+
+def format_pddl(sexpr: list) -> str:
+    """Render a parsed domain or problem with one section, action field, fact or predicate per line"""
+    lines = [f"(define {to_text(sexpr[1])}"]
+    for section in sexpr[2:]:
+        if not isinstance(section, list) or not section:
+            lines.append(f"  {to_text(section)}")
+        elif section[0] == ":action":
+            lines.append(f"  (:action {to_text(section[1])}")
+            for i in range(2, len(section), 2):
+                value = f" {to_text(section[i + 1])}" if i + 1 < len(section) else ""
+                lines.append(f"    {to_text(section[i])}{value}")
+            lines[-1] += ")"
+        elif section[0] in (":predicates", ":init", ":objects", ":constants") and len(section) > 2:
+            lines.append(f"  ({section[0]}")
+            items = section[1:]
+            if section[0] in (":objects", ":constants"):
+                lines.append(f"    {' '.join(to_text(item) for item in items)})")
+                continue
+            lines.extend(f"    {to_text(item)}" for item in items)
+            lines[-1] += ")"
+        else:
+            lines.append(f"  {to_text(section)}")
+    lines[-1] += ")"
+    return "\n".join(lines) + "\n"
+
+
+def _repair_file(text: str, kind: str, fixes: List[str]) -> Tuple[str, Optional[list]]:
+    """Text-level fixes of one file; returns the text and its parse, or None if it still does not parse"""
+    label = kind.upper()
+    text = _balance(_strip_wrapping(text, label, fixes), label, fixes)
+    try:
+        sexpr = parse_sexpr(text)
+    except PDDLSyntaxError:
+        return text, None
+    if len(sexpr) < 2 or sexpr[0] != "define" or not isinstance(sexpr[1], list) or sexpr[1][:1] != [kind]:
+        return text, None
+    return text, sexpr
+
+
+def repair_pddl(domain_text: str, problem_text: str) -> LocalRepair:
+    """Apply every local fix to a domain/problem pair; fixes is empty if nothing was changed"""
+    fixes = []
+    domain_text, domain = _repair_file(domain_text, "domain", fixes)
+    problem_text, problem = _repair_file(problem_text, "problem", fixes)
+
+    if domain is not None:
+        changed = _rename_keywords(domain, DOMAIN_SECTIONS, "DOMAIN", fixes)
+        changed = _fix_requirements(domain, _needed_requirements(domain), "DOMAIN", fixes) or changed
+        if changed:
+            domain_text = format_pddl(domain)
+
+    if problem is not None:
+        changed = _rename_keywords(problem, PROBLEM_SECTIONS, "PROBLEM", fixes)
+        if domain is not None and len(domain[1]) > 1:
+            domain_name = domain[1][1]
+            refs = [s for s in problem[2:] if isinstance(s, list) and s and s[0] == ":domain"]
+            if not refs:
+                problem.insert(2, [":domain", domain_name])
+                fixes.append(f"PROBLEM: added (:domain {domain_name})")
+                changed = True
+            elif refs[0][1:] != [domain_name]:
+                fixes.append(f"PROBLEM: replaced (:domain {' '.join(map(to_text, refs[0][1:]))}) "
+                             f"with (:domain {domain_name})")
+                refs[0][1:] = [domain_name]
+                changed = True
+        if any(isinstance(s, list) and s[:1] == [":requirements"] for s in problem[2:]):
+            changed = _fix_requirements(problem, set(), "PROBLEM", fixes) or changed
+        if changed:
+            problem_text = format_pddl(problem)
+
+    return LocalRepair(domain_text, problem_text, fixes)
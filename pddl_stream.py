@@ -0,0 +1,77 @@
+"""
+Incremental PDDL Extraction
+Finds the (define (domain ...)) and (define (problem ...)) blocks of a streamed LLM
+completion as the text arrives, so a stream can be stopped as soon as both blocks
+are balanced and each block can be used the moment it is complete.
+"""
+import re
+from typing import Callable, List, Optional
+
+DEFINE = "(define"
+BLOCK_KIND_RE = re.compile(r"\(\s*define\s*\(\s*(domain|problem)\b", re.IGNORECASE)
+
+
+class PDDLBlockExtractor:
+    """Feeds on text chunks and collects balanced (define ...) blocks"""
+
+    def __init__(self, on_block: Optional[Callable[[str, str], None]] = None, max_blocks: int = 2):
+        self.on_block = on_block  # called with (kind, text) for every completed block
+        self.max_blocks = max_blocks
+        self.blocks: List[str] = []
+        self.kinds: List[str] = []
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._start = None
+        self._in_comment = False
+
+    @property
+    def complete(self) -> bool:
+        return len(self.blocks) >= self.max_blocks
+
+    def block(self, kind: str) -> Optional[str]:
+        """First completed block of a kind ("domain" or "problem")"""
+        for block_kind, text in zip(self.kinds, self.blocks):
+            if block_kind == kind:
+                return text
+        return None
+
+    def feed(self, chunk: str) -> bool:
+        """Scan a new chunk of text; returns True once max_blocks blocks are complete"""
+        self._text += chunk
+        text = self._text
+        i = self._pos
+        while i < len(text) and not self.complete:
+            char = text[i]
+            if self._in_comment:
+                if char == "\n":
+                    self._in_comment = False
+            elif self._start is None:
+                # outside a block only "(define" opens one; any other chatter is skipped
+                if char == "(":
+                    candidate = text[i:i + len(DEFINE)].lower()
+                    if len(candidate) < len(DEFINE) and DEFINE.startswith(candidate):
+                        break  # wait for the rest of the keyword
+                    if candidate == DEFINE:
+                        self._start = i
+                        self._depth = 1
+            elif char == ";":
+                self._in_comment = True
+            elif char == "(":
+                self._depth += 1
+            elif char == ")":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish(text[self._start:i + 1])
+            i += 1
+        self._pos = i
+        return self.complete
+
+    def _finish(self, block: str):
+        self._start = None
+        match = BLOCK_KIND_RE.match(block)
+        kind = match.group(1).lower() if match else ("domain" if not self.blocks else "problem")
+        self.blocks.append(block)
+        self.kinds.append(kind)
+        if self.on_block is not None:
+            self.on_block(kind, block)
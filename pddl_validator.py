@@ -0,0 +1,207 @@
+"""
+In-Process PDDL Pre-Validator
+Catches the syntax and consistency errors that make Fast Downward's translator fail
+(unbalanced parentheses, trailing text, domain name mismatch, undeclared
+predicates/types/objects, arity mismatches) in milliseconds, before any subprocess
+is spawned. Issues use the error categories of classify_error_from_logs.
+"""
+import difflib
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from pddl_reader import (Atom, Compound, PDDLSyntaxError, Quantified, When, parse_sexpr, read_domain,
+                         read_problem, type_names)
+
+DOMAIN_SECTIONS = {":requirements", ":types", ":constants", ":predicates", ":functions",
+                   ":action", ":derived", ":durative-action"}
+PROBLEM_SECTIONS = {":domain", ":requirements", ":objects", ":init", ":goal", ":metric", ":constraints"}
+
+
+class ValidationIssue(NamedTuple):
+    error_type: str
+    message: str
+    severity: str = "error"
+
+
+def has_errors(issues: List[ValidationIssue]) -> bool:
+    return any(issue.severity == "error" for issue in issues)
+
+
+def format_issues(issues: List[ValidationIssue]) -> str:
+    return "\n".join(f"[{issue.severity}] {issue.error_type}: {issue.message}" for issue in issues)
+
+
+def _read_file(text: str, kind: str, issues: List[ValidationIssue]) -> Optional[list]:
+    """Parse one PDDL file and check its (define (<kind> name) ...) wrapper"""
+    label = kind.upper()
+    try:
+        sexpr = parse_sexpr(text)
+    except PDDLSyntaxError as e:
+        if e.kind in ("missing_close", "extra_close"):
+            issues.append(ValidationIssue("UNMATCHED_PARENTHESES", f"{label}: {e}"))
+        else:
+            issues.append(ValidationIssue("PLANNER_PARSE_ERROR", f"{label}: {e}"))
+        return None
+
+    if not sexpr or sexpr[0] != "define" or len(sexpr) < 2 or not isinstance(sexpr[1], list) \
+            or len(sexpr[1]) != 2 or not isinstance(sexpr[1][1], str):
+        issues.append(ValidationIssue("PLANNER_PARSE_ERROR", f"{label}: missing (define ({kind} <name>) ...) block"))
+        return None
+    if sexpr[1][0] != kind:
+        issues.append(ValidationIssue("WRONG_SECTION", f"{label}: expected ({kind} <name>) but found ({sexpr[1][0]} ...)"))
+        return None
+    return sexpr
+
+
+def _check_sections(sexpr: list, allowed: Set[str], other: Set[str], label: str,
+                    issues: List[ValidationIssue]) -> Dict[str, list]:
+    """Index sections by keyword and report unknown or misplaced ones"""
+    sections = {}
+    for section in sexpr[2:]:
+        if not isinstance(section, list) or not section or not isinstance(section[0], str):
+            issues.append(ValidationIssue("PLANNER_PARSE_ERROR", f"{label}: unexpected element {section!r}"))
+            continue
+        keyword = section[0]
+        if keyword in allowed:
+            sections.setdefault(keyword, []).append(section)
+        elif keyword in other:
+            issues.append(ValidationIssue("WRONG_SECTION", f"{label}: {keyword} does not belong in the {label.lower()} file"))
+        else:
+            close = difflib.get_close_matches(keyword, sorted(allowed), n=1)
+            hint = f" (did you mean {close[0]}?)" if close else ""
+            issues.append(ValidationIssue("MISSPELLED_KEYWORD", f"{label}: unknown section {keyword}{hint}"))
+    return sections
+
+
+class _DomainInfo(NamedTuple):
+    name: str
+    requirements: Set[str]
+    types: Set[str]
+    constants: Dict[str, str]
+    predicates: Dict[str, int]
+
+
+def _collect_atoms(formula, bound: Set[str], out: List[Tuple[str, tuple, Set[str]]]):
+    """Collect (predicate, args, bound variables) for every atom in a condition or effect"""
+    if isinstance(formula, Atom):
+        out.append((formula.predicate, formula.args, bound))
+    elif isinstance(formula, Compound):
+        for part in formula.parts:
+            _collect_atoms(part, bound, out)
+    elif isinstance(formula, Quantified):
+        _collect_atoms(formula.body, bound | {variable.name for variable in formula.variables}, out)
+    elif isinstance(formula, When):
+        _collect_atoms(formula.condition, bound, out)
+        _collect_atoms(formula.effect, bound, out)
+
+
+def _check_atoms(atoms, domain: _DomainInfo, objects: Set[str], label: str, issues: List[ValidationIssue]):
+    reported = set()
+    for predicate, args, bound in atoms:
+        if predicate not in domain.predicates:
+            if predicate not in reported:
+                reported.add(predicate)
+                issues.append(ValidationIssue("UNKNOWN_PREDICATE", f"{label}: predicate {predicate} is not declared in the domain"))
+            continue
+        arity = domain.predicates[predicate]
+        if len(args) != arity:
+            key = (predicate, len(args))
+            if key not in reported:
+                reported.add(key)
+                issues.append(ValidationIssue("PLANNER_PARSE_ERROR",
+                                              f"{label}: predicate {predicate} takes {arity} argument(s) but is used with {len(args)}"))
+        for arg in args:
+            if not isinstance(arg, str):
+                continue
+            if arg.startswith("?"):
+                if arg not in bound and arg not in reported:
+                    reported.add(arg)
+                    issues.append(ValidationIssue("PLANNER_PARSE_ERROR", f"{label}: variable {arg} is not declared"))
+            elif arg not in objects and arg not in reported:
+                reported.add(arg)
+                issues.append(ValidationIssue("PLANNER_PARSE_ERROR", f"{label}: object {arg} is not declared"))
+
+
+def _check_types_declared(names, domain: _DomainInfo, label: str, issues: List[ValidationIssue], reported: Set[str]):
+    for type_name in names:
+        if type_name != "object" and type_name not in domain.types and type_name not in reported:
+            reported.add(type_name)
+            issues.append(ValidationIssue("MISSING_TYPE", f"{label}: type {type_name} is not declared in :types"))
+
+
+def _analyze_domain(sexpr: list, issues: List[ValidationIssue]) -> _DomainInfo:
+    _check_sections(sexpr, DOMAIN_SECTIONS, PROBLEM_SECTIONS - DOMAIN_SECTIONS, "DOMAIN", issues)
+    ast = read_domain(sexpr)
+
+    types = set()
+    for declared in ast.types:
+        types.add(declared.name)
+        types.update(declared.type_names)  # supertypes are declared implicitly
+    constants = {constant.name: constant.type for constant in ast.constants}
+    predicates = {predicate.name: len(predicate.parameters) for predicate in ast.predicates}
+    requirements = set(ast.requirements)
+    domain = _DomainInfo(ast.name, requirements, types, constants, predicates)
+
+    used_types = set()
+    used_types.update(t for constant in ast.constants for t in constant.type_names)
+    used_types.update(t for predicate in ast.predicates for param in predicate.parameters for t in param.type_names)
+
+    atoms = []
+    for action in ast.actions:
+        used_types.update(t for param in action.parameters for t in param.type_names)
+        bound = {param.name for param in action.parameters}
+        _collect_atoms(action.precondition, bound, atoms)
+        _collect_atoms(action.effect, bound, atoms)
+
+    reported = set()
+    _check_types_declared(sorted(used_types), domain, "DOMAIN", issues, reported)
+    _check_atoms(atoms, domain, set(constants), "DOMAIN", issues)
+
+    if types and ":typing" not in requirements and ":adl" not in requirements:
+        issues.append(ValidationIssue("MISSING_REQUIREMENT", "DOMAIN: types are used without :typing", "warning"))
+    return domain
+
+
+def validate_domain(domain_text: str) -> List[ValidationIssue]:
+    """Validate a domain file on its own"""
+    issues = []
+    sexpr = _read_file(domain_text, "domain", issues)
+    if sexpr is not None:
+        _analyze_domain(sexpr, issues)
+    return issues
+
+
+def validate_pddl(domain_text: str, problem_text: str) -> List[ValidationIssue]:
+    """Validate a domain/problem pair; returns an empty list when nothing is wrong"""
+    issues = []
+    domain_sexpr = _read_file(domain_text, "domain", issues)
+    problem_sexpr = _read_file(problem_text, "problem", issues)
+    if domain_sexpr is None:
+        return issues
+    domain = _analyze_domain(domain_sexpr, issues)
+    if problem_sexpr is None:
+        return issues
+
+    sections = _check_sections(problem_sexpr, PROBLEM_SECTIONS, DOMAIN_SECTIONS - PROBLEM_SECTIONS, "PROBLEM", issues)
+    problem = read_problem(problem_sexpr)
+    if not sections.get(":domain"):
+        issues.append(ValidationIssue("PLANNER_PARSE_ERROR", "PROBLEM: missing (:domain <name>)"))
+    elif problem.domain_name != domain.name:
+        issues.append(ValidationIssue("PLANNER_PARSE_ERROR",
+                                      f"PROBLEM: (:domain {problem.domain_name}) does not match domain name {domain.name}"))
+
+    objects = dict(domain.constants)
+    objects.update((obj.name, obj.type) for obj in problem.objects)
+    reported = set()
+    _check_types_declared(sorted({t for spec in objects.values() for t in type_names(spec)}),
+                          domain, "PROBLEM", issues, reported)
+
+    atoms = []
+    for fact in problem.init:
+        _collect_atoms(fact, set(), atoms)
+    _collect_atoms(problem.goal, set(), atoms)
+    if not sections.get(":init"):
+        issues.append(ValidationIssue("PLANNER_PARSE_ERROR", "PROBLEM: missing :init section"))
+    if not sections.get(":goal"):
+        issues.append(ValidationIssue("PLANNER_PARSE_ERROR", "PROBLEM: missing :goal section"))
+    _check_atoms(atoms, domain, set(objects), "PROBLEM", issues)
+    return issues
@@ -0,0 +1,161 @@
+"""
+Plan Cache for Fast Downward Results
+Results are keyed on a canonical form of the domain and problem PDDL (case,
+whitespace and comments normalized, :init facts and goal conjuncts sorted), so
+LLM output that differs from an earlier attempt only cosmetically is not planned again.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from disk_cache import DiskCache
+from fd_runner import FDJob, FDResult
+from pddl_reader import PDDLSyntaxError, parse_sexpr, to_text, tokenize
+
+# deterministic outcomes: plans, unsolvability proofs and rejected input or features. Crashes (30, 32)
+# and resource limits can be caused by the environment and are planned again.
+CACHEABLE_EXIT_CODES = {0, 10, 11, 12, 31, 33, 34, 36, 37}
+
+
+def canonicalize_pddl(text: str) -> str:
+    """Canonical text of a domain or problem; falls back to normalized tokens if it does not parse"""
+    try:
+        sexpr = parse_sexpr(text)
+    except PDDLSyntaxError:
+        return " ".join(tokenize(text))
+
+    canonical = []
+    for section in sexpr:
+        if isinstance(section, list) and section:
+            if section[0] == "problem":
+                section = ["problem", "_"]  # the problem name does not affect the plan
+            elif section[0] == ":init":
+                section = [":init"] + sorted(section[1:], key=to_text)
+            elif section[0] == ":goal" and len(section) == 2 and isinstance(section[1], list) \
+                    and section[1] and section[1][0] == "and":
+                section = [":goal", ["and"] + sorted(section[1][1:], key=to_text)]
+        canonical.append(section)
+    return to_text(canonical)
+
+
+def _existing_plan_files(plan_file: str):
+    return [fn for fn in glob.glob(f"{glob.escape(plan_file)}*")
+            if fn == plan_file or re.fullmatch(r"\.\d+", fn[len(plan_file):])]
+
+
+class PlanCache(DiskCache):
+    """On-disk cache of Fast Downward outcomes keyed on canonical PDDL and search alias,
+    with size- and age-based eviction"""
+
+    name = "plan cache"
+
+    def __init__(self, directory: str = "cache/plans", max_bytes: int = 256 * 1024 * 1024,
+                 max_age_days: float = 30.0):
+        self.hits = 0
+        self.misses = 0
+        super().__init__(directory, max_bytes, max_age_days)
+
+    def make_key(self, job: FDJob) -> str:
+        with open(job.domain_file, "r", encoding="utf-8", errors="replace") as f:
+            domain_text = f.read()
+        with open(job.problem_file, "r", encoding="utf-8", errors="replace") as f:
+            problem_text = f.read()
+        payload = "\n".join([job.alias, canonicalize_pddl(domain_text), canonicalize_pddl(problem_text)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, job: FDJob) -> Optional[FDResult]:
+        """Return the cached result for a job and restore its plan files, or None"""
+        path = self._path(self.make_key(job))
+        try:
+            if path is None:
+                raise FileNotFoundError(job.problem_file)
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            if time.time() - record.get("created", 0) > self.max_age:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            os.utime(path)  # mtime tracks last use for LRU eviction
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if job.plan_file:
+            for fn in _existing_plan_files(job.plan_file):
+                os.remove(fn)
+            for suffix, content in record["plans"].items():
+                with open(f"{job.plan_file}{suffix}", "w") as f:
+                    f.write(content)
+
+        with self._lock:
+            self.hits += 1
+        return FDResult(
+            exit_code=record["exit_code"],
+            stdout=record["stdout"],
+            stderr=record["stderr"],
+            wall_time=record["wall_time"],
+            cpu_time=record["cpu_time"],
+            peak_rss_kb=record["peak_rss_kb"],
+            cached=True
+        )
+
+    def store(self, job: FDJob, result: FDResult):
+        """Record a finished job if its outcome does not depend on resource limits"""
+        if result.exit_code not in CACHEABLE_EXIT_CODES or result.cached:
+            return
+
+        plans = {}
+        costs = []
+        if job.plan_file:
+            for fn in _existing_plan_files(job.plan_file):
+                with open(fn, "r") as f:
+                    content = f.read()
+                plans[fn[len(job.plan_file):]] = content
+                cost_match = re.search(r";\s*cost\s*=\s*([\d.]+)", content)
+                if cost_match:
+                    costs.append(float(cost_match.group(1)))
+
+        record = {
+            "alias": job.alias,
+            "exit_code": result.exit_code,
+            "plans": plans,
+            "cost": min(costs) if costs else None,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "wall_time": result.wall_time,
+            "cpu_time": result.cpu_time,
+            "peak_rss_kb": result.peak_rss_kb
+        }
+        self._write(self.make_key(job), record)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_cache_config = {
+    "enabled": os.getenv("PLAN_CACHE", "1") != "0",
+    "directory": os.getenv("PLAN_CACHE_DIR", "cache/plans"),
+    "max_mb": float(os.getenv("PLAN_CACHE_MAX_MB", "256")),
+    "max_age_days": float(os.getenv("PLAN_CACHE_MAX_AGE_DAYS", "30")),
+}
+
+
+def configure_plan_cache(**config):
+    """Set options for the process-wide plan cache; must be called before its first use"""
+    if _cache is not None:
+        raise RuntimeError("Plan cache is already open")
+    _cache_config.update({k: v for k, v in config.items() if v is not None})
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """Return the process-wide plan cache, or None when caching is disabled"""
+    global _cache
+    with _cache_lock:
+        if _cache is None and _cache_config["enabled"]:
+            _cache = PlanCache(_cache_config["directory"], int(_cache_config["max_mb"] * 1024 * 1024),
+                               _cache_config["max_age_days"])
+        return _cache
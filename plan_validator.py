@@ -0,0 +1,461 @@
+"""
+Plan Validator and Simulator
+Checks that a plan solves the ground-truth STRIPS task by applying its actions to a
+set-based state, and reports the first failing step and the plan cost. Reads Fast
+Downward plan files as well as the comma-separated or listed text plans written by
+the LLM planners (see p_example.sol), so whole experiment runs can be scored in one pass.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from pddl_reader import PDDLSyntaxError, parse_sexpr, to_text
+
+Atom = Tuple[str, ...]
+
+# words that may stand for an action in text plans, e.g. "picks" for pick
+ACTION_SUFFIXES = ("", "s", "es", "ing", "ed")
+TEXT_STEP_RE = re.compile(r"^\s*(?:[-*•]|\d+[.):]|step\s+\d+[.):]?)?\s*", re.IGNORECASE)
+WORD_RE = re.compile(r"[a-z0-9_\-]+")
+
+
+# sections the simulator and the in-process grounder model completely; any other one
+# (:derived, :durative-action, :constraints, ...) makes the task unsupported
+DOMAIN_SECTIONS = {"domain", ":requirements", ":types", ":constants", ":predicates", ":functions", ":action"}
+PROBLEM_SECTIONS = {"problem", ":domain", ":requirements", ":objects", ":init", ":goal", ":metric"}
+
+
+class UnsupportedTaskError(ValueError):
+    """Raised when a domain or problem uses PDDL features the simulator does not model"""
+
+
+class ActionSchema(NamedTuple):
+    name: str
+    parameters: List[Tuple[str, str]]
+    # atoms are (predicate, arguments) where an int argument indexes the parameters
+    pre_pos: List[tuple]
+    pre_neg: List[tuple]
+    equalities: List[Tuple[object, object, bool]]
+    add: List[tuple]
+    delete: List[tuple]
+    cost: int
+
+
+class Task(NamedTuple):
+    domain_name: str
+    supertypes: Dict[str, FrozenSet[str]]
+    objects: Dict[str, str]
+    actions: Dict[str, ActionSchema]
+    action_words: Dict[str, str]
+    init: FrozenSet[Atom]
+    goal_pos: FrozenSet[Atom]
+    goal_neg: FrozenSet[Atom]
+
+
+class PlanStep(NamedTuple):
+    text: str
+    action: Optional[str]
+    args: Tuple[str, ...]
+    error: str = ""
+    # argument tuples to choose from when a text step leaves parameters unnamed
+    alternatives: Tuple[Tuple[str, ...], ...] = ()
+
+
+class PlanValidation(NamedTuple):
+    valid: bool
+    steps: int
+    cost: Optional[int]
+    failed_step: Optional[int] = None  # 1-based index of the first failing step
+    failed_action: str = ""
+    reason: str = ""
+
+
+def _typed_list(items: list) -> List[Tuple[str, str]]:
+    result = []
+    pending = []
+    i = 0
+    while i < len(items):
+        if items[i] == "-" and i + 1 < len(items):
+            type_name = items[i + 1]
+            if not isinstance(type_name, str):
+                raise UnsupportedTaskError(f"type {to_text(type_name)} is not supported")
+            result.extend((name, type_name) for name in pending)
+            pending = []
+            i += 2
+            continue
+        pending.append(items[i])
+        i += 1
+    result.extend((name, "object") for name in pending)
+    return result
+
+
+def _fields(sexpr: list, allowed: set) -> Dict[str, list]:
+    sections = {}
+    for section in sexpr[1:]:
+        if isinstance(section, list) and section and isinstance(section[0], str):
+            if section[0] not in allowed:
+                raise UnsupportedTaskError(f"{section[0]} is not supported")
+            sections.setdefault(section[0], []).append(section)
+    return sections
+
+
+def _literals(formula, label: str) -> List[Tuple[bool, list]]:
+    """Flatten a conjunction of literals into (positive, atom) pairs"""
+    if formula is None or formula == []:
+        return []
+    if not isinstance(formula, list) or not formula:
+        raise UnsupportedTaskError(f"{label}: unexpected formula {formula!r}")
+    if formula[0] == "and":
+        return [lit for sub in formula[1:] for lit in _literals(sub, label)]
+    if formula[0] == "not":
+        if len(formula) != 2 or not isinstance(formula[1], list):
+            raise UnsupportedTaskError(f"{label}: malformed negation")
+        return [(False, formula[1])]
+    if formula[0] in ("or", "imply", "forall", "exists", "when"):
+        raise UnsupportedTaskError(f"{label}: {formula[0]} is not supported")
+    return [(True, formula)]
+
+
+def _compile_action(action: list) -> ActionSchema:
+    name = action[1]
+    fields = {action[i]: action[i + 1] for i in range(2, len(action) - 1, 2) if isinstance(action[i], str)}
+    parameters = _typed_list(fields.get(":parameters") or [])
+    index = {var: i for i, (var, _) in enumerate(parameters)}
+
+    def compile_args(args):
+        compiled = []
+        for arg in args:
+            if arg in index:
+                compiled.append(index[arg])
+            elif isinstance(arg, str) and not arg.startswith("?"):
+                compiled.append(arg)
+            else:
+                raise UnsupportedTaskError(f"action {name}: undeclared argument {arg!r}")
+        return tuple(compiled)
+
+    pre_pos, pre_neg, equalities = [], [], []
+    for positive, atom in _literals(fields.get(":precondition"), f"action {name}"):
+        if atom[0] == "=":
+            left, right = compile_args(atom[1:3])
+            equalities.append((left, right, positive))
+        else:
+            (pre_pos if positive else pre_neg).append((atom[0], compile_args(atom[1:])))
+
+    add, delete = [], []
+    cost = 1
+    for positive, atom in _literals(fields.get(":effect"), f"action {name}"):
+        if atom[0] == "increase" and atom[1:2] == [["total-cost"]]:
+            try:
+                cost = int(atom[2])
+            except (IndexError, ValueError, TypeError):
+                raise UnsupportedTaskError(f"action {name}: only constant action costs are supported")
+        else:
+            (add if positive else delete).append((atom[0], compile_args(atom[1:])))
+    return ActionSchema(name, parameters, pre_pos, pre_neg, equalities, add, delete, cost)
+
+
+def load_task(domain_text: str, problem_text: str) -> Task:
+    """Compile a STRIPS domain and problem into a Task"""
+    try:
+        domain = parse_sexpr(domain_text)
+        problem = parse_sexpr(problem_text)
+    except PDDLSyntaxError as e:
+        raise UnsupportedTaskError(f"could not parse task: {e}")
+    domain_fields = _fields(domain, DOMAIN_SECTIONS)
+    problem_fields = _fields(problem, PROBLEM_SECTIONS)
+
+    type_parents = {}
+    for section in domain_fields.get(":types", []):
+        type_parents.update(_typed_list(section[1:]))
+    objects = {}
+    for section in domain_fields.get(":constants", []):
+        objects.update(_typed_list(section[1:]))
+    for section in problem_fields.get(":objects", []):
+        objects.update(_typed_list(section[1:]))
+
+    actions = {}
+    for action in domain_fields.get(":action", []):
+        schema = _compile_action(action)
+        actions[schema.name] = schema
+
+    init = set()
+    for section in problem_fields.get(":init", []):
+        for fact in section[1:]:
+            if isinstance(fact, list) and fact and fact[0] != "=":
+                init.add(tuple(fact))
+    supertypes = {}
+    for type_name in type_parents:
+        ancestors = set()
+        parent = type_parents[type_name]
+        while parent not in ancestors and parent != type_name:
+            ancestors.add(parent)
+            parent = type_parents.get(parent, "object")
+        supertypes[type_name] = frozenset(ancestors)
+
+    goal = [lit for section in problem_fields.get(":goal", []) for sub in section[1:]
+            for lit in _literals(sub, "goal")]
+    for _, atom in goal:
+        if not all(isinstance(arg, str) for arg in atom):
+            raise UnsupportedTaskError(f"goal: {to_text(atom)} is not supported")
+    return Task(
+        domain_name=domain[1][1] if len(domain) > 1 and isinstance(domain[1], list) else "",
+        supertypes=supertypes,
+        objects=objects,
+        actions=actions,
+        action_words=_action_words(actions),
+        init=frozenset(init),
+        goal_pos=frozenset(tuple(atom) for positive, atom in goal if positive),
+        goal_neg=frozenset(tuple(atom) for positive, atom in goal if not positive)
+    )
+
+
+@lru_cache(maxsize=256)
+def _load_task_cached(domain_text: str, problem_text: str) -> Task:
+    return load_task(domain_text, problem_text)
+
+
+def load_task_files(domain_file: str, problem_file: str) -> Task:
+    """Compile a task from files; compiled tasks are reused across plans while the file contents
+    stay the same, so files rewritten in place are compiled again"""
+    with open(domain_file, "r", encoding="utf-8", errors="replace") as f:
+        domain_text = f.read()
+    with open(problem_file, "r", encoding="utf-8", errors="replace") as f:
+        problem_text = f.read()
+    return _load_task_cached(domain_text, problem_text)
+
+
+def is_subtype(task: Task, type_name: str, expected: str) -> bool:
+    return expected == "object" or expected == type_name or expected in task.supertypes.get(type_name, ())
+
+
+def _action_words(actions) -> Dict[str, str]:
+    """Surface forms of each action name in text plans, e.g. 'picks' or 'put-down' for putdown"""
+    words = {}
+    for name in actions:
+        for form in {name, name.replace("-", ""), name.replace("-", "_")}:
+            for suffix in ACTION_SUFFIXES:
+                words.setdefault(form + suffix, name)
+    return words
+
+
+def _text_action(words: List[str], task: Task) -> Tuple[Optional[str], int]:
+    """Find the action named among the first words of a text step, e.g. 'picks up' or 'put down'"""
+    for i, word in enumerate(words[:3]):
+        if word in task.action_words:
+            return task.action_words[word], i
+        if i + 1 < len(words):
+            for joined in (word + words[i + 1], f"{word}-{words[i + 1]}"):
+                if joined in task.action_words:
+                    return task.action_words[joined], i
+    return None, -1
+
+
+MAX_ALTERNATIVES = 64
+
+
+def _described_objects(task: Task, param_type: str, words: List[str]) -> List[str]:
+    """Objects of a type that the text only describes, e.g. lgripper1 and lgripper2 for 'left gripper'"""
+    candidates = [obj for obj, obj_type in task.objects.items() if is_subtype(task, obj_type, param_type)]
+    if param_type in words:
+        qualifier = words[words.index(param_type) - 1] if words.index(param_type) > 0 else ""
+        described = [obj for obj in candidates
+                     if obj.replace(param_type, "").rstrip("0123456789")
+                     and qualifier.startswith(obj.replace(param_type, "").rstrip("0123456789"))]
+        if described:
+            return described
+    return candidates
+
+
+def _bind_text_args(schema: ActionSchema, mentioned: List[str], words: List[str],
+                    task: Task) -> List[Tuple[str, ...]]:
+    """Bind objects mentioned in a text step to parameters by type, in order of mention;
+    parameters the text does not name get every fitting object as an alternative"""
+    used = [False] * len(mentioned)
+    choices = []
+    for _, param_type in schema.parameters:
+        for i, obj in enumerate(mentioned):
+            if not used[i] and is_subtype(task, task.objects[obj], param_type):
+                used[i] = True
+                choices.append([obj])
+                break
+        else:
+            choices.append(_described_objects(task, param_type, words))
+
+    alternatives = [()]
+    for options in choices:
+        alternatives = [args + (obj,) for args in alternatives for obj in options][:MAX_ALTERNATIVES]
+    return alternatives
+
+
+def parse_plan(plan_text: str, task: Task) -> List[PlanStep]:
+    """Read a Fast Downward plan file or a text plan into steps; prose lines are skipped"""
+    steps = []
+    for line in plan_text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(";"):
+            continue
+        if line.startswith("("):
+            tokens = line.strip("()").lower().split()
+            if tokens:
+                steps.append(PlanStep(line, tokens[0], tuple(tokens[1:])))
+            continue
+
+        for fragment in line.split(","):
+            fragment = TEXT_STEP_RE.sub("", fragment).strip().rstrip(".;")
+            words = WORD_RE.findall(fragment.lower())
+            action, position = _text_action(words, task)
+            if action is None:
+                continue
+            schema = task.actions[action]
+            mentioned = [w for w in words[position + 1:] if w in task.objects]
+            if position > 0:
+                # a subject before the verb, e.g. "robot2 picks up ball1", is an argument too
+                mentioned = [w for w in words[:position] if w in task.objects] + mentioned
+            alternatives = _bind_text_args(schema, mentioned, words, task)
+            if not alternatives:
+                steps.append(PlanStep(fragment, action, tuple(mentioned),
+                                      f"could not match objects {mentioned} to the parameters of {action}"))
+            elif len(alternatives) == 1:
+                steps.append(PlanStep(fragment, action, alternatives[0]))
+            else:
+                steps.append(PlanStep(fragment, action, alternatives[0], alternatives=tuple(alternatives)))
+    return steps
+
+
+def _ground(atoms: List[tuple], args: Tuple[str, ...]):
+    return [(pred,) + tuple(args[a] if isinstance(a, int) else a for a in atom_args) for pred, atom_args in atoms]
+
+
+def _check_step(task: Task, state: set, schema: ActionSchema, args: Tuple[str, ...]) -> str:
+    """Reason why an action cannot be applied in a state, or an empty string"""
+    if len(args) != len(schema.parameters):
+        return f"{schema.name} takes {len(schema.parameters)} argument(s) but got {len(args)}"
+    for arg, (_, param_type) in zip(args, schema.parameters):
+        if arg not in task.objects:
+            return f"unknown object {arg}"
+        if not is_subtype(task, task.objects[arg], param_type):
+            return f"{arg} is not of type {param_type}"
+    for left, right, positive in schema.equalities:
+        left = args[left] if isinstance(left, int) else left
+        right = args[right] if isinstance(right, int) else right
+        if (left == right) != positive:
+            return f"precondition {'' if positive else 'not '}(= {left} {right}) does not hold"
+
+    missing = [atom for atom in _ground(schema.pre_pos, args) if atom not in state]
+    if missing:
+        return "unsatisfied precondition " + " ".join(f"({' '.join(a)})" for a in missing)
+    violated = [atom for atom in _ground(schema.pre_neg, args) if atom in state]
+    if violated:
+        return "unsatisfied precondition " + " ".join(f"(not ({' '.join(a)}))" for a in violated)
+    return ""
+
+
+def simulate(task: Task, steps: List[PlanStep]) -> PlanValidation:
+    """Apply the steps from the initial state and check the goal"""
+    state = set(task.init)
+    cost = 0
+    for number, step in enumerate(steps, start=1):
+        schema = task.actions.get(step.action)
+        reason = step.error or ("" if schema else f"unknown action {step.action}")
+        args = step.args
+        if not reason:
+            reason = _check_step(task, state, schema, args)
+            # a text step that leaves parameters unnamed uses the first applicable reading
+            for alternative in step.alternatives if reason else ():
+                if not _check_step(task, state, schema, alternative):
+                    reason, args = "", alternative
+                    break
+        if reason:
+            return PlanValidation(False, len(steps), None, number, step.text, reason)
+
+        state.difference_update(_ground(schema.delete, args))
+        state.update(_ground(schema.add, args))
+        cost += schema.cost
+
+    unreached = [atom for atom in task.goal_pos if atom not in state]
+    unreached += [("not",) + atom for atom in task.goal_neg if atom in state]
+    if unreached:
+        reason = "goal not reached: " + " ".join(f"({' '.join(a)})" for a in sorted(unreached))
+        return PlanValidation(False, len(steps), cost, reason=reason)
+    return PlanValidation(True, len(steps), cost)
+
+
+def validate_plan(task: Task, plan_text: str) -> PlanValidation:
+    """Check that a plan in either format solves the task"""
+    return simulate(task, parse_plan(plan_text, task))
+
+
+def validate_plan_file(domain_file: str, problem_file: str, plan_file: str) -> PlanValidation:
+    with open(plan_file, "r", encoding="utf-8", errors="replace") as f:
+        plan_text = f.read()
+    return validate_plan(load_task_files(domain_file, problem_file), plan_text)
+
+
+def _plan_files(run: int) -> List[Tuple[str, str, str, str]]:
+    """(method, domain, task, plan file) for every plan of a run; anytime plans use their last file"""
+    found = []
+    for kind in ("results", "plans"):
+        for path in sorted(glob.glob(f"./experiments/run{run}/{kind}/*/*/*.pddl")):
+            method, domain, name = path.replace("\\", "/").split("/")[-3:]
+            # llm_ic_pddl_rag writes <task>_original.pddl and <task>_rag.pddl
+            stage = re.search(r"_(original|rag)(?=\.pddl$)", name)
+            if stage:
+                method = f"{method}:{stage.group(1)}"
+                name = name[:stage.start()] + name[stage.end():]
+            numbered = sorted(glob.glob(f"{glob.escape(path)}.[0-9]*"), key=lambda fn: int(fn.rsplit(".", 1)[1]))
+            found.append((method, domain, name, numbered[-1] if numbered else path))
+    return found
+
+
+def score_runs(runs: List[int]) -> List[dict]:
+    """Validate every plan of the given runs against the ground-truth tasks"""
+    rows = []
+    for run in runs:
+        for method, domain, task, plan_file in _plan_files(run):
+            domain_file = f"./domains/{domain}/domain.pddl"
+            problem_file = f"./domains/{domain}/{task}"
+            row = {"run": run, "method": method, "domain": domain, "task": task, "plan_file": plan_file}
+            if not (os.path.exists(domain_file) and os.path.exists(problem_file)):
+                continue
+            try:
+                result = validate_plan_file(domain_file, problem_file, plan_file)
+            except UnsupportedTaskError as e:
+                row.update(valid=False, reason=str(e))
+            else:
+                row.update(result._asdict())
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the plans of experiment runs against the ground-truth tasks")
+    parser.add_argument('--run', type=int, nargs='+', default=[0, 1, 2, 3, 4])
+    parser.add_argument('--output', type=str, default=None, help="write per-plan results to this JSON file")
+    parser.add_argument('--verbose', action='store_true', help="print the failure of every invalid plan")
+    args = parser.parse_args()
+
+    rows = score_runs(args.run)
+    totals = {}
+    for row in rows:
+        key = (row["run"], row["method"], row["domain"])
+        valid, count = totals.get(key, (0, 0))
+        totals[key] = (valid + int(row["valid"]), count + 1)
+        if args.verbose and not row["valid"]:
+            step = f" at step {row['failed_step']}" if row.get("failed_step") else ""
+            print(f"{row['plan_file']}: invalid{step}: {row.get('reason', '')}")
+
+    for (run, method, domain), (valid, count) in sorted(totals.items()):
+        print(f"run{run} {method:<20} {domain:<12} {valid}/{count} valid")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"[info] results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
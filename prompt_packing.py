@@ -0,0 +1,96 @@
+"""
+Multi-Task Prompt Packing
+Answers several tasks of a sweep with one LLM request: the shared prompt prefix
+(domain PDDL and in-context example) is sent once, followed by K labeled task
+descriptions, and the response is split back into one problem per task. Tasks
+whose section is missing or does not parse are left to their own request.
+"""
+import re
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional
+
+from llm_client import LLMResponse
+from pddl_reader import PDDLSyntaxError, parse_sexpr
+from pddl_stream import PDDLBlockExtractor
+
+SECTION_RE = re.compile(r"^[#*\s]*TASK\s+(\d+)\b.*$", re.IGNORECASE | re.MULTILINE)
+
+
+class PackedSection(NamedTuple):
+    text: str
+    response: LLMResponse  # this task's share of the packed request's token usage
+
+
+def _problem_block(section: str) -> Optional[str]:
+    """The first (define (problem ...)) block of a section if it parses"""
+    extractor = PDDLBlockExtractor(max_blocks=1)
+    extractor.feed(section)
+    problem = extractor.block("problem")
+    if problem is None:
+        return None
+    try:
+        parse_sexpr(problem)
+    except PDDLSyntaxError:
+        return None
+    return problem
+
+
+def split_packed_response(response: LLMResponse, count: int) -> Dict[int, PackedSection]:
+    """Split a response with TASK 1..count sections into per-position problems (1-based)"""
+    headers = [(int(m.group(1)), m.start(), m.end()) for m in SECTION_RE.finditer(response.text)]
+    problems = {}
+    for i, (label, _, body_start) in enumerate(headers):
+        body_end = headers[i + 1][1] if i + 1 < len(headers) else len(response.text)
+        if 1 <= label <= count and label not in problems:
+            problem = _problem_block(response.text[body_start:body_end])
+            if problem is not None:
+                problems[label] = problem
+
+    # the shared prefix is split evenly, the output by each task's share of the text
+    output_chars = sum(len(p) for p in problems.values()) or 1
+    return {
+        label: PackedSection(
+            text=f"PROBLEM:\n{problem}",
+            response=response._replace(
+                text=f"PROBLEM:\n{problem}",
+                input_tokens=response.input_tokens // count,
+                output_tokens=round(response.output_tokens * len(problem) / output_chars)
+            )
+        )
+        for label, problem in problems.items()
+    }
+
+
+class PromptPacker:
+    """Groups the tasks of a sweep into batches of pack_size and sends each batch once"""
+
+    def __init__(self, pack_size: int):
+        self.pack_size = pack_size
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def batch_of(self, task: int, tasks: List[int]) -> List[int]:
+        tasks = sorted(set(tasks) | {task})
+        index = tasks.index(task) // self.pack_size
+        return tasks[index * self.pack_size:(index + 1) * self.pack_size]
+
+    def section(self, group: Hashable, task: int, tasks: List[int],
+                request: Callable[[List[int]], Dict[int, PackedSection]]) -> Optional[PackedSection]:
+        """The packed answer for one task, or None if the task must be queried on its own.
+        The first task of a batch to arrive sends the request; the others wait for it."""
+        batch = self.batch_of(task, tasks)
+        if len(batch) < 2:
+            return None
+        key = (group, tuple(batch))
+        with self._lock:
+            future = self._batches.get(key)
+            owner = future is None
+            if owner:
+                future = self._batches[key] = Future()
+        if owner:
+            try:
+                future.set_result(request(batch))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result().get(task)
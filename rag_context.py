@@ -0,0 +1,86 @@
+"""
+Process-Wide RAG Context
+The Neo4j connection, embedding model and BM25 index of the Graph RAG system are
+created once per process and shared by every llm_ic_pddl_rag task of a sweep.
+The knowledge graph packages are imported on warm-up, not when this module is loaded.
+"""
+import threading
+import time
+
+
+class RAGContext:
+    """Knowledge graph connection and Graph RAG index shared by all tasks of the process"""
+
+    def __init__(self, cohere_api_key: str = None):
+        self.cohere_api_key = cohere_api_key
+        self.kg_initializer = None
+        self.graph_rag_qa = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> bool:
+        """Connect to the knowledge graph and build the RAG index; returns False if that failed"""
+        with self._lock:
+            if self.graph_rag_qa is not None:
+                return True
+            if self.error is not None:
+                return False  # do not reconnect for every task once the graph is known to be down
+
+            start_time = time.time()
+            try:
+                from graph_rag_qa import PDDLGraphRAGQA
+                from kg_initializer import PDDLKnowledgeGraphInitializer
+
+                self.kg_initializer = PDDLKnowledgeGraphInitializer()  # connects in __init__
+                if not self.kg_initializer.initialize_knowledge_graph():
+                    raise RuntimeError("Failed to initialize knowledge graph")
+                kg = self.kg_initializer.get_knowledge_graph_instance()
+                self.graph_rag_qa = PDDLGraphRAGQA(kg, self.cohere_api_key or self.kg_initializer.cohere_api_key)
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"[error] RAG context warm-up failed: {self.error}")
+                self._close_connections()
+                return False
+
+            print(f"[info] RAG context ready in {time.time() - start_time:.2f} sec")
+            return True
+
+    def get_graph_rag_qa(self):
+        """Return the shared PDDLGraphRAGQA, warming up on first use"""
+        if not self.warm_up():
+            raise RuntimeError(f"KG RAG unavailable: {self.error}")
+        return self.graph_rag_qa
+
+    def _close_connections(self):
+        if self.kg_initializer is not None:
+            self.kg_initializer.close_connections()
+        self.kg_initializer = None
+        self.graph_rag_qa = None
+
+    def shutdown(self):
+        """Close the knowledge graph connection; a later warm-up reconnects"""
+        with self._lock:
+            self._close_connections()
+            self.error = None
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_rag_context(cohere_api_key: str = None) -> RAGContext:
+    """Return the process-wide RAG context, creating it (without connecting) on first use"""
+    global _context
+    with _context_lock:
+        if _context is None:
+            _context = RAGContext(cohere_api_key)
+        return _context
+
+
+def shutdown_rag_context():
+    """Shut down the process-wide RAG context if one was created"""
+    global _context
+    with _context_lock:
+        if _context is not None:
+            _context.shutdown()
+            _context = None
@@ -0,0 +1,157 @@
+"""
+Structured Task Results
+One record per task attempt, appended to a JSONL stream for sweep analysis and
+written as logs/run<run>/<method>_<domain>_<task>.json, the per-attempt log format
+read by PDDLKnowledgeGraphInitializer.populate_error_cases_from_logs.
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# planner output kept in the JSONL stream; the per-attempt log keeps all of it
+MAX_STREAM_OUTPUT_CHARS = 2000
+
+# method whose token usage and latency the others are compared against
+BASELINE_METHOD = "llm_ic_pddl_planner"
+
+
+class TaskRecord(NamedTuple):
+    run: int
+    domain: str
+    task_id: int
+    task_name: str
+    method: str
+    plan_found: bool
+    prompt_chars: int = 0
+    response_chars: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    llm_latency: float = 0.0
+    llm_cached: bool = False
+    llm_stopped_early: bool = False  # the streamed completion was cut off after its PDDL blocks
+    planner_exit_code: Optional[int] = None
+    plan_length: Optional[int] = None
+    plan_cost: Optional[float] = None
+    plan_valid: Optional[bool] = None  # the plan solves the ground-truth task
+    error_category: Optional[str] = None
+    timings: Dict[str, float] = {}
+    planner_stats: Dict[str, Any] = {}  # fd_stats.PlannerStats of the last planner call
+    planner_output: str = ""
+    timestamp: str = ""
+
+
+class ResultsLog:
+    """Appends task records to a JSONL file and writes one JSON log per attempt"""
+
+    def __init__(self, path: str = "experiments/results.jsonl", log_directory: str = "logs"):
+        self.path = path
+        self.log_directory = log_directory
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    def record(self, record: TaskRecord) -> TaskRecord:
+        if not record.timestamp:
+            record = record._replace(timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        data = record._asdict()
+
+        if self.log_directory:
+            run_directory = os.path.join(self.log_directory, f"run{record.run}")
+            os.makedirs(run_directory, exist_ok=True)
+            task_base = os.path.splitext(record.task_name)[0]
+            log_file = os.path.join(run_directory, f"{record.method}_{record.domain}_{task_base}.json")
+            with open(log_file, "w") as f:
+                json.dump(data, f, indent=2)
+
+        data["planner_output"] = data["planner_output"][-MAX_STREAM_OUTPUT_CHARS:]
+        line = json.dumps(data)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+        return record
+
+
+_log = None
+_log_lock = threading.Lock()
+_log_config = {
+    "enabled": os.getenv("RESULTS_LOG", "1") != "0",
+    "path": os.getenv("RESULTS_LOG_FILE", "experiments/results.jsonl"),
+    "log_directory": os.getenv("RESULTS_LOG_DIR", "logs"),
+}
+
+
+def configure_results_log(**config):
+    """Set options for the process-wide results log; must be called before its first use"""
+    if _log is not None:
+        raise RuntimeError("Results log is already open")
+    _log_config.update({k: v for k, v in config.items() if v is not None})
+
+
+def get_results_log() -> Optional[ResultsLog]:
+    """Return the process-wide results log, or None when recording is disabled"""
+    global _log
+    with _log_lock:
+        if _log is None and _log_config["enabled"]:
+            _log = ResultsLog(_log_config["path"], _log_config["log_directory"])
+        return _log
+
+
+def load_records(path: str) -> List[dict]:
+    """Read the records of a results JSONL file"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_results(records: List[dict], baseline: str = BASELINE_METHOD) -> List[dict]:
+    """Per-method success rate, token usage and latency, with the change against the baseline method"""
+    by_method = {}
+    for record in records:
+        by_method.setdefault(record["method"], []).append(record)
+
+    rows = []
+    for method, method_records in sorted(by_method.items()):
+        rows.append({
+            "method": method,
+            "tasks": len(method_records),
+            "plans_found": sum(1 for r in method_records if r["plan_found"]),
+            "plans_valid": sum(1 for r in method_records if r.get("plan_valid")),
+            "input_tokens": statistics.mean(r["input_tokens"] for r in method_records),
+            "output_tokens": statistics.mean(r["output_tokens"] for r in method_records),
+            "llm_latency": statistics.mean(r["llm_latency"] for r in method_records),
+            "total_time": statistics.mean(r["timings"].get("total", 0.0) for r in method_records),
+        })
+
+    base = next((row for row in rows if row["method"] == baseline), None)
+    for row in rows:
+        for key in ("input_tokens", "output_tokens", "llm_latency"):
+            if base and base[key] and row is not base:
+                row[f"{key}_change"] = row[key] / base[key] - 1
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare token usage, latency and success of the methods")
+    parser.add_argument('--file', type=str, default=_log_config["path"])
+    parser.add_argument('--run', type=int, nargs='+', default=None, help="only these runs")
+    parser.add_argument('--domain', type=str, default=None, help="only this domain")
+    parser.add_argument('--baseline', type=str, default=BASELINE_METHOD)
+    args = parser.parse_args()
+
+    records = [r for r in load_records(args.file)
+               if (args.run is None or r["run"] in args.run) and (args.domain is None or r["domain"] == args.domain)]
+    print(f"{'method':<30} {'tasks':>5} {'found':>5} {'valid':>5} {'in tok':>8} {'out tok':>8} "
+          f"{'llm s':>7} {'total s':>8}  vs {args.baseline}")
+    for row in summarize_results(records, args.baseline):
+        change = ", ".join(f"{key[:-7].replace('_', ' ')} {row[key]:+.0%}"
+                           for key in ("input_tokens_change", "output_tokens_change", "llm_latency_change")
+                           if key in row)
+        print(f"{row['method']:<30} {row['tasks']:>5} {row['plans_found']:>5} {row['plans_valid']:>5} "
+              f"{row['input_tokens']:>8.0f} {row['output_tokens']:>8.0f} {row['llm_latency']:>7.2f} "
+              f"{row['total_time']:>8.2f}  {change}")
+
+
+if __name__ == "__main__":
+    main()
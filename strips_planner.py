@@ -0,0 +1,358 @@
+"""
+In-Process STRIPS Planner
+A grounded STRIPS search engine for small tasks, run before Fast Downward so that
+the interpreter startup, translation and process spawns are skipped when a task
+can be solved in a fraction of a second. States are Python ints used as bitsets,
+and applicable actions come from a successor table indexed by precondition fact.
+Optimal aliases (seq-opt-*) use A* with h_max, all others greedy best-first search
+with the goal-count heuristic. Plans are written in Fast Downward's plan-file format.
+"""
+import glob
+import heapq
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from fd_runner import FDJob, FDResult
+from plan_validator import UnsupportedTaskError, is_subtype, load_task_files
+
+SEARCH_UNSOLVABLE_EXIT_CODE = 11
+TRANSLATE_UNSOLVABLE_EXIT_CODE = 10
+MAX_GROUNDINGS = 200000
+TIME_CHECK_INTERVAL = 256  # expansions or groundings between checks of the time budget
+INFINITY = float("inf")
+
+
+class SearchTimeout(Exception):
+    """Raised when the search exceeds its time budget"""
+
+
+class GroundAction(NamedTuple):
+    name: str
+    pre: int
+    pre_neg: int
+    add: int
+    delete: int
+    cost: int
+
+
+class GroundTask(NamedTuple):
+    facts: List[tuple]
+    actions: List[GroundAction]
+    init: int
+    goal: int
+    goal_neg: int
+    # successor table: action indices keyed on one of their precondition facts
+    triggered: Dict[int, List[int]]
+    always_applicable: List[int]
+    unit_cost: bool
+
+
+class SearchResult(NamedTuple):
+    plan: Optional[List[str]]
+    cost: int
+    expanded: int
+    generated: int
+    search_time: float
+
+
+def _bindings(task, schema, static: set, init: frozenset):
+    """Enumerate parameter bindings, pruning on static preconditions as soon as their arguments are bound"""
+    candidates = [[obj for obj, obj_type in task.objects.items() if is_subtype(task, obj_type, param_type)]
+                  for _, param_type in schema.parameters]
+
+    checks = [[] for _ in schema.parameters] or [[]]
+    for atoms, positive in ((schema.pre_pos, True), (schema.pre_neg, False)):
+        for pred, args in atoms:
+            if pred in static:
+                checks[max([a for a in args if isinstance(a, int)], default=0)].append((pred, args, positive))
+    for left, right, positive in schema.equalities:
+        checks[max([a for a in (left, right) if isinstance(a, int)], default=0)].append(("=", (left, right), positive))
+
+    binding = [None] * len(schema.parameters)
+
+    def holds(pred, args, positive):
+        values = tuple(binding[a] if isinstance(a, int) else a for a in args)
+        if pred == "=":
+            return (values[0] == values[1]) == positive
+        return ((pred,) + values in init) == positive
+
+    def extend(depth):
+        if depth == len(binding):
+            yield tuple(binding)
+            return
+        for obj in candidates[depth]:
+            binding[depth] = obj
+            if all(holds(*check) for check in checks[depth]):
+                yield from extend(depth + 1)
+
+    if not schema.parameters:
+        if all(holds(*check) for check in checks[0]):
+            yield ()
+        return
+    yield from extend(0)
+
+
+def _ground_atoms(atoms, args):
+    return [(pred,) + tuple(args[a] if isinstance(a, int) else a for a in atom_args) for pred, atom_args in atoms]
+
+
+def _check_deadline(deadline: float):
+    if time.time() > deadline:
+        raise SearchTimeout()
+
+
+def ground_task(domain_file: str, problem_file: str, deadline: float = INFINITY) -> Optional[GroundTask]:
+    """Ground the reachable part of a task; None if the goal is not even relaxed-reachable.
+    Raises UnsupportedTaskError for tasks it cannot ground completely, SearchTimeout after the deadline"""
+    task = load_task_files(domain_file, problem_file)
+    fluent = {pred for schema in task.actions.values() for pred, _ in schema.add + schema.delete}
+    static = {pred for schema in task.actions.values() for pred, _ in schema.pre_pos + schema.pre_neg} - fluent
+
+    candidates = []
+    for schema in task.actions.values():
+        for args in _bindings(task, schema, static, task.init):
+            candidates.append((schema, args, [a for a in _ground_atoms(schema.pre_pos, args) if a[0] not in static]))
+            if len(candidates) > MAX_GROUNDINGS:
+                raise UnsupportedTaskError(f"more than {MAX_GROUNDINGS} ground actions")
+            if len(candidates) % TIME_CHECK_INTERVAL == 0:
+                _check_deadline(deadline)
+
+    # relaxed reachability fixpoint decides which facts and actions exist at all
+    reachable = set(task.init)
+    pending = candidates
+    applicable = []
+    changed = True
+    while changed:
+        _check_deadline(deadline)
+        changed = False
+        remaining = []
+        for candidate in pending:
+            if all(atom in reachable for atom in candidate[2]):
+                applicable.append(candidate)
+                for atom in _ground_atoms(candidate[0].add, candidate[1]):
+                    if atom not in reachable:
+                        reachable.add(atom)
+                        changed = True
+            else:
+                remaining.append(candidate)
+        pending = remaining
+
+    static_goals = [atom for atom in task.goal_pos if atom[0] not in fluent]
+    if any(atom not in reachable for atom in task.goal_pos) or any(atom not in task.init for atom in static_goals):
+        return None
+    if any(atom in task.init for atom in task.goal_neg if atom[0] not in fluent):
+        return None
+
+    facts = sorted(atom for atom in reachable if atom[0] in fluent)
+    index = {atom: i for i, atom in enumerate(facts)}
+
+    def mask(atoms):
+        bits = 0
+        for atom in atoms:
+            if atom in index:
+                bits |= 1 << index[atom]
+        return bits
+
+    actions = []
+    for schema, args, _ in applicable:
+        actions.append(GroundAction(
+            name=f"({' '.join((schema.name,) + args)})",
+            pre=mask(_ground_atoms(schema.pre_pos, args)),
+            pre_neg=mask(_ground_atoms([a for a in schema.pre_neg if a[0] in fluent], args)),
+            add=mask(_ground_atoms(schema.add, args)),
+            delete=mask(_ground_atoms(schema.delete, args)),
+            cost=schema.cost
+        ))
+
+    # key each action on its precondition fact shared by the fewest other actions
+    frequency = [0] * len(facts)
+    for action in actions:
+        for i in _bits(action.pre):
+            frequency[i] += 1
+    triggered = {}
+    always_applicable = []
+    for i, action in enumerate(actions):
+        if action.pre:
+            trigger = min(_bits(action.pre), key=lambda fact: frequency[fact])
+            triggered.setdefault(trigger, []).append(i)
+        else:
+            always_applicable.append(i)
+
+    return GroundTask(
+        facts=facts,
+        actions=actions,
+        init=mask(task.init),
+        goal=mask(task.goal_pos),
+        goal_neg=mask(task.goal_neg),
+        triggered=triggered,
+        always_applicable=always_applicable,
+        unit_cost=len({action.cost for action in actions}) <= 1
+    )
+
+
+def _bits(value: int):
+    while value:
+        low = value & -value
+        yield low.bit_length() - 1
+        value ^= low
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+def _applicable(task: GroundTask, state: int):
+    for i in task.always_applicable:
+        if not state & task.actions[i].pre_neg:
+            yield task.actions[i]
+    for fact in _bits(state):
+        for i in task.triggered.get(fact, ()):
+            action = task.actions[i]
+            if state & action.pre == action.pre and not state & action.pre_neg:
+                yield action
+
+
+def h_max(task: GroundTask, state: int) -> float:
+    """Admissible h_max by relaxed layers; with unit costs the goal layer is the estimate"""
+    if not task.unit_cost:
+        return 0
+    reached = state
+    layer = 0
+    actions = task.actions
+    while reached & task.goal != task.goal:
+        new = reached
+        for action in actions:
+            if reached & action.pre == action.pre:
+                new |= action.add
+        if new == reached:
+            return INFINITY
+        reached = new
+        layer += 1
+    return layer * (actions[0].cost if actions else 1)
+
+
+def goal_count(task: GroundTask, state: int) -> int:
+    return _popcount(task.goal & ~state) + _popcount(task.goal_neg & state)
+
+
+def search(task: GroundTask, optimal: bool, time_budget: float) -> SearchResult:
+    """A* (optimal) or greedy best-first search with duplicate elimination"""
+    start_time = time.time()
+    heuristic = h_max if optimal else goal_count
+    init_h = heuristic(task, task.init)
+    if init_h == INFINITY:
+        return SearchResult(None, 0, 0, 0, time.time() - start_time)
+
+    best_g = {task.init: 0}
+    parents = {task.init: None}
+    counter = 0
+    open_list = [(init_h, init_h, counter, task.init)]
+    expanded = 0
+    generated = 1
+    closed = set()
+
+    while open_list:
+        _, _, _, state = heapq.heappop(open_list)
+        if state in closed:
+            continue
+        closed.add(state)
+        g = best_g[state]
+        if state & task.goal == task.goal and not state & task.goal_neg:
+            plan = []
+            while parents[state] is not None:
+                state, name = parents[state]
+                plan.append(name)
+            plan.reverse()
+            return SearchResult(plan, g, expanded, generated, time.time() - start_time)
+
+        expanded += 1
+        if expanded % TIME_CHECK_INTERVAL == 0 and time.time() - start_time > time_budget:
+            raise SearchTimeout()
+
+        for action in _applicable(task, state):
+            successor = (state & ~action.delete) | action.add
+            successor_g = g + action.cost
+            if successor in closed or successor_g >= best_g.get(successor, INFINITY):
+                continue
+            h = heuristic(task, successor)
+            if h == INFINITY:
+                continue
+            best_g[successor] = successor_g
+            parents[successor] = (state, action.name)
+            counter += 1
+            generated += 1
+            priority = successor_g + h if optimal else h
+            heapq.heappush(open_list, (priority, h, counter, successor))
+
+    return SearchResult(None, 0, expanded, generated, time.time() - start_time)
+
+
+def write_plan(plan_file: str, plan: List[str], cost: int, unit_cost: bool):
+    """Write a plan the way Fast Downward does, replacing plans of earlier runs"""
+    for fn in glob.glob(glob.escape(plan_file)) + glob.glob(f"{glob.escape(plan_file)}.[0-9]*"):
+        os.remove(fn)
+    with open(plan_file, "w") as f:
+        for name in plan:
+            f.write(f"{name}\n")
+        f.write(f"; cost = {cost} ({'unit' if unit_cost else 'general'} cost)\n")
+
+
+def solve(job: FDJob, time_budget: float) -> Optional[FDResult]:
+    """Try to solve a job in-process; None when it must be left to Fast Downward"""
+    start_time = time.time()
+    start_cpu = time.thread_time()
+    optimal = job.alias.startswith("seq-opt")
+    deadline = start_time + time_budget
+    try:
+        # an unsolvable verdict is only given for a complete grounding; anything the grounder
+        # does not model raises UnsupportedTaskError and is left to Fast Downward
+        task = ground_task(job.domain_file, job.problem_file, deadline)
+        if task is None:
+            stdout = "Goal is not reachable in the relaxed task.\nSearch stopped without finding a solution.\n"
+            exit_code = TRANSLATE_UNSOLVABLE_EXIT_CODE
+        else:
+            result = search(task, optimal, deadline - time.time())
+            stdout = (f"Expanded {result.expanded} state(s).\nGenerated {result.generated} state(s).\n"
+                      f"Search time: {result.search_time:.4f}s\n")
+            if result.plan is None:
+                stdout += "Search stopped without finding a solution.\n"
+                exit_code = SEARCH_UNSOLVABLE_EXIT_CODE
+            else:
+                if job.plan_file:
+                    write_plan(job.plan_file, result.plan, result.cost, task.unit_cost)
+                stdout = (f"Solution found!\n{stdout}Plan length: {len(result.plan)} step(s).\n"
+                          f"Plan cost: {result.cost}\n")
+                exit_code = 0
+    except (UnsupportedTaskError, SearchTimeout, RecursionError, OSError):
+        return None
+
+    return FDResult(
+        exit_code=exit_code,
+        stdout=f"In-process {'A* (h_max)' if optimal else 'GBFS (goal count)'} search\n{stdout}",
+        stderr="",
+        wall_time=time.time() - start_time,
+        cpu_time=time.thread_time() - start_cpu,
+        peak_rss_kb=0
+    )
+
+
+_config_lock = threading.Lock()
+_config = {
+    "enabled": os.getenv("STRIPS_FAST_PATH", "1") != "0",
+    "time_budget": float(os.getenv("STRIPS_TIME_BUDGET", "2")),
+}
+
+
+def configure_fast_path(**config):
+    """Enable or disable the in-process planner and set its time budget in seconds"""
+    with _config_lock:
+        _config.update({k: v for k, v in config.items() if v is not None})
+
+
+def try_fast_path(job: FDJob) -> Optional[FDResult]:
+    """Solve a job in-process if enabled and possible within the time budget"""
+    if not _config["enabled"]:
+        return None
+    return solve(job, min(_config["time_budget"], job.time_limit or INFINITY))
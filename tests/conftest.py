@@ -0,0 +1,15 @@
+import os
+import sys
+import time
+
+# the modules live at the top level of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def backdate(path, days):
+    """Rename a disk cache record as if it had been created `days` days ago; returns the new path"""
+    new_path = f"{path[:-len('.json')].rsplit('.', 1)[0]}.{int(time.time() - days * 24 * 3600)}.json"
+    os.rename(path, new_path)
+    return new_path
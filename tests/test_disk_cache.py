@@ -0,0 +1,50 @@
+import json
+import os
+import time
+
+from conftest import backdate
+from disk_cache import DiskCache
+
+
+def test_write_replaces_older_records_of_a_key(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1024, max_age_days=1)
+    cache._write("abcd", {"value": 1})
+    backdate(cache._path("abcd"), 1)
+    cache._write("abcd", {"value": 2})
+    assert os.listdir(tmp_path / "ab") == [os.path.basename(cache._path("abcd"))]
+    with open(cache._path("abcd")) as f:
+        assert json.load(f)["value"] == 2
+
+
+def test_eviction_does_not_read_records(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=10 ** 6, max_age_days=1)
+    cache._write("live", {})
+    cache._write("old", {})
+    backdate(cache._path("old"), 2)
+
+    def no_open(*args, **kwargs):
+        raise AssertionError("evict() opened a record")
+
+    monkeypatch.setattr("builtins.open", no_open)
+    cache.evict()
+    assert cache._path("old") is None and cache._path("live") is not None
+
+
+def test_evicts_least_recently_used_over_size(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10 ** 6, max_age_days=1)
+    for key in ("k1", "k2", "k3"):
+        cache._write(key, {"text": "x" * 100})
+    os.utime(cache._path("k2"), (0, 0))
+    cache.max_bytes = os.path.getsize(cache._path("k1")) + os.path.getsize(cache._path("k3"))
+    cache.evict()
+    assert cache._path("k2") is None
+    assert cache._path("k1") is not None and cache._path("k3") is not None
+
+
+def test_records_without_creation_time_in_the_name_are_renamed(tmp_path):
+    (tmp_path / "ke").mkdir()
+    (tmp_path / "ke" / "key1.json").write_text(json.dumps({"created": time.time()}))
+    (tmp_path / "ke" / "key2.json").write_text(json.dumps({"created": time.time() - 2 * 24 * 3600}))
+    cache = DiskCache(str(tmp_path), max_bytes=10 ** 6, max_age_days=1)
+    assert os.path.basename(cache._path("key1")).startswith("key1.")
+    assert cache._path("key2") is None
@@ -0,0 +1,30 @@
+import os
+
+import fd_runner
+from conftest import DATA_DIR
+from fd_runner import FDResult
+
+
+def trace(monkeypatch, stdout, wall_time=1.0):
+    spans = []
+    monkeypatch.setattr(fd_runner, "add_span",
+                        lambda name, start, duration, category, **args: spans.append((name, start, duration)))
+    fd_runner._trace_phases(FDResult(0, stdout, "", wall_time, 0.0, 0), 100.0)
+    return spans
+
+
+def test_search_span_from_reported_total_time(monkeypatch):
+    with open(os.path.join(DATA_DIR, "fd_24.06_seq_opt_lmcut.log")) as f:
+        spans = trace(monkeypatch, f.read())
+    assert spans == [("fd.translate", 100.0, 0.012), ("fd.search", 100.012, 0.001553)]
+
+
+def test_search_span_falls_back_to_wall_time(monkeypatch):
+    stdout = "Done! [0.2s CPU, 0.25s wall-clock]\nINFO     Running search (release).\n[t=0.1s, 9000 KB] reading input...\n"
+    spans = trace(monkeypatch, stdout, wall_time=2.0)
+    assert spans == [("fd.translate", 100.0, 0.25), ("fd.search", 100.25, 1.75)]
+
+
+def test_no_search_span_when_search_did_not_run(monkeypatch):
+    spans = trace(monkeypatch, "Done! [0.2s CPU, 0.25s wall-clock]\ntranslate exit code: 31\n")
+    assert [name for name, _, _ in spans] == ["fd.translate"]
@@ -0,0 +1,55 @@
+import os
+
+from conftest import DATA_DIR
+from fd_stats import exit_status, format_stats, parse_planner_output
+
+
+def read_log(name):
+    with open(os.path.join(DATA_DIR, name)) as f:
+        return f.read()
+
+
+def test_parses_search_lines_with_time_and_memory_prefix():
+    stats = parse_planner_output(read_log("fd_24.06_seq_opt_lmcut.log"), exit_code=0)
+    assert stats.exit_name == "SUCCESS"
+    assert stats.translate_exit_code == 0 and stats.search_exit_code == 0
+    assert stats.translator_variables == 9
+    assert stats.translator_operators == 32
+    assert stats.translator_axioms == 0
+    assert stats.translate_time == 0.012
+    assert stats.plan_length == 6
+    assert stats.plan_cost == 6.0
+    assert stats.plans_found == 1
+    assert stats.expanded == 7
+    assert stats.evaluated == 12
+    assert stats.generated == 23
+    assert stats.expanded_until_last_jump == 6
+    assert stats.search_time == 0.000367
+    assert stats.total_time == 0.001553
+    assert stats.peak_memory_kb == 10228
+    assert stats.planner_time == 0.11
+
+
+def test_parses_lines_without_prefix():
+    stats = parse_planner_output("Plan length: 4 step(s).\nPlan cost: 4\nExpanded 5 state(s).\n"
+                                 "Total time: 0.01s\n")
+    assert (stats.plan_length, stats.plan_cost, stats.expanded, stats.total_time) == (4, 4.0, 5, 0.01)
+
+
+def test_anytime_search_keeps_best_cost():
+    output = "[t=0.1s, 9000 KB] Plan cost: 9\n[t=0.2s, 9000 KB] Plan cost: 7\n"
+    stats = parse_planner_output(output)
+    assert stats.plan_cost == 7.0 and stats.plans_found == 2
+
+
+def test_exit_status():
+    assert exit_status(12).name == "SEARCH_UNSOLVED_INCOMPLETE"
+    assert exit_status(-9).name == "KILLED"
+    assert exit_status(99).name == "UNKNOWN"
+    assert exit_status(2).plan_found and exit_status(2).out_of_time
+
+
+def test_format_stats():
+    text = format_stats(parse_planner_output(read_log("fd_24.06_seq_opt_lmcut.log"), exit_code=0))
+    assert text.startswith("SUCCESS (0)")
+    assert "expanded 7" in text and "plan length 6, cost 6" in text
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from conftest import backdate
+from llm_cache import CacheMissError, ResponseCache
+
+
+def test_put_and_get(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    key = cache.make_key("model", "prompt", {"temperature": 0.1})
+    assert cache.get(key) is None
+    cache.put(key, {"text": "answer"})
+    assert cache.get(key)["text"] == "answer"
+    assert key != cache.make_key("model", "prompt", {"temperature": 0.2})
+
+
+def test_replay_raises_on_miss(tmp_path):
+    with pytest.raises(CacheMissError):
+        ResponseCache(str(tmp_path), replay=True).get("missing")
+
+
+def test_eviction_uses_creation_time_not_file_times(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_age_days=1)
+    cache.put("expired", {"text": "old"})
+    cache.put("live", {"text": "new"})
+    backdate(cache._path("expired"), 2)
+    # a restored copy: fresh mtime on the expired entry, old mtime on the live one
+    os.utime(cache._path("live"), (0, 0))
+    cache.evict()
+    assert cache._path("expired") is None
+    assert cache.get("live")["text"] == "new"
+
+
+def test_replay_keeps_expired_entries(tmp_path):
+    ResponseCache(str(tmp_path)).put("key", {"text": "answer"})
+    cache = ResponseCache(str(tmp_path), max_age_days=0, replay=True)
+    assert cache.get("key")["text"] == "answer"
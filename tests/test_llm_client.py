@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from llm_cache import CacheMissError, ResponseCache
+from llm_client import LLMClient, _cache_params, _is_retryable
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class TooManyRequestsError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error", [
+    StatusError(429), StatusError(500), StatusError(503), TooManyRequestsError(),
+    ConnectionResetError(), TimeoutError(), asyncio.TimeoutError(),
+])
+def test_retryable(error):
+    assert _is_retryable(error)
+
+
+@pytest.mark.parametrize("error", [
+    StatusError(400), StatusError(401), StatusError(422),
+    TypeError("bad argument"), KeyError("text"), AttributeError("no attribute 'text'"), ValueError(),
+])
+def test_not_retryable(error):
+    assert not _is_retryable(error)
+
+
+def test_samples_are_cached_separately(tmp_path):
+    cache = ResponseCache(str(tmp_path), replay=True)
+    params = {"temperature": 0.7}
+    for sample in ("run0 c1", "run1 c1"):
+        cache.put(ResponseCache.make_key("model", "prompt", _cache_params(params, sample)), {"text": sample})
+    client = LLMClient("key", cache=cache)
+    try:
+        assert client.chat("prompt", "model", sample="run0 c1", **params).text == "run0 c1"
+        assert client.chat("prompt", "model", sample="run1 c1", **params).text == "run1 c1"
+        with pytest.raises(CacheMissError):
+            client.chat("prompt", "model", **params)
+    finally:
+        client.close()
+    assert _cache_params(params, None) is params
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from pddl_reader import (Atom, Compound, PDDLSyntaxError, Quantified, When, parse_domain, parse_problem,
+                         parse_sexpr, to_text)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOMAIN = """; a comment
+(define (domain Lights)
+  (:requirements :strips :typing :conditional-effects)
+  (:types lamp - device device)
+  (:constants main - lamp)
+  (:predicates (on ?l - lamp) (linked ?a ?b - lamp))
+  (:action toggle
+    :parameters (?l - lamp)
+    :precondition (not (on ?l))
+    :effect (and (on ?l) (forall (?o - lamp) (when (linked ?l ?o) (on ?o))))))
+"""
+PROBLEM = """(define (problem lights-1) (:domain lights)
+  (:objects a b - lamp c)
+  (:init (linked a b))
+  (:goal (and (on a) (on b))))
+"""
+
+
+def read(*parts):
+    with open(os.path.join(ROOT, *parts)) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("path", [("domains", "blocksworld", "domain.pddl"), ("domains", "blocksworld", "p01.pddl"),
+                                  ("domains", "gripper", "domain.pddl"), ("domains", "gripper", "p01.pddl")])
+def test_to_text_round_trips(path):
+    sexpr = parse_sexpr(read(*path))
+    assert parse_sexpr(to_text(sexpr)) == sexpr
+
+
+def test_tokens_are_lowercased_and_comments_dropped():
+    assert parse_sexpr("(Define ; ignored )\n (Domain X))") == ["define", ["domain", "x"]]
+
+
+@pytest.mark.parametrize("text, kind", [
+    ("", "empty"),
+    ("; only a comment", "empty"),
+    ("(define (domain d)", "missing_close"),
+    ("(define (domain d)))", "extra_close"),
+    ("(define (domain d)) (extra)", "trailing_tokens"),
+    ("define (domain d)", "trailing_tokens"),
+])
+def test_syntax_error_kinds(text, kind):
+    with pytest.raises(PDDLSyntaxError) as e:
+        parse_sexpr(text)
+    assert e.value.kind == kind
+
+
+@pytest.mark.parametrize("text", ["(define)", "(define (domain))", "(domain d)"])
+def test_malformed_define_is_a_structure_error(text):
+    with pytest.raises(PDDLSyntaxError) as e:
+        parse_domain(text)
+    assert e.value.kind == "structure"
+
+
+def test_parse_domain():
+    domain = parse_domain(DOMAIN)
+    assert domain.name == "lights"
+    assert domain.requirements == (":strips", ":typing", ":conditional-effects")
+    assert [(t.name, t.type) for t in domain.types] == [("lamp", "device"), ("device", "object")]
+    assert [str(c) for c in domain.constants] == ["main - lamp"]
+    assert [str(p) for p in domain.predicates] == ["(on ?l - lamp)", "(linked ?a - lamp ?b - lamp)"]
+
+    (action,) = domain.actions
+    assert action.name == "toggle"
+    assert [str(p) for p in action.parameters] == ["?l - lamp"]
+    assert action.precondition == Compound("not", (Atom("on", ("?l",)),))
+    on, forall = action.effect.parts
+    assert on == Atom("on", ("?l",))
+    assert isinstance(forall, Quantified) and isinstance(forall.body, When)
+    assert str(forall) == "(forall (?o - lamp) (when (linked ?l ?o) (on ?o)))"
+
+
+def test_parse_problem():
+    problem = parse_problem(PROBLEM)
+    assert problem.name == "lights-1"
+    assert problem.domain_name == "lights"
+    assert [str(o) for o in problem.objects] == ["a - lamp", "b - lamp", "c"]
+    assert problem.init == (Atom("linked", ("a", "b")),)
+    assert problem.goal_parts == (Atom("on", ("a",)), Atom("on", ("b",)))
@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from pddl_validator import format_issues, has_errors, validate_domain, validate_pddl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOMAIN = """(define (domain switch)
+  (:requirements :strips :typing)
+  (:types lamp)
+  (:predicates (on ?l - lamp) (off ?l - lamp))
+  (:action turn-on :parameters (?l - lamp) :precondition (off ?l) :effect (and (on ?l) (not (off ?l)))))
+"""
+PROBLEM = """(define (problem switch-1) (:domain switch)
+  (:objects l1 - lamp)
+  (:init (off l1))
+  (:goal (on l1)))
+"""
+
+
+def error_types(issues):
+    return [issue.error_type for issue in issues]
+
+
+@pytest.mark.parametrize("domain", ["blocksworld", "gripper"])
+def test_bundled_tasks_are_clean(domain):
+    directory = os.path.join(ROOT, "domains", domain)
+    with open(os.path.join(directory, "domain.pddl")) as f:
+        domain_text = f.read()
+    with open(os.path.join(directory, "p01.pddl")) as f:
+        problem_text = f.read()
+    assert validate_pddl(domain_text, problem_text) == []
+
+
+@pytest.mark.parametrize("domain, problem, error_type", [
+    (DOMAIN + ")", PROBLEM, "UNMATCHED_PARENTHESES"),
+    (DOMAIN, PROBLEM[:-2], "UNMATCHED_PARENTHESES"),
+    (DOMAIN, PROBLEM + "(:goal (on l1))", "PLANNER_PARSE_ERROR"),
+    (DOMAIN, PROBLEM.replace("(:domain switch)", "(:domain lights)"), "PLANNER_PARSE_ERROR"),
+    (DOMAIN, PROBLEM.replace("(:init (off l1))", "(:init (off l1 l1))"), "PLANNER_PARSE_ERROR"),
+    (DOMAIN, PROBLEM.replace("(:goal (on l1))", "(:goal (on l2))"), "PLANNER_PARSE_ERROR"),
+    (DOMAIN.replace(":precondition (off ?l)", ":precondition (off ?x)"), PROBLEM, "PLANNER_PARSE_ERROR"),
+    (DOMAIN, PROBLEM.replace("(:goal (on l1))", ""), "PLANNER_PARSE_ERROR"),
+    (DOMAIN, DOMAIN, "WRONG_SECTION"),
+    (DOMAIN, PROBLEM.replace("(:init", "(:predicates (lit ?l))\n  (:init"), "WRONG_SECTION"),
+    (DOMAIN.replace(":predicates", ":predicate"), PROBLEM, "MISSPELLED_KEYWORD"),
+    (DOMAIN, PROBLEM.replace("(:goal (on l1))", "(:goal (lit l1))"), "UNKNOWN_PREDICATE"),
+    (DOMAIN.replace("(?l - lamp) :pre", "(?l - light) :pre"), PROBLEM, "MISSING_TYPE"),
+    (DOMAIN, PROBLEM.replace("l1 - lamp", "l1 - light"), "MISSING_TYPE"),
+])
+def test_error_categories(domain, problem, error_type):
+    issues = validate_pddl(domain, problem)
+    assert error_type in error_types(issues), format_issues(issues)
+    assert has_errors(issues)
+
+
+def test_misspelled_keyword_suggests_the_section():
+    issues = validate_domain(DOMAIN.replace(":predicates", ":predicate"))
+    assert issues[0].error_type == "MISSPELLED_KEYWORD"
+    assert issues[0].message == "DOMAIN: unknown section :predicate (did you mean :predicates?)"
+
+
+def test_missing_typing_requirement_is_only_a_warning():
+    issues = validate_pddl(DOMAIN.replace(" :typing", ""), PROBLEM)
+    assert error_types(issues) == ["MISSING_REQUIREMENT"]
+    assert not has_errors(issues)
+    assert format_issues(issues) == "[warning] MISSING_REQUIREMENT: DOMAIN: types are used without :typing"
@@ -0,0 +1,52 @@
+import os
+
+from conftest import backdate
+from fd_runner import FDJob, FDResult
+from plan_cache import PlanCache, canonicalize_pddl
+
+PROBLEM = "(define (problem p) (:domain d) (:init (b) (a)) (:goal (and (y) (x))))"
+
+
+def make_job(tmp_path, problem=PROBLEM):
+    (tmp_path / "domain.pddl").write_text("(define (domain d))")
+    (tmp_path / "problem.pddl").write_text(problem)
+    return FDJob(str(tmp_path / "domain.pddl"), str(tmp_path / "problem.pddl"), plan_file=str(tmp_path / "plan"))
+
+
+def result(exit_code):
+    return FDResult(exit_code, "out", "", 1.0, 1.0, 100)
+
+
+def test_canonical_form_ignores_order_and_names():
+    other = "(define (problem q) (:domain d) ; comment\n (:init (a) (b)) (:goal (and (x) (y))))"
+    assert canonicalize_pddl(PROBLEM) == canonicalize_pddl(other)
+
+
+def test_stores_deterministic_outcomes_only(tmp_path):
+    cache = PlanCache(str(tmp_path / "cache"))
+    job = make_job(tmp_path)
+    for exit_code in (30, 32, 22, 23, -1):
+        cache.store(job, result(exit_code))
+        assert cache.lookup(job) is None
+    (tmp_path / "plan").write_text("(a)\n; cost = 1 (unit cost)\n")
+    cache.store(job, result(0))
+    os.remove(tmp_path / "plan")
+    cached = cache.lookup(job)
+    assert cached.cached and cached.exit_code == 0
+    assert (tmp_path / "plan").read_text().startswith("(a)")
+
+
+def test_evicts_by_age_of_creation_and_size(tmp_path):
+    directory = str(tmp_path / "cache")
+    cache = PlanCache(directory, max_age_days=1)
+    (tmp_path / "new").mkdir()
+    old, new = make_job(tmp_path), make_job(tmp_path / "new", PROBLEM.replace("(x)", "(z)"))
+    cache.store(old, result(11))
+    expired_path = backdate(cache._path(cache.make_key(old)), 2)
+    os.utime(expired_path)  # a fresh mtime (e.g. after a copy) does not keep an expired entry
+    cache.store(new, result(11))
+    cache.evict()
+    assert cache.lookup(old) is None and cache.lookup(new) is not None
+
+    PlanCache(directory, max_bytes=0)
+    assert cache.lookup(new) is None
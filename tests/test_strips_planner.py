@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from fd_runner import FDJob
+from plan_validator import validate_plan_file
+from strips_planner import SEARCH_UNSOLVABLE_EXIT_CODE, TRANSLATE_UNSOLVABLE_EXIT_CODE, solve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOMAIN = """(define (domain switch)
+  (:requirements :strips :typing)
+  (:types light lamp)
+  (:predicates (on ?l) (off ?l))
+  (:action turn-on :parameters (?l - {param_type}) :precondition (off ?l) :effect (and (on ?l) (not (off ?l))))
+  {extra})
+"""
+PROBLEM = """(define (problem switch-1) (:domain switch)
+  (:objects l1 - lamp)
+  (:init (off l1))
+  (:goal (on l1)))
+"""
+
+
+def write_task(tmp_path, param_type="lamp", extra="", problem=PROBLEM):
+    domain_file, problem_file = tmp_path / "domain.pddl", tmp_path / "problem.pddl"
+    domain_file.write_text(DOMAIN.format(param_type=param_type, extra=extra))
+    problem_file.write_text(problem)
+    return FDJob(str(domain_file), str(problem_file), plan_file=str(tmp_path / "sas_plan"))
+
+
+@pytest.mark.parametrize("alias", ["seq-opt-lmcut", "lama-first"])
+@pytest.mark.parametrize("domain", ["blocksworld", "gripper"])
+@pytest.mark.parametrize("task", ["p01", "p02", "p03", "p04", "p05"])
+def test_plans_validate_on_bundled_tasks(tmp_path, domain, task, alias):
+    directory = os.path.join(ROOT, "domains", domain)
+    job = FDJob(os.path.join(directory, "domain.pddl"), os.path.join(directory, f"{task}.pddl"),
+                plan_file=str(tmp_path / "sas_plan"), alias=alias)
+    result = solve(job, time_budget=30)
+    assert result is not None and result.exit_code == 0
+    validation = validate_plan_file(job.domain_file, job.problem_file, job.plan_file)
+    assert validation.valid, validation.reason
+    assert validation.cost == result.stats.plan_cost
+
+
+def test_optimal_plan_length(tmp_path):
+    job = write_task(tmp_path)
+    result = solve(job, time_budget=5)
+    assert result.exit_code == 0 and result.stats.plan_length == 1
+
+
+def test_unsolvable_verdicts(tmp_path):
+    unreachable = PROBLEM.replace("(on l1)", "(and (on l1) (off l2))").replace("l1 - lamp", "l1 l2 - lamp")
+    assert solve(write_task(tmp_path, problem=unreachable), 5).exit_code == TRANSLATE_UNSOLVABLE_EXIT_CODE
+    # both goals are relaxed-reachable, but turning a lamp on never turns it off again
+    exclusive = PROBLEM.replace("(on l1)", "(and (on l1) (off l1))")
+    assert solve(write_task(tmp_path, problem=exclusive), 5).exit_code == SEARCH_UNSOLVABLE_EXIT_CODE
+
+
+@pytest.mark.parametrize("param_type, extra", [
+    ("(either light lamp)", ""),
+    ("lamp", "(:derived (lit ?l) (on ?l))"),
+    ("lamp", "(:durative-action wait :parameters () :duration (= ?duration 1) :condition () :effect ())"),
+])
+def test_unmodeled_constructs_are_left_to_fast_downward(tmp_path, param_type, extra):
+    assert solve(write_task(tmp_path, param_type, extra), 5) is None
+
+
+def test_files_rewritten_in_place_are_compiled_again(tmp_path):
+    job = write_task(tmp_path)
+    assert solve(job, 5).exit_code == 0
+    write_task(tmp_path, problem=PROBLEM.replace("(on l1)", "(on l2)"))
+    assert solve(job, 5).exit_code == TRANSLATE_UNSOLVABLE_EXIT_CODE
+
+
+def test_grounding_respects_the_time_budget(tmp_path):
+    assert solve(write_task(tmp_path), time_budget=-1) is None
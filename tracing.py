@@ -0,0 +1,166 @@
+"""
+Timing Spans
+Nested timing spans for the stages of a task (prompt construction, LLM calls,
+parsing, file writes, planning, knowledge graph retrieval), exported as a Chrome
+trace-event file that chrome://tracing or https://ui.perfetto.dev can open.
+A span opened inside another one becomes its child, also across the planner
+pool's threads, and child spans are drawn on the track of the task that opened them.
+"""
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage; `set` attaches arguments shown in the trace viewer"""
+
+    def __init__(self, name: str, category: str, track: int, parent: Optional["Span"], args: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.track = track
+        self.parent = parent
+        self.args = args
+        self.start = time.perf_counter()
+        self.duration = 0.0
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class _NullSpan:
+    """Stands in for a span when tracing is disabled"""
+    name = ""
+    start = 0.0
+    duration = 0.0
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects finished spans in memory and writes them as Chrome trace events"""
+
+    def __init__(self, path: str = "experiments/trace.json"):
+        self.path = path
+        self.pid = os.getpid()
+        self._epoch = time.perf_counter()
+        self._events = []
+        self._tracks = {}
+        self._track_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _track(self) -> int:
+        # a root span gets the track of its thread; children inherit their parent's
+        thread = threading.current_thread()
+        with self._lock:
+            if thread.ident not in self._tracks:
+                self._tracks[thread.ident] = next(self._track_ids)
+                self._events.append({"name": "thread_name", "ph": "M", "pid": self.pid,
+                                     "tid": self._tracks[thread.ident], "args": {"name": thread.name}})
+            return self._tracks[thread.ident]
+
+    def _event(self, name: str, category: str, track: int, start: float, duration: float, args: dict):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._epoch) * 1e6, 1),
+            "dur": round(duration * 1e6, 1),
+            "pid": self.pid,
+            "tid": track,
+            "args": args
+        }
+        with self._lock:
+            self._events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "task", **args):
+        parent = _current_span.get()
+        span = Span(name, category, parent.track if parent else self._track(), parent, args)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            _current_span.reset(token)
+            self._event(name, category, span.track, span.start, span.duration, span.args)
+
+    def add_span(self, name: str, start: float, duration: float, category: str = "task", **args):
+        """Record a span that was measured elsewhere, e.g. a phase reported by a subprocess"""
+        parent = _current_span.get()
+        self._event(name, category, parent.track if parent else self._track(), start, duration, args)
+
+    def export(self, path: str = None) -> str:
+        """Write all spans recorded so far; returns the trace file path"""
+        path = path or self.path
+        with self._lock:
+            events = list(self._events)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        os.replace(tmp_path, path)
+        return path
+
+    def events(self) -> List[dict]:
+        with self._lock:
+            return list(self._events)
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+_tracer_config = {
+    "enabled": os.getenv("TRACE", "1") != "0",
+    "path": os.getenv("TRACE_FILE", "experiments/trace.json"),
+}
+
+
+def configure_tracing(**config):
+    """Set options for the process-wide tracer; must be called before its first use"""
+    if _tracer is not None:
+        raise RuntimeError("Tracer is already running")
+    _tracer_config.update({k: v for k, v in config.items() if v is not None})
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Return the process-wide tracer, or None when tracing is disabled"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None and _tracer_config["enabled"]:
+            _tracer = Tracer(_tracer_config["path"])
+        return _tracer
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "task", **args):
+    """Time the enclosed block as a child of the current span"""
+    tracer = get_tracer()
+    if tracer is None:
+        yield NULL_SPAN
+        return
+    with tracer.span(name, category, **args) as current:
+        yield current
+
+
+def add_span(name: str, start: float, duration: float, category: str = "task", **args):
+    """Record an already measured span under the current span"""
+    tracer = get_tracer()
+    if tracer is not None:
+        tracer.add_span(name, start, duration, category, **args)
+
+
+def export_trace() -> Optional[str]:
+    """Write the process-wide trace file if any span was recorded"""
+    if _tracer is None or not _tracer.events():
+        return None
+    return _tracer.export()